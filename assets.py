@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import plotly
+from flask import request, send_from_directory
+
+
+# hashed files never change, so browsers can keep them for a year.
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def plotly_js_path():
+    """
+    Returns the path of the plotly.js bundle shipped with the plotly package.
+    """
+
+    return os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+
+def hashed_name(path):
+    """
+    Returns the file name with a hash of its contents, e.g. plotly.0123456789ab.min.js.
+    """
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    stem, _, ext = os.path.basename(path).partition('.')
+
+    return f'{stem}.{digest}.{ext}'
+
+
+class Assets:
+    """
+    Publishes vendored files into static/ under content-hashed names and serves them with long-lived cache headers.
+    """
+
+    def __init__(self, app, folder='vendor'):
+        self.folder = folder
+        self.directory = os.path.join(app.static_folder, folder)
+        self.prefix = f'{app.static_url_path}/{folder}'
+        self.urls = {}
+
+        # more specific than the static route, so hashed files get the long cache headers.
+        app.add_url_rule(f'{self.prefix}/<path:filename>', 'vendor', self.send)
+
+        # lets templates write {{ asset_url('plotly.js') }}.
+        app.context_processor(lambda: {'asset_url': self.url})
+
+
+    def publish(self, name, source):
+        """
+        Copies a file into the asset folder, with a gzipped copy, unless it is already there. Returns its url.
+        """
+
+        filename = hashed_name(source)
+        target = os.path.join(self.directory, filename)
+
+        if not os.path.exists(target):
+            os.makedirs(self.directory, exist_ok=True)
+
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            # compress once here rather than on every request.
+            self._write(target + '.gz', gzip.compress(data, 9))
+            self._write(target, data)
+
+        self.urls[name] = f'{self.prefix}/{filename}'
+
+        return self.urls[name]
+
+
+    def url(self, name):
+        """
+        Returns the url of a published file.
+        """
+
+        return self.urls[name]
+
+
+    def send(self, filename):
+        """
+        Serves a published file, gzipped if the browser accepts it.
+        """
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        compressed = request.accept_encodings['gzip'] and os.path.exists(os.path.join(self.directory, filename + '.gz'))
+
+        response = send_from_directory(
+            self.directory,
+            filename + '.gz' if compressed else filename,
+            mimetype=mimetype,
+            max_age=MAX_AGE
+            )
+
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+
+        return response
+
+
+    @staticmethod
+    def _write(path, data):
+        """
+        Writes a file atomically, so other workers never serve a partial copy.
+        """
+
+        tmp = f'{path}.{os.getpid()}.tmp'
+
+        with open(tmp, 'wb') as f:
+            f.write(data)
+
+        os.replace(tmp, path)
@@ -0,0 +1,111 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from flask import Flask, render_template_string
+
+from assets import Assets, MAX_AGE, hashed_name, plotly_js_path
+
+
+class TestAssets(TestCase):
+    """
+    Tests vendored files are published under hashed names and cached by browsers.
+    """
+
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        self.app = Flask(__name__, static_folder=self.static, static_url_path='/static')
+        self.assets = Assets(self.app)
+
+        self.source = os.path.join(self.static, 'lib.min.js')
+        with open(self.source, 'w') as f:
+            f.write('var lib = 1;' * 100)
+
+        self.client = self.app.test_client()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+
+
+    def test_hashed_name(self):
+        """
+        Tests the name changes with the file contents.
+        """
+
+        name = hashed_name(self.source)
+
+        with open(self.source, 'a') as f:
+            f.write('var other = 2;')
+
+        self.assertRegex(name, r'^lib\.[0-9a-f]{12}\.min\.js$')
+        self.assertNotEqual(hashed_name(self.source), name)
+
+
+    def test_publish(self):
+        """
+        Tests publishing copies the file and a gzipped copy into static/vendor.
+        """
+
+        url = self.assets.publish('lib.js', self.source)
+        path = os.path.join(self.static, 'vendor', os.path.basename(url))
+
+        self.assertEqual(url, f'/static/vendor/{hashed_name(self.source)}')
+        self.assertTrue(os.path.exists(path))
+
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), b'var lib = 1;' * 100)
+
+
+    def test_cache_headers(self):
+        """
+        Tests hashed files are served with long-lived, immutable cache headers.
+        """
+
+        url = self.assets.publish('lib.js', self.source)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/javascript')
+        self.assertEqual(response.cache_control.max_age, MAX_AGE)
+        self.assertTrue(response.cache_control.public)
+        self.assertTrue(response.cache_control.immutable)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+
+    def test_gzip(self):
+        """
+        Tests the gzipped copy is served when the browser accepts it.
+        """
+
+        url = self.assets.publish('lib.js', self.source)
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/javascript')
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(gzip.decompress(response.data), b'var lib = 1;' * 100)
+
+
+    def test_asset_url(self):
+        """
+        Tests templates can look up published urls.
+        """
+
+        url = self.assets.publish('lib.js', self.source)
+
+        with self.app.app_context():
+            self.assertEqual(render_template_string("{{ asset_url('lib.js') }}"), url)
+
+
+    def test_plotly_js_path(self):
+        """
+        Tests the plotly package ships its bundle.
+        """
+
+        self.assertTrue(os.path.exists(plotly_js_path()))
+
+
+if __name__ == '__main__':
+    main()
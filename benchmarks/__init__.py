@@ -0,0 +1,21 @@
+"""
+Performance benchmarks for Chill Pill. Run a module with `python -m benchmarks.<name>`.
+"""
+
+from pymongo import uri_parser
+
+from db import DEFAULT_DATABASE
+
+
+def scratch_database(uri):
+    """
+    Returns the name of the database a benchmark is about to drop. Raises ValueError if the URI doesn't name
+    one, which would fall back to the app's database, or names the app's database.
+    """
+
+    name = uri_parser.parse_uri(uri)['database']
+
+    if not name or name == DEFAULT_DATABASE:
+        raise ValueError(f'Refusing to drop the app database {DEFAULT_DATABASE!r}, name a scratch database in the URI')
+
+    return name
@@ -0,0 +1,92 @@
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime as dt, timedelta
+
+import bson
+from bson import json_util, ObjectId
+
+from models import ENTRY_CODEC
+
+
+def sample_batch(n):
+    """
+    Returns n journal entries encoded as BSON, as a cursor would receive them.
+    """
+
+    start = dt(2023, 1, 1)
+    docs = [{
+        '_id': ObjectId(),
+        'body': f'Entry {i}: had a lovely day, went for a walk and felt calm afterwards. ' * 4,
+        'sentiment': (i % 1000) / 100,
+        'sentiment_status': 'done',
+        'timestamp': start + timedelta(minutes=i)
+    } for i in range(n)]
+
+    return b''.join(bson.encode(doc) for doc in docs)
+
+
+def json_round_trip(data):
+    """
+    The old read path: decode to dicts, dump to extended JSON, load again.
+    """
+
+    return json.loads(json_util.dumps(bson.decode_all(data)))
+
+
+def entry_views(data):
+    """
+    The new read path: decode straight into entry views.
+    """
+
+    return bson.decode_all(data, ENTRY_CODEC)
+
+
+def stream_entry_views(data):
+    """
+    The new read path as a template consumes it, one entry at a time.
+    """
+
+    count = 0
+    for entry in bson.decode_iter(data, ENTRY_CODEC):
+        count += 1
+
+    return count
+
+
+def measure(func, data, repeat):
+    """
+    Returns the best time in ms and the peak memory in MB of decoding data.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func(data)
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entry decoding time and memory, json round trip vs entry views.')
+    parser.add_argument('-n', type=int, default=10000, help='entries to decode')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs, the best is reported')
+    args = parser.parse_args()
+
+    data = sample_batch(args.n)
+    print(f'{args.n} entries, {len(data) / 1024 / 1024:.1f} MB of BSON')
+
+    for name, func in [('json round trip', json_round_trip), ('entry views', entry_views), ('streamed views', stream_entry_views)]:
+        ms, peak = measure(func, data, args.repeat)
+        print(f'{name:<16} {ms:8.1f} ms   peak {peak:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import math
+import random
+from datetime import datetime as dt, timedelta
+from bson import ObjectId
+
+from embedded import SQLiteJournal, to_text
+from models import SENTIMENT_DONE
+from utils import chunked
+
+
+# sentences entries are written from, by mood.
+PHRASES = {
+    'low': [
+        'Feeling really down today.',
+        'Could not sleep again and everything felt heavy.',
+        'Work was stressful and I snapped at a colleague.',
+        'I miss my family so much it hurts.',
+        'Cancelled plans because I was too tired to go out.',
+        'Everything I tried today went wrong.',
+        'Anxious about money and the rent this month.'
+    ],
+    'mid': [
+        'A normal day, nothing special happened.',
+        'Went for a walk after lunch and cleared my head a bit.',
+        'Busy at work but got through the list.',
+        'Cooked dinner and watched a film.',
+        'Bit tired, but okay overall.',
+        'Caught up with emails and tidied the flat.',
+        'Rain all day so I stayed in and read.'
+    ],
+    'high': [
+        'Such a good day, I feel great!',
+        'Had the best time with friends at the park.',
+        'Finished my project and my manager loved it.',
+        'The ice cream shop had my favourite flavour, so happy!',
+        'Slept well and woke up full of energy.',
+        'Grateful for the people in my life today.',
+        'Ran my fastest 5k ever, really proud of myself.'
+    ],
+    # objective entries are never scored.
+    'none': [
+        'Dentist at 3pm on Tuesday.',
+        'Shopping list: eggs, milk, bread, coffee.',
+        'Train times changed from Monday.'
+    ]
+}
+
+# share of entries with no sentiment.
+UNSCORED = 0.05
+
+
+def generate(n, seed=0, start=dt(2020, 1, 1), user_id=None):
+    """
+    Yields n realistic journal entries, oldest first, the same for the same seed. Moods drift over weeks with
+    day-to-day noise, there are zero to three entries a day at waking hours, and bodies match their sentiment.
+    """
+
+    rng = random.Random(seed)
+    day, written, mood = start, 0, 5.0
+
+    while written < n:
+        # a slow random walk pulled back towards the middle, plus a yearly cycle.
+        mood += rng.gauss(0, 0.4) + (5.0 - mood) * 0.05
+        seasonal = math.sin(2 * math.pi * day.timetuple().tm_yday / 365) * 0.8
+
+        times = sorted(timedelta(seconds=rng.randint(7 * 3600, 24 * 3600 - 1)) for _ in range(rng.choice([0, 1, 1, 1, 2, 2, 3])))
+
+        for time in times[:n - written]:
+            timestamp = day + time
+
+            if rng.random() < UNSCORED:
+                sentiment, phrases = None, PHRASES['none']
+            else:
+                sentiment = round(min(max(mood + seasonal + rng.gauss(0, 1.2), 0.0), 10.0), 2)
+                phrases = PHRASES['low'] if sentiment < 3.5 else PHRASES['high'] if sentiment > 6.5 else PHRASES['mid']
+
+            body = ' '.join(rng.choice(phrases) for _ in range(rng.randint(1, 6)))
+
+            yield {
+                'user_id': user_id,
+                'body': body,
+                'sentiment': sentiment,
+                'sentiment_status': SENTIMENT_DONE,
+                'timestamp': timestamp
+            }
+
+            written += 1
+
+        day += timedelta(days=1)
+
+
+def fill(journal, n, seed=0, batch_size=10000):
+    """
+    Empties a journal and fills it with n generated entries in batches, then rebuilds its mood stats and rollups.
+    """
+
+    manager = journal.manager
+    entries = generate(n, seed, user_id=journal.user_id)
+
+    if isinstance(journal, SQLiteJournal):
+        manager.collection.execute('DELETE FROM {log} WHERE user_id IS ?', (journal.user_id,))
+
+        for batch in chunked(entries, batch_size):
+            manager.collection.executemany(
+                'INSERT INTO {log} (id, user_id, body, sentiment, sentiment_status, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                [(str(ObjectId()), entry['user_id'], entry['body'], entry['sentiment'], entry['sentiment_status'], to_text(entry['timestamp']))
+                 for entry in batch]
+                )
+    else:
+        manager.collection.delete_many(manager.scope)
+
+        for batch in chunked(entries, batch_size):
+            manager.collection.insert_many(batch, ordered=False)
+
+    manager.counter.bump()
+    manager.stats.rebuild()
+    manager.rollups.rebuild()
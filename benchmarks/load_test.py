@@ -0,0 +1,101 @@
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# pages every visitor hits.
+PATHS = ['/', '/entries', '/moodtracker']
+
+
+def worker(host, port, path, deadline, latencies, errors, lock):
+    """
+    Requests a path over one keep-alive connection until the deadline, like a browser would.
+    """
+
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    mine, failed = [], 0
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+
+            if response.status != 200:
+                failed += 1
+                continue
+
+        except (OSError, http.client.HTTPException):
+            # the server closed the connection, open another.
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+
+        mine.append((time.perf_counter() - start) * 1000)
+
+    conn.close()
+
+    with lock:
+        latencies.extend(mine)
+        errors[0] += failed
+
+
+def load(url, path, concurrency, duration):
+    """
+    Returns latencies in ms and the error count for concurrency clients requesting a path for duration seconds.
+    """
+
+    parts = urlsplit(url)
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    threads = [threading.Thread(target=worker, args=(parts.hostname, parts.port or 80, path, deadline, latencies, errors, lock))
+               for _ in range(concurrency)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, errors[0]
+
+
+def report(path, latencies, errors, duration):
+    """
+    Prints throughput and latency percentiles for a path.
+    """
+
+    if not latencies:
+        print(f'{path:<14} no successful requests, {errors} errors')
+        return
+
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{path:<14} {len(latencies) / duration:8.1f} rps   p50 {statistics.median(latencies):8.1f} ms   '
+          f'p99 {p99:8.1f} ms   errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test a running Chill Pill server, e.g. one started with `python serve.py`.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='server to test')
+    parser.add_argument('--paths', nargs='+', default=PATHS, help='paths to request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50], help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per path and concurrency')
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        print(f'{concurrency} clients')
+
+        for path in args.paths:
+            latencies, errors = load(args.url, path, concurrency, args.duration)
+            report(path, latencies, errors, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import time
+from datetime import datetime as dt, timedelta
+
+import pandas as pd
+from flask import Flask
+
+from benchmarks import scratch_database
+from models import MongoDBConn, MoodTracker, AggregateMoodTracker
+from utils import chunked
+
+
+def seed(collection, n):
+    """
+    Fills the collection with n entries, one every 10 minutes, skipping it if it is already that size.
+    """
+
+    if collection.estimated_document_count() == n:
+        return
+
+    collection.drop()
+
+    start = dt(2020, 1, 1)
+    entries = ({
+        'body': f'Entry {i}',
+        'sentiment': (i * 37 % 1000) / 100,
+        'sentiment_status': 'done',
+        'timestamp': start + timedelta(minutes=10 * i)
+    } for i in range(n))
+
+    for batch in chunked(entries, 10000):
+        collection.insert_many(batch, ordered=False)
+
+    collection.create_index([('timestamp', -1), ('sentiment', 1)])
+
+
+def pandas_summary(tracker):
+    """
+    The pandas path: pull every entry, then clean, coerce and bucket by day in Python.
+    """
+
+    df = tracker.recent_data().reindex(columns=['timestamp', 'sentiment'])
+    df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce')
+    df = df.dropna(subset=['sentiment'])
+
+    days = df.groupby(df['timestamp'].dt.floor('D'))['sentiment'].agg(['count', 'mean', 'min', 'max'])
+
+    return days, df['sentiment'].agg(['count', 'mean', 'min', 'max'])
+
+
+def aggregate_summary(tracker):
+    """
+    The aggregation path: one $facet pipeline, only the summary is returned.
+    """
+
+    # skip the per-version memo, so every run hits MongoDB.
+    tracker._summary = (None, None)
+
+    return tracker.summary()
+
+
+def aggregate_plot(tracker):
+    """
+    The aggregation path for the plot, re-running the pipeline each time.
+    """
+
+    tracker._summary = (None, None)
+
+    return tracker.plot_mood()
+
+
+def measure(func, repeat):
+    """
+    Returns the best time of func in ms.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mood summary time, pandas vs MongoDB aggregation.')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/chillpill_bench', help='benchmark database, it is overwritten')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='journal sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best is reported')
+    args = parser.parse_args()
+
+    try:
+        scratch_database(args.uri)
+    except ValueError as e:
+        parser.error(str(e))
+
+    app = Flask(__name__)
+    app.config['MONGO_URI'] = args.uri
+    conn = MongoDBConn(app)
+
+    for n in args.sizes:
+        conn.collection = conn.db[f'log_{n}']
+        seed(conn.collection, n)
+
+        pandas_tracker = MoodTracker(conn)
+        aggregate_tracker = AggregateMoodTracker(conn)
+
+        results = [
+            ('pandas summary', measure(lambda: pandas_summary(pandas_tracker), args.repeat)),
+            ('aggregate summary', measure(lambda: aggregate_summary(aggregate_tracker), args.repeat)),
+            ('pandas plot', measure(pandas_tracker.plot_mood, args.repeat)),
+            ('aggregate plot', measure(lambda: aggregate_plot(aggregate_tracker), args.repeat))
+        ]
+
+        print(f'{n} entries')
+        for name, ms in results:
+            print(f'  {name:<18} {ms:10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
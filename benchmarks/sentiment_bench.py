@@ -0,0 +1,85 @@
+import argparse
+import statistics
+import time
+
+from benchmarks.stub_server import start_stub_server
+from sentiment import LocalSentiment, RemoteSentiment
+from utils import sentiment_analysis, sentiment_analysis_batch
+
+
+# subjective sample entries, all of which reach the backend.
+SAMPLES = [
+    'Feeling super sad today, because the ice cream shop ran out of my favourite flavour.',
+    "Had the very best time today in my CFG session, we learnt search and sort algorithms which I'm sure will come in super handy.",
+    'Ice cream store is back with my flavour, yay!!! SO happy! :)',
+    'Customers are so annoying, especially in the early mornings. I HATE my job!.',
+    "You know what? My job isn't so bad. I get to interact with so many different people and having a job is a blessing."
+]
+
+
+def time_backend(backend, n):
+    """
+    Returns per-entry latencies in milliseconds for n calls to sentiment_analysis.
+    """
+
+    latencies = []
+    for i in range(n):
+        text = SAMPLES[i % len(SAMPLES)]
+
+        start = time.perf_counter()
+        sentiment_analysis(text, backend=backend)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def time_batch(backend, n):
+    """
+    Returns the per-entry latency in milliseconds of scoring n entries in one batch.
+    """
+
+    texts = [SAMPLES[i % len(SAMPLES)] + f' #{i}' for i in range(n)]
+
+    start = time.perf_counter()
+    sentiment_analysis_batch(texts, backend=backend, use_cache=False)
+
+    return (time.perf_counter() - start) * 1000 / n
+
+
+def report(name, latencies):
+    """
+    Prints latency percentiles for a backend.
+    """
+
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{name:<8} mean {statistics.mean(latencies):8.3f} ms   '
+          f'p50 {statistics.median(latencies):8.3f} ms   p99 {p99:8.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-entry sentiment latency, local vs remote.')
+    parser.add_argument('-n', type=int, default=500, help='entries to score per backend')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='simulated remote API latency in seconds')
+    args = parser.parse_args()
+
+    # time the lexicon load separately from scoring.
+    start = time.perf_counter()
+    local = LocalSentiment()
+    print(f'local lexicon load: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    server, url = start_stub_server(args.latency)
+    try:
+        report('local', time_backend(local, args.n))
+        report('remote', time_backend(RemoteSentiment(url), args.n))
+
+        # batches skip per-call overhead and reuse one connection.
+        print(f'batch    local  {time_batch(local, args.n):8.3f} ms/entry   '
+              f'remote {time_batch(RemoteSentiment(url), args.n):8.3f} ms/entry')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from utils import HEAVY_MODULES
+
+
+# the repository root, so the app's modules import from the child process.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# imports the module, then prints the peak RSS, which is in bytes on macOS and KB elsewhere.
+CHILD = '''
+import resource, sys
+import {module}
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024))
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter. Returns the import time in ms, the top level imports
+    with their cumulative ms, the peak RSS in MB and the heavy modules loaded.
+    """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+
+    # lines look like `import time:   self [us] | cumulative | imported package`, nested imports are indented.
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+
+        if not name[1:].startswith(' '):
+            imports.append((name.strip(), int(cumulative) / 1000))
+
+    rss, loaded = result.stdout.splitlines()[-2:]
+
+    return sum(ms for _, ms in imports), imports, float(rss), [name for name in loaded.split(',') if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time and memory of a fresh worker, with optional budgets for CI.')
+    parser.add_argument('--module', default='routes', help='module a worker imports, routes needs MongoDB running')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters, the fastest is reported')
+    parser.add_argument('--top', type=int, default=10, help='slowest top level imports to list')
+    parser.add_argument('--budget-ms', type=float, help='fail if importing takes longer')
+    parser.add_argument('--budget-mb', type=float, help='fail if peak RSS is larger')
+    args = parser.parse_args()
+
+    total, imports, rss, loaded = min((measure(args.module) for _ in range(args.repeat)), key=lambda run: run[0])
+
+    print(f'import {args.module}: {total:.1f} ms, peak RSS {rss:.1f} MB')
+    for name, ms in sorted(imports, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'  {name:<30} {ms:8.1f} ms')
+
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+    failed = False
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f'Over budget: {total:.1f} ms > {args.budget_ms} ms')
+        failed = True
+    if args.budget_mb is not None and rss > args.budget_mb:
+        print(f'Over budget: {rss:.1f} MB > {args.budget_mb} MB')
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
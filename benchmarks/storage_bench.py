@@ -0,0 +1,128 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+
+from benchmarks import scratch_database
+from embedded import SQLiteConn, SQLiteJournal
+from models import MongoDBConn, Journal
+
+
+# journal sizes, in entries.
+SIZES = {
+    'small': 1000,
+    'medium': 20000
+}
+
+
+def mongo_journal(uri):
+    """
+    Returns a journal on an empty MongoDB benchmark database, or None if MongoDB isn't running.
+    """
+
+    app = Flask(__name__)
+    app.config['MONGO_URI'] = uri
+    app.config['MONGO_OPTIONS'] = {'serverSelectionTimeoutMS': 2000}
+
+    conn = MongoDBConn(app)
+
+    try:
+        scratch_database(uri)
+        conn.ping()
+
+    except Exception as e:
+        print('Please see error below.')
+        print(e)
+        return None
+
+    conn.db.client.drop_database(conn.db.name)
+
+    journal = Journal(conn, search_backend='memory')
+    journal.manager.ensure_indexes()
+
+    return journal
+
+
+def sqlite_journal(directory):
+    """
+    Returns a journal on a new SQLite file.
+    """
+
+    app = Flask(__name__)
+    app.config['SQLITE_PATH'] = os.path.join(directory, f'bench-{time.time_ns()}.db')
+
+    journal = SQLiteJournal(SQLiteConn(app))
+    journal.manager.ensure_indexes()
+
+    return journal
+
+
+def best(function, repeat):
+    """
+    Returns the fastest of repeat runs of a function, in ms.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return min(times)
+
+
+def run(journal, size, repeat, seed=0):
+    """
+    Times creating size entries, then reading them all and the mood analytics. Returns the times in ms.
+    """
+
+    rng = random.Random(seed)
+    manager, mood = journal.manager, journal.mood
+
+    start = time.perf_counter()
+    for i in range(size):
+        manager.create(f'Entry {i}: ' + ' '.join(rng.choice(['calm', 'tired', 'happy', 'busy', 'sad', 'okay']) for _ in range(30)),
+                       round(rng.uniform(0, 10), 2))
+    create = (time.perf_counter() - start) * 1000
+
+    return {
+        'create/entry': create / size,
+        'read_all': best(lambda: sum(1 for _ in manager.read_all()), repeat),
+        'summary': best(mood.summary, repeat),
+        'mood_data': best(mood.mood_data, repeat),
+        'rollups': best(lambda: mood.rollup_data('week'), repeat)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the MongoDB and SQLite journals on small and medium journals.')
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES), choices=list(SIZES), help='journal sizes to run')
+    parser.add_argument('--storage', nargs='+', default=['mongo', 'sqlite'], choices=['mongo', 'sqlite'], help='backends to run')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/chillpill_bench', help='database to use, it is dropped first')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each read, the fastest is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'storage':<8} {'size':>7} " + ' '.join(f'{name:>14}' for name in ['create/entry', 'read_all', 'summary', 'mood_data', 'rollups']))
+
+        for size_name in args.sizes:
+            for storage in args.storage:
+                journal = mongo_journal(args.mongo_uri) if storage == 'mongo' else sqlite_journal(directory)
+
+                if journal is None:
+                    continue
+
+                times = run(journal, SIZES[size_name], args.repeat)
+                print(f'{storage:<8} {SIZES[size_name]:>7} ' + ' '.join(f'{ms:11.3f} ms' for ms in times.values()))
+
+                if storage == 'mongo':
+                    journal.dbconn.db.client.drop_database(journal.dbconn.db.name)
+                else:
+                    journal.dbconn.collection.close()
+
+
+if __name__ == '__main__':
+    main()
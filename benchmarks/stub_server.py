@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubSentimentHandler(BaseHTTPRequestHandler):
+    """
+    Mimics the text-processing.com sentiment API with a fixed response.
+    """
+
+    # keep-alive, like the real API.
+    protocol_version = 'HTTP/1.1'
+
+    # send small responses straight away on kept-alive connections.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        text = parse_qs(self.rfile.read(length).decode()).get('text', [''])[0]
+
+        # simulated network and model latency.
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # a deterministic probability so results are stable between runs.
+        pos = (len(text) % 100) / 100
+        body = json.dumps({
+            'probability': {'neg': 1 - pos, 'neutral': 0.5, 'pos': pos},
+            'label': 'pos' if pos > 0.5 else 'neg'
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, *args):
+        # silence per-request logging.
+        pass
+
+
+def start_stub_server(latency=0.0):
+    """
+    Starts the stub API on a free local port. Returns the server and its sentiment url.
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSentimentHandler)
+    server.latency = latency
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    host, port = server.server_address
+    return server, f'http://{host}:{port}/api/sentiment/'
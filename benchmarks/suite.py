@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime as dt, timezone
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from benchmarks import scratch_database
+from benchmarks.generator import PHRASES, fill
+from embedded import SQLiteConn, SQLiteJournal
+from models import MongoDBConn, Journal
+from sentiment import SentimentBackend, get_cache, set_cache
+from utils import sentiment_analysis
+
+
+# benchmark groups, in the order they run.
+GROUPS = ['manager', 'mood', 'sentiment', 'routes']
+
+
+class StubSentiment(SentimentBackend):
+    """
+    Scores instantly, so only the subjectivity check and the code around the backend are timed.
+    """
+
+    name = 'stub'
+
+    def score(self, text):
+        """
+        Returns a made up score from the length of the text.
+        """
+
+        return (len(text) % 100) / 100
+
+
+def measure(func, repeat, number=1):
+    """
+    Runs func number times per repeat. Returns the time per call in ms of each repeat.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) * 1000 / number)
+
+    return times
+
+
+def summarise(times):
+    """
+    Returns the min, median, p95 and mean of per-call times.
+    """
+
+    times = sorted(times)
+
+    return {
+        'min_ms': times[0],
+        'median_ms': statistics.median(times),
+        'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+        'mean_ms': statistics.mean(times),
+        'repeat': len(times)
+    }
+
+
+def make_journal(storage, mongo_uri, directory):
+    """
+    Returns an uncached journal on the benchmark database, or None if MongoDB isn't running.
+    """
+
+    app = Flask(__name__)
+
+    if storage == 'sqlite':
+        app.config['SQLITE_PATH'] = os.path.join(directory, 'bench.db')
+        return SQLiteJournal(SQLiteConn(app))
+
+    app.config['MONGO_URI'] = mongo_uri
+    app.config['MONGO_OPTIONS'] = {'serverSelectionTimeoutMS': 2000}
+    conn = MongoDBConn(app)
+
+    try:
+        scratch_database(mongo_uri)
+        conn.ping()
+
+    except Exception as e:
+        print('Please see error below.')
+        print(e)
+        return None
+
+    conn.db.client.drop_database(conn.db.name)
+
+    journal = Journal(conn)
+    journal.manager.ensure_indexes()
+
+    return journal
+
+
+def manager_benchmarks(journal, rng):
+    """
+    JournalManager reads and writes.
+    """
+
+    manager = journal.manager
+    ids = [entry.id for entry in manager.read_range(limit=500, newest_first=False)] + [entry.id for entry in manager.read_range(limit=500)]
+
+    return {
+        'read_all': lambda: sum(1 for _ in manager.read_all()),
+        'read_one': lambda: manager.read_one(rng.choice(ids)),
+        'read_page': lambda: manager.read_page(20),
+        'create': lambda: manager.create(rng.choice(PHRASES['mid']), round(rng.uniform(0, 10), 2))
+    }
+
+
+def mood_benchmarks(journal, rng):
+    """
+    MoodTracker analytics, uncached.
+    """
+
+    mood = journal.mood
+
+    return {
+        'plot_mood': mood.plot_mood,
+        'min_sentiments': mood.min_sentiments,
+        'max_sentiments': mood.max_sentiments,
+        'av_sentiment': mood.av_sentiment
+    }
+
+
+def sentiment_benchmarks(journal, rng):
+    """
+    sentiment_analysis with a stub backend.
+    """
+
+    backend = StubSentiment()
+    texts = [' '.join(rng.choice(PHRASES['low'] + PHRASES['high']) for _ in range(3)) for _ in range(1000)]
+
+    return {
+        'sentiment_analysis': lambda: sentiment_analysis(rng.choice(texts), backend=backend)
+    }
+
+
+def route_benchmarks(journal, rng):
+    """
+    Whole requests through the Flask test client, against the benchmark journal.
+    """
+
+    import routes
+
+    client = routes.app.test_client()
+    after = journal.manager.read_page(20)['next']
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, f'{url}: {response.status_code}'
+
+    return {
+        'GET /': lambda: get('/'),
+        'GET /entries': lambda: get('/entries'),
+        'GET /entries?after': lambda: get(f'/entries?after={after}'),
+        'GET /moodtracker': lambda: get('/moodtracker'),
+        'GET /api/mood': lambda: get('/api/mood'),
+        'GET /search': lambda: get('/search?q=happy'),
+        'POST /journal': lambda: client.post('/journal', data={'entry': rng.choice(PHRASES['high'])})
+    }
+
+
+BENCHMARKS = {
+    'manager': manager_benchmarks,
+    'mood': mood_benchmarks,
+    'sentiment': sentiment_benchmarks,
+    'routes': route_benchmarks
+}
+
+
+def run(journal, size, groups, repeat, number, seed=0):
+    """
+    Fills the journal with size entries and runs the benchmark groups. Returns a result per benchmark.
+    """
+
+    fill(journal, size, seed)
+
+    rng = random.Random(seed)
+    results = []
+
+    for group in groups:
+        # routes read the benchmark journal, and entries aren't scored in the background.
+        patches = [patch('routes.journal', journal), patch('routes.pipeline', MagicMock())] if group == 'routes' else []
+
+        for patcher in patches:
+            patcher.start()
+
+        try:
+            for name, func in BENCHMARKS[group](journal, rng).items():
+                # read_all grows with the journal, so it's run once per repeat.
+                calls = 1 if name == 'read_all' else number
+                func()
+
+                result = {'group': group, 'name': name, 'size': size, **summarise(measure(func, repeat, calls))}
+                results.append(result)
+                print(f"{group:<10} {name:<22} {size:>8} {result['median_ms']:10.3f} ms   p95 {result['p95_ms']:10.3f} ms")
+
+        finally:
+            for patcher in patches:
+                patcher.stop()
+
+    return results
+
+
+def metadata(args):
+    """
+    Returns what a run was measured on, so results from different machines aren't compared by mistake.
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'time': dt.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'storage': args.storage,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'number': args.number
+    }
+
+
+def compare(old, new, threshold):
+    """
+    Prints the change in median time of each benchmark in both runs. Returns the benchmarks more than
+    threshold percent slower.
+    """
+
+    before = {(result['group'], result['name'], result['size']): result for result in old['results']}
+    slower = []
+
+    for result in new['results']:
+        key = (result['group'], result['name'], result['size'])
+
+        if key not in before:
+            continue
+
+        change = (result['median_ms'] / before[key]['median_ms'] - 1) * 100
+        print(f'{key[0]:<10} {key[1]:<22} {key[2]:>8} {before[key]["median_ms"]:10.3f} ms -> {result["median_ms"]:10.3f} ms  {change:+7.1f}%')
+
+        if change > threshold:
+            slower.append(key)
+
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the journal, mood tracker, sentiment scoring and routes on generated journals.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='journal sizes, in entries, up to 1000000')
+    parser.add_argument('--groups', nargs='+', default=GROUPS, choices=GROUPS, help='benchmarks to run, routes needs config.py to load')
+    parser.add_argument('--storage', default='mongo', choices=['mongo', 'sqlite'], help='where the generated journal is kept')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/chillpill_bench', help='database to use, it is dropped first')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the generated journals')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs of each benchmark')
+    parser.add_argument('--number', type=int, default=10, help='calls per timed run')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--max-regression', type=float, default=20, help='percent slower than --compare that fails the run')
+    args = parser.parse_args()
+
+    # the app sets up its own sentiment cache on import.
+    if 'routes' in args.groups:
+        import routes
+
+    # scoring is timed without the sentiment cache.
+    cache = get_cache()
+    set_cache(None)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_journal(args.storage, args.mongo_uri, directory)
+
+            if journal is None:
+                sys.exit(1)
+
+            results = []
+            for size in args.sizes:
+                results += run(journal, size, args.groups, args.repeat, args.number, args.seed)
+
+            if args.storage == 'mongo':
+                journal.dbconn.db.client.drop_database(journal.dbconn.db.name)
+            else:
+                journal.dbconn.collection.close()
+
+    finally:
+        set_cache(cache)
+
+    report = {'meta': metadata(args), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(json.load(f), report, args.max_regression)
+
+        if slower:
+            print(f'{len(slower)} benchmarks more than {args.max_regression}% slower')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+from datetime import datetime as dt
+
+from benchmarks import scratch_database
+from benchmarks.generator import generate, fill
+from benchmarks.suite import compare, make_journal, run
+
+
+class TestGenerator(TestCase):
+    """
+    Tests the synthetic journal generator.
+    """
+
+    def test_seeded(self):
+        """
+        Tests the same seed gives the same journal, and another seed a different one.
+        """
+
+        self.assertEqual(list(generate(100, seed=1)), list(generate(100, seed=1)))
+        self.assertNotEqual(list(generate(100, seed=1)), list(generate(100, seed=2)))
+
+
+    def test_entries(self):
+        """
+        Tests entries are oldest first, scored between 0 and 10, with some left unscored.
+        """
+
+        entries = list(generate(2000, user_id='alice'))
+        sentiments = [entry['sentiment'] for entry in entries if entry['sentiment'] is not None]
+
+        self.assertEqual(len(entries), 2000)
+        self.assertEqual(sorted(entries, key=lambda entry: entry['timestamp']), entries)
+        self.assertTrue(all(0 <= sentiment <= 10 for sentiment in sentiments))
+        self.assertLess(len(sentiments), 2000)
+        self.assertEqual({entry['user_id'] for entry in entries}, {'alice'})
+        self.assertGreaterEqual(entries[0]['timestamp'], dt(2020, 1, 1))
+
+
+    def test_fill(self):
+        """
+        Tests a journal is refilled with exactly n entries, with its stats rebuilt.
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_journal('sqlite', None, directory)
+
+            fill(journal, 300)
+            fill(journal, 200)
+
+            self.assertEqual(sum(1 for _ in journal.manager.read_all()), 200)
+            self.assertEqual(journal.manager.stats.read()['count'], sum(entry['sentiment'] is not None for entry in generate(200)))
+
+            journal.dbconn.collection.close()
+
+
+class TestSuite(TestCase):
+    """
+    Tests running and comparing benchmarks.
+    """
+
+    def test_run(self):
+        """
+        Tests each benchmark reports its timings.
+        """
+
+        with tempfile.TemporaryDirectory() as directory, patch('builtins.print'):
+            journal = make_journal('sqlite', None, directory)
+            results = run(journal, 100, ['manager', 'sentiment'], repeat=2, number=1)
+            journal.dbconn.collection.close()
+
+        self.assertEqual([result['name'] for result in results], ['read_all', 'read_one', 'read_page', 'create', 'sentiment_analysis'])
+        self.assertTrue(all(result['size'] == 100 and result['min_ms'] <= result['median_ms'] for result in results))
+
+
+    def test_app_database(self):
+        """
+        Tests benchmarks refuse to drop the app's database, named or fallen back to.
+        """
+
+        self.assertEqual(scratch_database('mongodb://localhost:27017/chillpill_bench'), 'chillpill_bench')
+
+        for uri in ['mongodb://localhost:27017', 'mongodb://localhost:27017/chillpill']:
+            with self.assertRaises(ValueError):
+                scratch_database(uri)
+
+            # it stops before connecting, let alone dropping anything.
+            with patch('builtins.print'), patch('models.MongoDBConn.ping') as ping:
+                self.assertIsNone(make_journal('mongo', uri, None))
+
+            ping.assert_not_called()
+
+
+    def test_compare(self):
+        """
+        Tests benchmarks slower than the threshold are returned, and new ones are skipped.
+        """
+
+        old = {'results': [{'group': 'mood', 'name': 'plot_mood', 'size': 1000, 'median_ms': 10.0}]}
+        new = {'results': [
+            {'group': 'mood', 'name': 'plot_mood', 'size': 1000, 'median_ms': 13.0},
+            {'group': 'mood', 'name': 'av_sentiment', 'size': 1000, 'median_ms': 1.0}
+            ]}
+
+        with patch('builtins.print'):
+            self.assertEqual(compare(old, new, 20), [('mood', 'plot_mood', 1000)])
+            self.assertEqual(compare(old, new, 50), [])
+
+
+if __name__ == '__main__':
+    main()
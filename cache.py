@@ -0,0 +1,343 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime as dt, timedelta
+from flask import g, has_request_context
+
+
+# returned by get() when a key isn't cached, so None can be cached.
+MISSING = object()
+
+
+def request_versions():
+    """
+    Returns the write counter versions read during the current request, or None outside a request.
+    A page reading several cached results then reads each shared counter once.
+    """
+
+    if not has_request_context():
+        return None
+
+    return g.setdefault('write_versions', {})
+
+
+class LRUCache:
+    """
+    In-memory cache with a bounded size, least recently used eviction and an optional time to live.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    def get(self, key, default=MISSING):
+        """
+        Returns a cached value, or default if it is missing or expired.
+        """
+
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+
+            except KeyError:
+                self.misses += 1
+                return default
+
+            # drop expired values.
+            if expires is not None and expires <= self.clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            # mark as most recently used.
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    def set(self, key, value):
+        """
+        Caches a value, evicting the least recently used value when full.
+        """
+
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+    def delete(self, key):
+        """
+        Removes a value from the cache.
+        """
+
+        with self._lock:
+            self._data.pop(key, None)
+
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+
+        with self._lock:
+            self._data.clear()
+
+
+    def stats(self):
+        """
+        Returns hit/miss counters.
+        """
+
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+class MongoCache:
+    """
+    Persistent cache stored in a MongoDB collection, shared between processes.
+    """
+
+    def __init__(self, collection, ttl=None):
+        self.collection = collection
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+
+    def ensure_indexes(self):
+        """
+        Lets MongoDB expire old values in the background.
+        """
+
+        if self.ttl is not None:
+            self.collection.create_index('created', expireAfterSeconds=int(self.ttl))
+
+
+    def get(self, key, default=MISSING):
+        """
+        Returns a cached value, or default if it is missing or expired.
+        """
+
+        query = {'_id': key}
+
+        # the TTL monitor only runs once a minute, so filter out stale values too.
+        if self.ttl is not None:
+            query['created'] = {'$gt': dt.now() - timedelta(seconds=self.ttl)}
+
+        doc = self.collection.find_one(query, {'value': 1})
+
+        if doc is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return doc['value']
+
+
+    def set(self, key, value):
+        """
+        Caches a value.
+        """
+
+        self.collection.update_one(
+            {'_id': key},
+            {'$set': {'value': value, 'created': dt.now()}},
+            upsert=True
+            )
+
+
+    def delete(self, key):
+        """
+        Removes a value from the cache.
+        """
+
+        self.collection.delete_one({'_id': key})
+
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+
+        self.collection.delete_many({})
+
+
+    def stats(self):
+        """
+        Returns hit/miss counters.
+        """
+
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class TieredCache:
+    """
+    Checks a fast cache before a slower persistent one, copying persistent hits into the fast tier.
+    """
+
+    def __init__(self, memory, persistent=None):
+        self.memory = memory
+        self.persistent = persistent
+
+
+    def get(self, key, default=MISSING):
+        """
+        Returns a cached value from the first tier that has it.
+        """
+
+        value = self.memory.get(key)
+
+        if value is MISSING and self.persistent is not None:
+            value = self.persistent.get(key)
+
+            if value is not MISSING:
+                self.memory.set(key, value)
+
+        return default if value is MISSING else value
+
+
+    def set(self, key, value):
+        """
+        Caches a value in every tier.
+        """
+
+        self.memory.set(key, value)
+
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+
+    def delete(self, key):
+        """
+        Removes a value from every tier.
+        """
+
+        self.memory.delete(key)
+
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+
+    def clear(self):
+        """
+        Empties every tier.
+        """
+
+        self.memory.clear()
+
+        if self.persistent is not None:
+            self.persistent.clear()
+
+
+    def stats(self):
+        """
+        Returns hit/miss counters for each tier.
+        """
+
+        stats = {'memory': self.memory.stats()}
+
+        if self.persistent is not None:
+            stats['persistent'] = self.persistent.stats()
+
+        return stats
+
+
+class WriteCounter:
+    """
+    Counts writes to a collection in this process, so cached results can be versioned by it.
+    Only for single-process tools and tests: other processes never see its writes.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+
+    def get(self):
+        """
+        Returns the current version.
+        """
+
+        return self.value
+
+
+    def bump(self):
+        """
+        Records a write.
+        """
+
+        with self._lock:
+            self.value += 1
+
+
+    def for_user(self, user_id):
+        """
+        Returns a counter for one user's writes, which only that user's cached results are versioned by.
+        """
+
+        return self if user_id is None else WriteCounter()
+
+
+class MongoWriteCounter:
+    """
+    Counts writes to a collection in MongoDB, shared by every process.
+    """
+
+    def __init__(self, collection, name):
+        self.collection = collection
+        self.name = name
+
+
+    def get(self):
+        """
+        Returns the current version, read once per request.
+        """
+
+        versions = request_versions()
+        key = (self.collection.full_name, self.name)
+
+        if versions is not None and key in versions:
+            return versions[key]
+
+        doc = self.collection.find_one({'_id': self.name}, {'version': 1})
+        version = doc['version'] if doc else 0
+
+        if versions is not None:
+            versions[key] = version
+
+        return version
+
+
+    def bump(self):
+        """
+        Records a write.
+        """
+
+        self.collection.update_one({'_id': self.name}, {'$inc': {'version': 1}}, upsert=True)
+
+        # the request that wrote reads the new version.
+        versions = request_versions()
+        if versions is not None:
+            versions.pop((self.collection.full_name, self.name), None)
+
+
+    def for_user(self, user_id):
+        """
+        Returns a counter for one user's writes, which only that user's cached results are versioned by.
+        """
+
+        return self if user_id is None else MongoWriteCounter(self.collection, f'{self.name}:{user_id}')
@@ -0,0 +1,197 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from flask import Flask
+
+from cache import LRUCache, MongoCache, TieredCache, WriteCounter, MongoWriteCounter, MISSING
+from config import client
+
+
+class FakeClock:
+    """
+    A clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(TestCase):
+    """
+    Tests the in-memory cache.
+    """
+
+    def test_get_set(self):
+        """
+        Tests cached values are returned, including None.
+        """
+
+        cache = LRUCache()
+        cache.set('a', None)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIs(cache.get('b'), MISSING)
+
+
+    def test_eviction(self):
+        """
+        Tests the least recently used value is evicted when full.
+        """
+
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        # use 'a' so 'b' becomes the least recently used.
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIs(cache.get('b'), MISSING)
+
+
+    def test_ttl(self):
+        """
+        Tests values expire after their time to live.
+        """
+
+        clock = FakeClock()
+        cache = LRUCache(ttl=10, clock=clock)
+        cache.set('a', 1)
+
+        clock.now = 9
+        self.assertEqual(cache.get('a'), 1)
+
+        clock.now = 10
+        self.assertIs(cache.get('a'), MISSING)
+
+
+    def test_stats(self):
+        """
+        Tests hits and misses are counted.
+        """
+
+        cache = LRUCache()
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+
+class TestMongoCache(TestCase):
+    """
+    Tests the persistent cache.
+    """
+
+    def setUp(self):
+        """
+        Uses a test collection, emptied for each test.
+        """
+
+        self.cache = MongoCache(client['testdb']['sentiment_cache'])
+        self.cache.clear()
+
+
+    def test_get_set(self):
+        """
+        Tests values survive a new cache instance.
+        """
+
+        self.cache.set('a', '5.00')
+
+        self.assertEqual(MongoCache(self.cache.collection).get('a'), '5.00')
+        self.assertIs(self.cache.get('b'), MISSING)
+
+
+class TestTieredCache(TestCase):
+    """
+    Tests the two tier cache.
+    """
+
+    def test_promotion(self):
+        """
+        Tests persistent hits are copied into memory.
+        """
+
+        persistent = LRUCache()
+        persistent.set('a', 1)
+        cache = TieredCache(LRUCache(), persistent)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.memory.get('a'), 1)
+        self.assertIsNone(cache.get('b', None))
+
+
+class TestWriteCounters(TestCase):
+    """
+    Tests the write counters that version cached results.
+    """
+
+    def test_counters(self):
+        """
+        Tests both counters start at 0 and count writes.
+        """
+
+        meta = client['testdb']['meta']
+        meta.delete_many({})
+
+        for counter in [WriteCounter(), MongoWriteCounter(meta, 'log')]:
+            self.assertEqual(counter.get(), 0)
+            counter.bump()
+            counter.bump()
+            self.assertEqual(counter.get(), 2)
+
+        # the mongo counter is shared by every instance.
+        self.assertEqual(MongoWriteCounter(meta, 'log').get(), 2)
+
+
+    def test_user_counters(self):
+        """
+        Tests each user's writes are counted separately, and the default user keeps the journal's counter.
+        """
+
+        meta = client['testdb']['meta']
+        meta.delete_many({})
+
+        for counter in [WriteCounter(), MongoWriteCounter(meta, 'log')]:
+            self.assertIs(counter.for_user(None), counter)
+
+            user = counter.for_user('alice')
+            user.bump()
+
+            self.assertEqual(user.get(), 1)
+            self.assertEqual(counter.get(), 0)
+
+        self.assertEqual(MongoWriteCounter(meta, 'log').for_user('alice').get(), 1)
+
+
+    def test_request_reads(self):
+        """
+        Tests the mongo counter is read once per request, and again after a write in it.
+        """
+
+        meta = client['testdb']['meta']
+        meta.delete_many({})
+        counter = MongoWriteCounter(meta, 'log')
+
+        with patch.object(meta, 'find_one', wraps=meta.find_one) as find_one:
+            with Flask(__name__).test_request_context():
+                self.assertEqual([counter.get() for _ in range(3)], [0, 0, 0])
+                self.assertEqual(find_one.call_count, 1)
+
+                counter.bump()
+                self.assertEqual(counter.get(), 1)
+                self.assertEqual(find_one.call_count, 2)
+
+            # outside a request every read goes to the database.
+            counter.get()
+            counter.get()
+            self.assertEqual(find_one.call_count, 4)
+
+
+if __name__ == '__main__':
+    main()
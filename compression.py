@@ -0,0 +1,75 @@
+import gzip
+from flask import request
+
+# brotli is optional, gzip is used without it.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# dynamic responses worth compressing.
+COMPRESSIBLE = {'text/html', 'application/json'}
+
+# smaller bodies don't shrink enough to pay for the CPU.
+MIN_SIZE = 500
+
+
+def choose_encoding(accept_encodings):
+    """
+    Returns the best encoding the client accepts, or None.
+    """
+
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+
+    if accept_encodings['gzip']:
+        return 'gzip'
+
+
+def compress(data, encoding, level=6):
+    """
+    Compresses a response body. Levels are gzip levels (1 - 9).
+    """
+
+    if encoding == 'br':
+        # brotli quality runs 0 - 11, mid levels match gzip 6 for speed.
+        return brotli.compress(data, quality=min(level - 1, 11))
+
+    return gzip.compress(data, level)
+
+
+def compress_response(response, level=6, min_size=MIN_SIZE):
+    """
+    Compresses an HTML or JSON response if the client accepts it.
+    """
+
+    # leave files, streams, empty and already encoded responses alone.
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(request.accept_encodings)
+    data = response.get_data()
+
+    if encoding is None or len(data) < min_size:
+        return response
+
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+
+    return response
+
+
+def init_compression(app, level=6, min_size=MIN_SIZE):
+    """
+    Compresses the app's HTML and JSON responses.
+    """
+
+    @app.after_request
+    def compress_after_request(response):
+        return compress_response(response, level, min_size)
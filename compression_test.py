@@ -0,0 +1,92 @@
+import gzip
+from unittest import TestCase, main
+from flask import Flask, jsonify, send_file
+from io import BytesIO
+
+import compression
+from compression import init_compression
+
+
+class TestCompression(TestCase):
+    """
+    Tests HTML and JSON responses are compressed.
+    """
+
+    def setUp(self):
+        app = Flask(__name__)
+        init_compression(app, min_size=100)
+
+        self.html = '<p>entry</p>' * 100
+
+        app.add_url_rule('/html', 'html', lambda: self.html)
+        app.add_url_rule('/short', 'short', lambda: '<p>entry</p>')
+        app.add_url_rule('/json', 'json', lambda: jsonify(entries=['entry'] * 100))
+        app.add_url_rule('/text', 'text', lambda: (self.html, {'Content-Type': 'text/plain'}))
+        app.add_url_rule('/file', 'file', lambda: send_file(BytesIO(self.html.encode()), mimetype='text/html'))
+
+        self.client = app.test_client()
+
+
+    def test_gzip_html(self):
+        """
+        Tests HTML is gzipped when the client accepts it.
+        """
+
+        response = self.client.get('/html', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(gzip.decompress(response.data).decode(), self.html)
+
+
+    def test_gzip_json(self):
+        """
+        Tests JSON is gzipped when the client accepts it.
+        """
+
+        response = self.client.get('/json', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'"entries"', gzip.decompress(response.data))
+
+
+    def test_not_accepted(self):
+        """
+        Tests responses are left alone when the client doesn't accept compression.
+        """
+
+        response = self.client.get('/html')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(response.get_data(as_text=True), self.html)
+
+
+    def test_skipped(self):
+        """
+        Tests small bodies, other types and files aren't compressed.
+        """
+
+        for url in ['/short', '/text', '/file']:
+            response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+            self.assertNotIn('Content-Encoding', response.headers, url)
+
+
+    def test_brotli(self):
+        """
+        Tests brotli is preferred when installed, and gzip is used without it.
+        """
+
+        response = self.client.get('/html', headers={'Accept-Encoding': 'gzip, br'})
+
+        if compression.brotli is None:
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        else:
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(compression.brotli.decompress(response.data).decode(), self.html)
+
+
+if __name__ == '__main__':
+    main()
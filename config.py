@@ -1,18 +1,129 @@
-
-from pymongo import MongoClient
+from db import get_client, get_database, init_indexes
 from models import MongoDBConn, Journal
+from embedded import SQLiteConn, SQLiteJournal, SQLiteWriteCounter
+from pipeline import SentimentPipeline
+from cache import LRUCache, MongoCache, TieredCache, MongoWriteCounter
+from sentiment import create_backend, set_backend, set_cache, REMOTE_URL
+from assets import Assets, plotly_js_path
+from compression import init_compression
+from metrics import init_metrics
 from flask import Flask
 
 
-# database and collection setup.
-client = MongoClient('mongodb://localhost:27017/')
-chilldb = client['chillpill']
-instance = chilldb['log']
-
 # setup flask server.
 app = Flask(__name__)
 app.config['MONGO_URI'] = 'mongodb://localhost:27017/chillpill'
 
-# send the app to the MongoDB and Journal.
-mongo_conn = MongoDBConn(app)
-journal = Journal(mongo_conn)
+# where the journal is kept: 'mongo', or 'sqlite' for an embedded database file on single-node deployments.
+app.config['STORAGE'] = 'mongo'
+app.config['SQLITE_PATH'] = 'chillpill.db'
+
+# settings for the one client every part of the app shares, on top of db.POOL_OPTIONS.
+app.config['MONGO_OPTIONS'] = {
+    'maxPoolSize': 50,
+    'waitQueueTimeoutMS': 2000,
+    'serverSelectionTimeoutMS': 5000,
+    'readPreference': 'primary',
+    'w': 1
+}
+
+# seconds /healthz waits for MongoDB to answer a ping.
+app.config['HEALTH_TIMEOUT'] = 1
+
+# database and collection setup, on the shared client.
+client = get_client(app.config['MONGO_URI'], **app.config['MONGO_OPTIONS'])
+chilldb = get_database(app.config['MONGO_URI'], **app.config['MONGO_OPTIONS'])
+instance = chilldb['log']
+
+# sentiment backend: 'local' scores in-process, 'remote' calls the text-processing.com API.
+app.config['SENTIMENT_BACKEND'] = 'local'
+app.config['SENTIMENT_OPTIONS'] = {
+    'remote': {'url': REMOTE_URL, 'timeout': 10}
+}
+
+# sentiment result cache, keyed on a hash of the entry text. ttl is in seconds.
+app.config['SENTIMENT_CACHE_SIZE'] = 10000
+app.config['SENTIMENT_CACHE_TTL'] = 7 * 24 * 60 * 60
+app.config['SENTIMENT_CACHE_PERSIST'] = False
+
+# html and json responses are compressed at this gzip level, unless smaller than min size bytes.
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_MIN_SIZE'] = 500
+
+# background threads scoring new entries, 0 scores entries before responding.
+app.config['SENTIMENT_WORKERS'] = 4
+
+# mood analytics cache: 'memory' is per process, 'mongo' is shared by every worker, None disables it.
+# either way results are versioned by a write counter every worker shares.
+app.config['MOOD_CACHE'] = 'memory'
+app.config['MOOD_CACHE_TTL'] = 24 * 60 * 60
+
+# mood analytics: 'pandas' summarises entries in python, 'aggregate' in one MongoDB aggregation (MongoDB 5.0+).
+app.config['MOOD_BACKEND'] = 'pandas'
+app.config['MOOD_OPTIONS'] = {
+    'aggregate': {'unit': 'day'}
+}
+
+# entry search: 'text' uses a MongoDB text index, 'memory' an in-process index for test databases.
+app.config['SEARCH_BACKEND'] = 'text'
+
+# send the app to the DB and Journal.
+if app.config['STORAGE'] == 'sqlite':
+    dbconn, journal_class = SQLiteConn(app), SQLiteJournal
+elif app.config['STORAGE'] == 'mongo':
+    dbconn, journal_class = MongoDBConn(app), Journal
+else:
+    raise ValueError(f"Unknown storage: {app.config['STORAGE']}")
+
+# cached mood results are versioned by a write counter in the database, so a write in one worker
+# invalidates what every other worker has cached.
+if app.config['STORAGE'] == 'sqlite':
+    counter = SQLiteWriteCounter(dbconn.collection)
+else:
+    counter = MongoWriteCounter(chilldb['meta'], 'log')
+
+if app.config['MOOD_CACHE'] == 'mongo':
+    mood_cache = MongoCache(chilldb['mood_cache'], app.config['MOOD_CACHE_TTL'])
+elif app.config['MOOD_CACHE'] == 'memory':
+    mood_cache = LRUCache(64, app.config['MOOD_CACHE_TTL'])
+else:
+    mood_cache = None
+
+mood_backend = app.config['MOOD_BACKEND']
+journal = journal_class(dbconn, mood_cache, counter, mood_backend, app.config['MOOD_OPTIONS'].get(mood_backend), app.config['SEARCH_BACKEND'])
+
+# load the sentiment backend once at startup.
+backend_name = app.config['SENTIMENT_BACKEND']
+set_backend(create_backend(backend_name, **app.config['SENTIMENT_OPTIONS'].get(backend_name, {})))
+
+# cache sentiment results, optionally persisted next to the log collection.
+sentiment_cache = TieredCache(LRUCache(app.config['SENTIMENT_CACHE_SIZE'], app.config['SENTIMENT_CACHE_TTL']))
+
+if app.config['SENTIMENT_CACHE_PERSIST']:
+    sentiment_cache.persistent = MongoCache(chilldb['sentiment_cache'], app.config['SENTIMENT_CACHE_TTL'])
+
+set_cache(sentiment_cache)
+
+# create the indexes the journal queries and persistent caches rely on, once each worker is serving.
+index_steps = [journal.manager.ensure_indexes]
+
+if app.config['MOOD_CACHE'] == 'mongo':
+    index_steps.append(mood_cache.ensure_indexes)
+
+if app.config['SENTIMENT_CACHE_PERSIST']:
+    index_steps.append(sentiment_cache.persistent.ensure_indexes)
+
+init_indexes(app, index_steps)
+
+# score entries in the background after they are saved.
+pipeline = SentimentPipeline(journal.manager, app.config['SENTIMENT_WORKERS'])
+
+# serve plotly.js once from static/ rather than inlining it in every mood page.
+assets = Assets(app)
+assets.publish('plotly.js', plotly_js_path())
+
+# time every request for /metrics, including compression.
+init_metrics(app)
+
+# compress html and json responses.
+init_compression(app, app.config['COMPRESS_LEVEL'], app.config['COMPRESS_MIN_SIZE'])
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from pymongo import MongoClient, uri_parser
+from pymongo.monitoring import CommandListener, ConnectionPoolListener
+
+import metrics
+
+
+# pool settings used unless config overrides them.
+POOL_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 5 * 60 * 1000,
+    'waitQueueTimeoutMS': 2000,
+    'connectTimeoutMS': 5000,
+    'serverSelectionTimeoutMS': 5000,
+    'socketTimeoutMS': 30000,
+    'readPreference': 'primary',
+    'w': 1
+}
+
+
+class PoolStats(ConnectionPoolListener):
+    """
+    Counts connection pool events for every client created here, per server address.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+
+    def _count(self, event, name, by=1):
+        with self._lock:
+            self.counts[f'{event.address[0]}:{event.address[1]}'][name] += by
+
+
+    def pool_created(self, event):
+        self._count(event, 'pools_created')
+
+
+    def pool_ready(self, event):
+        pass
+
+
+    def pool_cleared(self, event):
+        self._count(event, 'pools_cleared')
+
+
+    def pool_closed(self, event):
+        pass
+
+
+    def connection_created(self, event):
+        self._count(event, 'connections_created')
+        self._count(event, 'open')
+
+
+    def connection_ready(self, event):
+        pass
+
+
+    def connection_closed(self, event):
+        self._count(event, 'connections_closed')
+        self._count(event, 'open', -1)
+
+
+    def connection_check_out_started(self, event):
+        self._count(event, 'waiting')
+
+
+    def connection_check_out_failed(self, event):
+        self._count(event, 'checkout_failures')
+        self._count(event, 'waiting', -1)
+
+
+    def connection_checked_out(self, event):
+        self._count(event, 'checkouts')
+        self._count(event, 'waiting', -1)
+        self._count(event, 'in_use')
+
+
+    def connection_checked_in(self, event):
+        self._count(event, 'in_use', -1)
+
+
+    def snapshot(self):
+        """
+        Returns the counters per server address. open, in_use and waiting are current, the rest are totals.
+        """
+
+        with self._lock:
+            return {address: dict(counts) for address, counts in self.counts.items()}
+
+
+class CommandStats(CommandListener):
+    """
+    Counts the commands every client created here sends, e.g. find or update, and how many failed.
+    Their round trip times are exported on /metrics.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+
+    def started(self, event):
+        with self._lock:
+            self.counts[event.command_name] += 1
+
+
+    def succeeded(self, event):
+        command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+
+    def failed(self, event):
+        with self._lock:
+            self.failures[event.command_name] += 1
+
+        command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        command_failures.inc(event.command_name)
+
+
+    def snapshot(self):
+        """
+        Returns the commands sent so far by name.
+        """
+
+        with self._lock:
+            return dict(self.counts)
+
+
+# pool events and commands from every shared client.
+pool_stats = PoolStats()
+command_stats = CommandStats()
+
+# command round trips and connections in use, for /metrics.
+command_duration = metrics.Histogram('chillpill_mongo_command_duration_seconds', 'MongoDB command round trips, by command.', ('command',))
+command_failures = metrics.Counter('chillpill_mongo_command_failures_total', 'Failed MongoDB commands, by command.', ('command',))
+pool_connections = metrics.Gauge(
+    'chillpill_mongo_pool_connections', 'MongoDB connections open, in use and waited for, by server.', ('address', 'state'),
+    lambda: {(address, state): counts.get(state, 0) for address, counts in pool_stats.snapshot().items() for state in ('open', 'in_use', 'waiting')}
+    )
+
+# the app's database, used when a URI doesn't name one.
+DEFAULT_DATABASE = 'chillpill'
+
+# one client per server and settings, shared by the whole process.
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(uri, **options):
+    """
+    Returns the process's client for a server, creating it on first use with the pool settings.
+    The client doesn't connect until its first operation, so it is safe to create before a
+    pre-fork server forks its workers; PyMongo resets its pools in each forked child.
+    """
+
+    options = {**POOL_OPTIONS, **options}
+    parsed = uri_parser.parse_uri(uri)
+
+    # clients for different databases on the same server share a pool.
+    key = (tuple(parsed['nodelist']), parsed['username'], tuple(sorted(options.items())))
+
+    with _lock:
+        client = _clients.get(key)
+
+        if client is None:
+            client = _clients[key] = MongoClient(uri, connect=False, event_listeners=[pool_stats, command_stats], **options)
+
+    return client
+
+
+def get_database(uri, default=DEFAULT_DATABASE, **options):
+    """
+    Returns the database named in a URI, using the shared client.
+    """
+
+    name = uri_parser.parse_uri(uri)['database'] or default
+
+    return get_client(uri, **options)[name]
+
+
+def close_clients():
+    """
+    Closes every shared client, e.g. when a worker exits.
+    """
+
+    with _lock:
+        for client in _clients.values():
+            client.close()
+
+        _clients.clear()
+
+
+def init_indexes(app, steps, retry_after=30):
+    """
+    Runs the index steps on a background thread started by the first request each process handles, not when
+    the app is imported. Workers boot and /healthz answers while the database is down, nothing connects in a
+    pre-fork master, and failures are printed and retried every retry_after seconds until they succeed.
+    app.extensions['indexes'] is an event set once every step has run.
+    """
+
+    started = threading.Event()
+    finished = app.extensions['indexes'] = threading.Event()
+    lock = threading.Lock()
+
+    def run():
+        while True:
+            try:
+                for step in steps:
+                    step()
+                finished.set()
+                return
+
+            except Exception as e:
+                print("Please see error below.")
+                print(e)
+
+            time.sleep(retry_after)
+
+
+    @app.before_request
+    def start_indexes():
+        if started.is_set():
+            return
+
+        with lock:
+            if started.is_set():
+                return
+
+            started.set()
+
+        threading.Thread(target=run, name='ensure-indexes', daemon=True).start()
@@ -0,0 +1,163 @@
+import threading
+from unittest import TestCase, main
+from unittest.mock import patch
+from collections import namedtuple
+from flask import Flask
+
+from db import CommandStats, PoolStats, get_client, get_database, init_indexes, pool_stats, command_stats
+from config import client
+
+
+# pool events only need the server address, command events the command name.
+Event = namedtuple('Event', ['address'])
+Command = namedtuple('Command', ['command_name', 'duration_micros'], defaults=[0])
+
+
+class TestClients(TestCase):
+    """
+    Tests one client is shared per server and settings.
+    """
+
+    def test_shared(self):
+        """
+        Tests databases on the same server share a client, and so a pool.
+        """
+
+        self.assertIs(get_client('mongodb://localhost:27017/testdb'), get_client('mongodb://localhost:27017/chillpill'))
+        self.assertIsNot(get_client('mongodb://localhost:27017/', maxPoolSize=5), get_client('mongodb://localhost:27017/'))
+
+
+    def test_database(self):
+        """
+        Tests the database named in the URI is used, or the default.
+        """
+
+        self.assertEqual(get_database('mongodb://localhost:27017/testdb').name, 'testdb')
+        self.assertEqual(get_database('mongodb://localhost:27017/').name, 'chillpill')
+
+
+    def test_config(self):
+        """
+        Tests the app's client is the shared one.
+        """
+
+        self.assertIs(client, get_client('mongodb://localhost:27017/chillpill', maxPoolSize=50, waitQueueTimeoutMS=2000,
+                                         serverSelectionTimeoutMS=5000, readPreference='primary', w=1))
+
+
+class TestPoolStats(TestCase):
+    """
+    Tests connection pool counters.
+    """
+
+    def test_counts(self):
+        """
+        Tests current and total counters follow pool events.
+        """
+
+        stats = PoolStats()
+        event = Event(('localhost', 27017))
+
+        stats.connection_created(event)
+        stats.connection_created(event)
+        stats.connection_check_out_started(event)
+        stats.connection_checked_out(event)
+        stats.connection_check_out_started(event)
+        stats.connection_check_out_failed(event)
+        stats.connection_checked_in(event)
+        stats.connection_closed(event)
+
+        counts = stats.snapshot()['localhost:27017']
+
+        self.assertEqual((counts['open'], counts['in_use'], counts['waiting']), (1, 0, 0))
+        self.assertEqual((counts['connections_created'], counts['checkouts'], counts['checkout_failures']), (2, 1, 1))
+
+
+    def test_live(self):
+        """
+        Tests the shared client reports its pool usage.
+        """
+
+        client.admin.command('ping')
+
+        counts = pool_stats.snapshot()['localhost:27017']
+
+        self.assertGreaterEqual(counts['checkouts'], 1)
+        self.assertEqual(counts['in_use'], 0)
+
+
+class TestCommandStats(TestCase):
+    """
+    Tests command counters.
+    """
+
+    def test_counts(self):
+        """
+        Tests commands are counted by name, failures separately.
+        """
+
+        stats = CommandStats()
+
+        stats.started(Command('find'))
+        stats.started(Command('find'))
+        stats.started(Command('update'))
+        stats.failed(Command('update'))
+
+        self.assertEqual(stats.snapshot(), {'find': 2, 'update': 1})
+        self.assertEqual(stats.failures['update'], 1)
+
+
+    def test_live(self):
+        """
+        Tests the shared client reports its commands.
+        """
+
+        before = command_stats.snapshot().get('ping', 0)
+        client.admin.command('ping')
+
+        self.assertEqual(command_stats.snapshot()['ping'], before + 1)
+
+
+
+class TestInitIndexes(TestCase):
+    """
+    Tests indexes are created after startup, and retried while the database is down.
+    """
+
+    def test_retry(self):
+        """
+        Tests nothing runs until the first request, which isn't held up by a failing step.
+        """
+
+        done = threading.Event()
+        calls = []
+
+        # fails the first time, as if the database were down.
+        def step():
+            calls.append(1)
+
+            if len(calls) == 1:
+                raise ConnectionError('down')
+
+            done.set()
+
+        app = Flask(__name__)
+        app.add_url_rule('/', 'index', lambda: 'ok')
+
+        with patch('builtins.print'):
+            init_indexes(app, [step], retry_after=0)
+            self.assertEqual(calls, [])
+            self.assertFalse(app.extensions['indexes'].is_set())
+
+            client = app.test_client()
+            self.assertEqual(client.get('/').status_code, 200)
+            self.assertEqual(client.get('/').status_code, 200)
+
+            self.assertTrue(done.wait(5))
+            self.assertTrue(app.extensions['indexes'].wait(5))
+
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    main()
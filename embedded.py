@@ -0,0 +1,890 @@
+import sqlite3
+import threading
+from datetime import datetime as dt
+from bson import ObjectId
+
+from cache import WriteCounter, request_versions
+from models import (DBConn, DataManager, EntryView, Journal, JournalEntry, MoodTracker, PREVIEW_LENGTH,
+                    SENTIMENT_DONE, bucket_start, partition_key)
+from search import snippet, tokenize
+
+
+# the journal table, a full-text index kept in step by triggers, and the indexes the queries rely on.
+# entries keep ObjectId hex ids, so urls and cursors look the same as with MongoDB.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT,
+    body TEXT,
+    sentiment REAL,
+    sentiment_status TEXT,
+    timestamp TEXT,
+    last_timestamp TEXT
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(body, content='{name}', content_rowid='rowid', tokenize='porter unicode61');
+
+CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {name} BEGIN
+    INSERT INTO {name}_fts(rowid, body) VALUES (new.rowid, new.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {name} BEGIN
+    INSERT INTO {name}_fts({name}_fts, rowid, body) VALUES ('delete', old.rowid, old.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF body ON {name} BEGIN
+    INSERT INTO {name}_fts({name}_fts, rowid, body) VALUES ('delete', old.rowid, old.body);
+    INSERT INTO {name}_fts(rowid, body) VALUES (new.rowid, new.body);
+END;
+
+-- "last N entries", date ranges, the recent sentiments and the rollups.
+CREATE INDEX IF NOT EXISTS {name}_user_timestamp ON {name} (user_id, timestamp, sentiment);
+
+-- lowest/highest sentiments, covering the timestamps they display.
+CREATE INDEX IF NOT EXISTS {name}_user_sentiment ON {name} (user_id, sentiment, timestamp);
+
+-- pages of entries, newest first.
+CREATE INDEX IF NOT EXISTS {name}_user_id ON {name} (user_id, id);
+
+-- write counters cached analytics are versioned by, shared by every process using the file.
+CREATE TABLE IF NOT EXISTS {name}_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+'''
+
+# columns for the document keys the journal writes.
+COLUMNS = {
+    '_id': 'id',
+    'user_id': 'user_id',
+    'body': 'body',
+    'sentiment': 'sentiment',
+    'sentiment_status': 'sentiment_status',
+    'timestamp': 'timestamp',
+    'last timestamp': 'last_timestamp'
+}
+
+# the first day of each rollup bucket, in SQLite date functions. Weeks start on Monday, like bucket_start.
+BUCKETS = {
+    'day': "date(timestamp)",
+    'week': "date(timestamp, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', timestamp)"
+}
+
+
+def to_text(timestamp):
+    """
+    Stores a datetime as ISO text, which sorts and compares like the datetime.
+    """
+
+    return timestamp.isoformat(sep=' ', timespec='milliseconds') if timestamp is not None else None
+
+
+def from_text(text):
+    """
+    Reads a stored timestamp back as a datetime.
+    """
+
+    return dt.fromisoformat(text) if text is not None else None
+
+
+def to_value(column, value):
+    """
+    Converts a document value to what is stored in a column.
+    """
+
+    if column == 'id':
+        return str(ObjectId(value))
+
+    if column in ('timestamp', 'last_timestamp'):
+        return to_text(value)
+
+    return value
+
+
+def match_query(query):
+    """
+    Returns a WHERE clause and parameters for a document of column values, e.g. `{'body': body}`.
+    """
+
+    clauses, params = [], []
+    for key, value in query.items():
+        try:
+            column = COLUMNS[key]
+        except KeyError:
+            raise ValueError(f'Unknown field: {key}')
+
+        clauses.append(f'{column} IS ?')
+        params.append(to_value(column, value))
+
+    return ' AND '.join(clauses), params
+
+
+def to_view(row):
+    """
+    Returns a row as an EntryView, like the MongoDB journal reads.
+    """
+
+    entry = EntryView()
+    entry.id = ObjectId(row['id'])
+    entry.user_id = row['user_id']
+    entry.body = row['body']
+    entry.sentiment = row['sentiment']
+    entry.sentiment_status = row['sentiment_status']
+    entry.timestamp = from_text(row['timestamp'])
+    entry.last_timestamp = from_text(row['last_timestamp'])
+
+    keys = row.keys()
+    if 'truncated' in keys:
+        entry.truncated = bool(row['truncated'])
+
+    return entry
+
+
+class SQLiteLog:
+    """
+    A journal table in an SQLite database file, with a connection for each thread that uses it.
+    """
+
+    def __init__(self, path, name='log', timeout=5):
+        self.path = path
+        self.name = name
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+
+    def connect(self):
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+
+            # readers don't block the writer or each other, and commits don't wait on fsync.
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+
+            self._local.conn = conn
+            self.ensure_schema(conn)
+
+        return conn
+
+
+    def ensure_schema(self, conn=None):
+        """
+        Creates the table, its full-text index and its indexes, once per process.
+        """
+
+        # a new connection creates the schema itself.
+        if conn is None:
+            conn = self.connect()
+
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+
+            conn.executescript(SCHEMA.format(name=self.name))
+            self._schema_ready = True
+
+
+    def execute(self, sql, params=()):
+        """
+        Runs one statement in its own transaction. Returns the cursor.
+        """
+
+        conn = self.connect()
+
+        with conn:
+            return conn.execute(sql.format(log=self.name), params)
+
+
+    def executemany(self, sql, params):
+        """
+        Runs a statement for each set of parameters in one transaction. Returns the cursor.
+        """
+
+        conn = self.connect()
+
+        with conn:
+            return conn.executemany(sql.format(log=self.name), params)
+
+
+    def query(self, sql, params=()):
+        """
+        Returns the rows a query reads.
+        """
+
+        return self.connect().execute(sql.format(log=self.name), params).fetchall()
+
+
+    def drop(self):
+        """
+        Drops the table and its full-text index, e.g. for test tables.
+        """
+
+        self.execute('DROP TABLE IF EXISTS {log}_fts')
+        self.execute('DROP TABLE IF EXISTS {log}_versions')
+        self.execute('DROP TABLE IF EXISTS {log}')
+
+        with self._schema_lock:
+            self._schema_ready = False
+
+
+    def close(self):
+        """
+        Closes this thread's connection.
+        """
+
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SQLiteWriteCounter:
+    """
+    Counts writes to the journal in the SQLite file, shared by every process, like MongoWriteCounter.
+    """
+
+    def __init__(self, log, name='log'):
+        self.log = log
+        self.name = name
+
+
+    def get(self):
+        """
+        Returns the current version, read once per request.
+        """
+
+        versions = request_versions()
+        key = (self.log.path, self.log.name, self.name)
+
+        if versions is not None and key in versions:
+            return versions[key]
+
+        rows = self.log.query('SELECT version FROM {log}_versions WHERE name = ?', (self.name,))
+        version = rows[0][0] if rows else 0
+
+        if versions is not None:
+            versions[key] = version
+
+        return version
+
+
+    def bump(self):
+        """
+        Records a write.
+        """
+
+        self.log.execute('INSERT INTO {log}_versions (name, version) VALUES (?, 1) '
+                         'ON CONFLICT (name) DO UPDATE SET version = version + 1', (self.name,))
+
+        # the request that wrote reads the new version.
+        versions = request_versions()
+        if versions is not None:
+            versions.pop((self.log.path, self.log.name, self.name), None)
+
+
+    def for_user(self, user_id):
+        """
+        Returns a counter for one user's writes, which only that user's cached results are versioned by.
+        """
+
+        return self if user_id is None else SQLiteWriteCounter(self.log, f'{self.name}:{user_id}')
+
+
+class SQLiteConn(DBConn):
+    """
+    Inherits from DBConn to keep the journal in an embedded SQLite database, for single-node deployments.
+    """
+
+    def __init__(self, app, name='log'):
+        self.path = app.config['SQLITE_PATH']
+        self.collection = SQLiteLog(self.path, name)
+
+
+    def __str__(self):
+        """
+        Checks the SQLite database.
+        """
+
+        return f'SQLite Connection: {self.path}'
+
+
+    def get_collection(self):
+        """
+        Returns the journal table.
+        """
+
+        return self.collection
+
+
+    def ping(self):
+        """
+        Reads from the database file.
+        """
+
+        self.collection.query('SELECT 1')
+
+
+class SQLiteMoodStats:
+    """
+    The lowest, highest and recent sentiments, read straight off the sentiment indexes.
+    There is no stats document to keep up to date, so changes are no-ops.
+    """
+
+    def __init__(self, log, user_id=None):
+        self.log = log
+        self.user_id = user_id
+        self.key = partition_key(log.name, user_id)
+
+
+    def read(self):
+        """
+        Returns the stats, in the same shape as the MongoDB stats document.
+        """
+
+        count, total = self.log.query(
+            'SELECT count(sentiment), coalesce(sum(sentiment), 0) FROM {log} WHERE user_id IS ? AND sentiment IS NOT NULL',
+            (self.user_id,)
+            )[0]
+
+        doc = {'_id': self.key, 'count': count, 'sum': total}
+
+        for name, order, limit in (('lowest', 'sentiment ASC', 3), ('highest', 'sentiment DESC', 3), ('recent', 'timestamp DESC', 7)):
+            rows = self.log.query(
+                f'SELECT id, sentiment, timestamp FROM {{log}} WHERE user_id IS ? AND sentiment IS NOT NULL ORDER BY {order} LIMIT {limit}',
+                (self.user_id,)
+                )
+            doc[name] = [{'id': ObjectId(row['id']), 'sentiment': row['sentiment'], 'timestamp': from_text(row['timestamp'])} for row in rows]
+
+        doc['recent'].reverse()
+
+        return doc
+
+
+    def change(self, old=None, new=None):
+        """
+        Nothing to apply, the stats are read from the log.
+        """
+
+
+    def mark_stale(self):
+        """
+        Nothing to flag, the stats are never stale.
+        """
+
+
+    def rebuild(self):
+        """
+        Returns the stats, there is nothing to save.
+        """
+
+        return self.read()
+
+
+    def check(self):
+        """
+        Returns no differences, the stats are always fresh.
+        """
+
+        return []
+
+
+class SQLiteRollups:
+    """
+    Daily, weekly and monthly sentiment rollups, grouped from the timestamp index when they're read.
+    """
+
+    UNITS = BUCKETS
+
+    def __init__(self, log, user_id=None):
+        self.log = log
+        self.user_id = user_id
+        self.key = partition_key(log.name, user_id)
+
+
+    def read(self, unit, start=None, end=None):
+        """
+        Returns the buckets overlapping start (inclusive) to end (exclusive), oldest first.
+        """
+
+        where, params = ['user_id IS ?', 'sentiment IS NOT NULL', 'timestamp IS NOT NULL'], [self.user_id]
+        if start is not None:
+            where.append('timestamp >= ?')
+            params.append(to_text(bucket_start(start, unit)))
+        if end is not None:
+            where.append('timestamp < ?')
+            params.append(to_text(end))
+
+        rows = self.log.query(
+            f'SELECT {BUCKETS[unit]} AS start, count(*) AS count, sum(sentiment) AS sum, min(sentiment) AS min, max(sentiment) AS max '
+            f'FROM {{log}} WHERE {" AND ".join(where)} GROUP BY 1 ORDER BY 1',
+            params
+            )
+
+        return [{**dict(row), 'start': dt.fromisoformat(row['start'])} for row in rows]
+
+
+    def change(self, old=None, new=None):
+        """
+        Nothing to apply, the rollups are grouped when read.
+        """
+
+
+    def mark_stale(self):
+        """
+        Nothing to flag, the rollups are never stale.
+        """
+
+
+    def rebuild(self, batch_size=None):
+        """
+        Returns the number of buckets per unit, there is nothing to save.
+        """
+
+        return {unit: len(self.read(unit)) for unit in self.UNITS}
+
+
+    def check(self):
+        """
+        Returns no differences, the rollups are always fresh.
+        """
+
+        return []
+
+
+class SQLiteJournalManager(DataManager):
+    """
+    Inherits from DataManager for the journal CRUD functionalities, on SQLite.
+    Search always uses the table's FTS5 index.
+    """
+
+    def __init__(self, dbconnection, counter=None, search_backend=None, user_id=None):
+        self.collection = dbconnection.get_collection()
+
+        # every query is limited to one user's entries, and starts with user_id so it uses the user's part of each index.
+        self.user_id = user_id
+
+        # counts writes, so cached analytics know when they're stale.
+        self.counter = counter or WriteCounter()
+
+        self.stats = SQLiteMoodStats(self.collection, user_id)
+        self.rollups = SQLiteRollups(self.collection, user_id)
+
+
+    def create(self, body, sentiment, sentiment_status=SENTIMENT_DONE):
+        """
+        Creates a journal entry and inserts it into the table.
+        """
+
+        entry = JournalEntry(body, sentiment, sentiment_status)
+        _id = ObjectId()
+
+        self.collection.execute(
+            'INSERT INTO {log} (id, user_id, body, sentiment, sentiment_status, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+            (str(_id), self.user_id, entry.body, entry.sentiment, entry.sentiment_status, to_text(entry.timestamp))
+            )
+        self.counter.bump()
+
+        return _id
+
+
+    def read_all(self):
+        """
+        Returns all the user's entries as EntryViews, in the order they were written.
+        """
+
+        cursor = self.collection.connect().execute(
+            'SELECT * FROM {log} WHERE user_id IS ? ORDER BY rowid'.format(log=self.collection.name),
+            (self.user_id,)
+            )
+
+        return (to_view(row) for row in cursor)
+
+
+    def read_page(self, page_size=20, after=None, before=None):
+        """
+        Reads a page of entries, newest first, with a preview of each body. Pages are keyed on id:
+        `after` reads the page following an entry id, `before` the page preceding one.
+        Returns the entries with the `next` and `prev` cursors, None at either end.
+        """
+
+        # the body preview is cut short in the database.
+        columns = (f"id, user_id, substr(coalesce(body, ''), 1, {PREVIEW_LENGTH}) AS body, "
+                   f"length(coalesce(body, '')) > {PREVIEW_LENGTH} AS truncated, sentiment, sentiment_status, timestamp, last_timestamp")
+
+        # read one extra entry to see if there's another page.
+        if before is not None:
+            rows = self.collection.query(f'SELECT {columns} FROM {{log}} WHERE user_id IS ? AND id > ? ORDER BY id ASC LIMIT ?',
+                                         (self.user_id, str(ObjectId(before)), page_size + 1))
+        elif after is not None:
+            rows = self.collection.query(f'SELECT {columns} FROM {{log}} WHERE user_id IS ? AND id < ? ORDER BY id DESC LIMIT ?',
+                                         (self.user_id, str(ObjectId(after)), page_size + 1))
+        else:
+            rows = self.collection.query(f'SELECT {columns} FROM {{log}} WHERE user_id IS ? ORDER BY id DESC LIMIT ?',
+                                         (self.user_id, page_size + 1))
+
+        entries = [to_view(row) for row in rows]
+        more = len(entries) > page_size
+        entries = entries[:page_size]
+
+        # pages before a cursor are read oldest first.
+        if before is not None:
+            entries.reverse()
+
+        page = {
+            'entries': entries,
+            'next': None,
+            'prev': None
+        }
+
+        if entries:
+            # there are newer entries if we paged forwards or there's more before the cursor.
+            if after is not None or (before is not None and more):
+                page['prev'] = str(entries[0].id)
+
+            # there are older entries if there's more after the cursor or we paged backwards.
+            if before is not None or more:
+                page['next'] = str(entries[-1].id)
+
+        return page
+
+
+    def read_one(self, _id):
+        """
+        Reads a single entry based on its id.
+        """
+
+        rows = self.collection.query('SELECT * FROM {log} WHERE user_id IS ? AND id = ?', (self.user_id, str(ObjectId(_id))))
+
+        return [to_view(row) for row in rows]
+
+
+    def read_range(self, start=None, end=None, limit=None, newest_first=True):
+        """
+        Reads entries with a timestamp from start (inclusive) to end (exclusive), using the timestamp index.
+        """
+
+        where, params = ['user_id IS ?', 'timestamp IS NOT NULL'], [self.user_id]
+        if start is not None:
+            where.append('timestamp >= ?')
+            params.append(to_text(start))
+        if end is not None:
+            where.append('timestamp < ?')
+            params.append(to_text(end))
+
+        sql = f'SELECT * FROM {{log}} WHERE {" AND ".join(where)} ORDER BY timestamp {"DESC" if newest_first else "ASC"}'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [to_view(row) for row in self.collection.query(sql, params)]
+
+
+    def search(self, query, limit=20, cursor=None, min_sentiment=None, max_sentiment=None, start=None, end=None):
+        """
+        Searches entry bodies, best matches first, optionally within a sentiment range and from start (inclusive)
+        to end (exclusive). `cursor` is the `next` cursor of the previous page.
+        Returns the entries, each with a score and a highlighted snippet, and the `next` cursor, None at the end.
+        """
+
+        # relevance order can't be keyed on a field, so pages are offsets.
+        skip = max(int(cursor), 0) if cursor else 0
+
+        # any of the terms, quoted so they're never read as FTS5 syntax.
+        terms = tokenize(query)
+        if not terms:
+            return {'results': [], 'next': None}
+
+        where, params = ['{log}_fts MATCH ?', 'e.user_id IS ?'], [' OR '.join(f'"{term}"' for term in terms), self.user_id]
+        if min_sentiment is not None:
+            where.append('e.sentiment >= ?')
+            params.append(min_sentiment)
+        if max_sentiment is not None:
+            where.append('e.sentiment <= ?')
+            params.append(max_sentiment)
+        if start is not None:
+            where.append('e.timestamp >= ?')
+            params.append(to_text(start))
+        if end is not None:
+            where.append('e.timestamp < ?')
+            params.append(to_text(end))
+
+        # read one extra entry to see if there's another page. bm25 is lower for better matches.
+        rows = self.collection.query(
+            f'SELECT e.*, bm25({{log}}_fts) AS rank FROM {{log}}_fts JOIN {{log}} AS e ON e.rowid = {{log}}_fts.rowid '
+            f'WHERE {" AND ".join(where)} ORDER BY rank, e.id DESC LIMIT ? OFFSET ?',
+            params + [limit + 1, skip]
+            )
+
+        entries = []
+        for row in rows[:limit]:
+            entry = to_view(row)
+            entry['score'] = -row['rank']
+            entry['snippet'] = snippet(entry.body, query)
+            entries.append(entry)
+
+        return {
+            'results': entries,
+            'next': str(skip + limit) if len(rows) > limit else None
+        }
+
+
+    def export(self, batch_size=1000, after=None):
+        """
+        Streams the user's entries as EntryViews in id order, optionally after an entry id.
+        """
+
+        cursor = self.collection.connect().execute(
+            'SELECT * FROM {log} WHERE user_id IS ? AND id > ? ORDER BY id'.format(log=self.collection.name),
+            (self.user_id, str(ObjectId(after)) if after is not None else '')
+            )
+        cursor.arraysize = batch_size
+
+        return (to_view(row) for row in cursor)
+
+
+    def insert_many(self, entries, ordered=False):
+        """
+        Inserts many entries in one transaction, keeping any _id they have so importing them again skips them.
+        Unordered inserts skip entries that already exist, ordered ones roll back at the first. Returns the number inserted.
+        """
+
+        rows = []
+        for entry in entries:
+            if not isinstance(entry.get('timestamp'), dt):
+                raise ValueError(f"SQLite entries need datetime timestamps, not {entry.get('timestamp')!r}")
+
+            rows.append((str(ObjectId(entry.get('_id'))), self.user_id, entry.get('body'), entry.get('sentiment'),
+                         entry.get('sentiment_status'), to_text(entry['timestamp']), to_text(entry.get('last timestamp'))))
+
+        if not rows:
+            return 0
+
+        verb = 'INSERT' if ordered else 'INSERT OR IGNORE'
+        inserted = self.collection.executemany(
+            f'{verb} INTO {{log}} (id, user_id, body, sentiment, sentiment_status, timestamp, last_timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows
+            ).rowcount
+
+        if inserted:
+            self.counter.bump()
+
+        return inserted
+
+
+    def unscored(self, batch_size=100):
+        """
+        Yields the entries never scored, still pending or failed, with their _id and body, batch_size read at a time.
+        """
+
+        return self.batches('sentiment IS NULL AND sentiment_status IS NOT ?', [SENTIMENT_DONE], batch_size)
+
+
+    def bodies(self, batch_size=500, query=None):
+        """
+        Yields every entry matching an optional query of field values, with its _id and body, batch_size read at a time.
+        """
+
+        where, params = match_query(query or {})
+
+        return self.batches(where, params, batch_size)
+
+
+    def batches(self, where, params, batch_size):
+        """
+        Yields the _id and body of the user's entries matching a condition, reading batch_size rows per query.
+        Each batch is read after the last id of the one before, so callers can update entries as they go.
+        """
+
+        where = f'user_id IS ? AND id > ? AND {where}' if where else 'user_id IS ? AND id > ?'
+        after = ''
+
+        while True:
+            rows = self.collection.query(f'SELECT id, body FROM {{log}} WHERE {where} ORDER BY id LIMIT ?',
+                                         [self.user_id, after] + list(params) + [batch_size])
+
+            for row in rows:
+                yield {'_id': ObjectId(row['id']), 'body': row['body']}
+
+            if len(rows) < batch_size:
+                return
+
+            after = rows[-1]['id']
+
+
+    def users(self):
+        """
+        Returns the id of every user with entries, not counting the default user.
+        """
+
+        # covered by the indexes starting with user_id.
+        return [row[0] for row in self.collection.query('SELECT DISTINCT user_id FROM {log} WHERE user_id IS NOT NULL')]
+
+
+    def ensure_indexes(self):
+        """
+        Creates the table and the indexes the journal queries rely on.
+        """
+
+        self.collection.ensure_schema()
+
+
+    def check_one(self, query):
+        """
+        Checks that an entry exists based on a query of field values.
+        """
+
+        where, params = match_query(query)
+        where = f'user_id IS ? AND {where}' if where else 'user_id IS ?'
+
+        return bool(self.collection.query(f'SELECT 1 FROM {{log}} WHERE {where} LIMIT 1', [self.user_id] + params))
+
+
+    def update(self, _id, update_data, match=None):
+        """
+        Updates an entry with new data based on its id. `match` adds fields the entry must still have.
+        Returns the number of entries matched, 0 if the entry is gone or no longer matches.
+        """
+
+        matched = self.collection.execute(*self.update_statement(_id, update_data, match)).rowcount
+
+        if not matched:
+            return 0
+
+        self.counter.bump()
+
+        return matched
+
+
+    def update_statement(self, _id, update_data, match=None):
+        """
+        Returns the UPDATE statement and parameters for an update.
+        """
+
+        columns = [COLUMNS[key] for key in update_data]
+        values = [to_value(column, value) for column, value in zip(columns, update_data.values())]
+
+        where, params = match_query({'_id': _id, 'user_id': self.user_id, **(match or {})})
+
+        return f'UPDATE {{log}} SET {", ".join(f"{column} = ?" for column in columns)} WHERE {where}', values + params
+
+
+    def bulk_update(self, updates):
+        """
+        Applies many (_id, update_data, match) updates in one transaction. Returns the number modified.
+        """
+
+        if not updates:
+            return 0
+
+        conn = self.collection.connect()
+        modified = 0
+
+        with conn:
+            for _id, update_data, match in updates:
+                sql, params = self.update_statement(_id, update_data, match)
+                modified += conn.execute(sql.format(log=self.collection.name), params).rowcount
+
+        self.counter.bump()
+
+        return modified
+
+
+    def delete(self, _id):
+        """
+        Deletes an entry with an _id. Returns the number of entries deleted, 0 if it was already gone.
+        """
+
+        deleted = self.collection.execute('DELETE FROM {log} WHERE user_id IS ? AND id = ?', (self.user_id, str(ObjectId(_id)))).rowcount
+
+        if deleted:
+            self.counter.bump()
+
+        return deleted
+
+
+class SQLiteMoodTracker(MoodTracker):
+    """
+    Mood tracker reading the journal from SQLite, with the sort/limit queries on its indexes.
+    """
+
+    def __init__(self, dbconnection, cache=None, counter=None, stats=None, rollups=None, user_id=None):
+        log = dbconnection.get_collection()
+        self.user_id = user_id
+
+        super().__init__(dbconnection, cache, counter, stats or SQLiteMoodStats(log, user_id), rollups or SQLiteRollups(log, user_id), user_id)
+
+
+    def recent_data(self, start=None, end=None):
+        """
+        Fetches the most recent data from the DB, optionally from start (inclusive) to end (exclusive).
+        """
+
+        import pandas as pd
+
+        return pd.DataFrame([
+            {'timestamp': entry['timestamp'], 'sentiment': entry['sentiment']}
+            for entry in self.entries(start, end, scored=False)
+            ])
+
+
+    def oldest(self):
+        """
+        Returns the timestamp of the oldest entry, or None if there are none.
+        """
+
+        rows = self.collection.query('SELECT timestamp FROM {log} WHERE user_id IS ? AND timestamp IS NOT NULL ORDER BY timestamp LIMIT 1', (self.user_id,))
+
+        return from_text(rows[0]['timestamp']) if rows else None
+
+
+    def scored_entries(self, start=None, end=None):
+        """
+        Returns the timestamp and sentiment of each scored entry from start (inclusive) to end (exclusive), oldest first.
+        """
+
+        return self.entries(start, end)
+
+
+    def entries(self, start=None, end=None, scored=True):
+        """
+        Reads timestamps and sentiments in a window off the timestamp index, oldest first.
+        """
+
+        where, params = ['user_id IS ?', 'timestamp IS NOT NULL'], [self.user_id]
+        if scored:
+            where.append('sentiment IS NOT NULL')
+        if start is not None:
+            where.append('timestamp >= ?')
+            params.append(to_text(start))
+        if end is not None:
+            where.append('timestamp < ?')
+            params.append(to_text(end))
+
+        rows = self.collection.query(f'SELECT timestamp, sentiment FROM {{log}} WHERE {" AND ".join(where)} ORDER BY timestamp', params)
+
+        return [{'timestamp': from_text(row['timestamp']), 'sentiment': row['sentiment']} for row in rows]
+
+
+class SQLiteJournal(Journal):
+    """
+    The journal on an embedded SQLite database, selected with `STORAGE = 'sqlite'` in config.
+    """
+
+    manager_class = SQLiteJournalManager
+
+    # the aggregate tracker runs MongoDB pipelines.
+    mood_backends = {
+        SQLiteMoodTracker.name: SQLiteMoodTracker
+    }
@@ -0,0 +1,284 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+from datetime import datetime as dt, timedelta
+from bson import ObjectId
+from flask import Flask
+
+from cache import LRUCache
+from embedded import SQLiteConn, SQLiteJournal, SQLiteWriteCounter, to_text
+from models import PREVIEW_LENGTH, SENTIMENT_PENDING
+from search_test import SearchTests
+
+
+def sqlite_journal(test, **kwargs):
+    """
+    Returns a journal on a fresh SQLite file, removed when the test ends.
+    """
+
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+
+    app = Flask(__name__)
+    app.config['SQLITE_PATH'] = os.path.join(directory.name, 'test.db')
+
+    conn = SQLiteConn(app)
+    test.addCleanup(conn.collection.close)
+
+    return SQLiteJournal(conn, **kwargs)
+
+
+class TestSQLiteJournalManager(TestCase):
+    """
+    Test SQLiteJournalManager via SQLiteJournal.
+    """
+
+    def setUp(self):
+        self.journal = sqlite_journal(self)
+        self.manager = self.journal.manager
+
+
+    def insert(self, body, sentiment, timestamp):
+        """
+        Inserts an entry with a given timestamp, as an old journal would have it.
+        """
+
+        self.manager.collection.execute('INSERT INTO {log} (id, body, sentiment, timestamp) VALUES (?, ?, ?, ?)',
+                                        (str(ObjectId()), body, sentiment, to_text(timestamp)))
+
+
+    def test_wal(self):
+        """
+        Tests the database is in WAL mode and answers pings.
+        """
+
+        self.journal.dbconn.ping()
+        self.assertEqual(self.manager.collection.query('PRAGMA journal_mode')[0][0], 'wal')
+        self.assertIn('test.db', str(self.journal.dbconn))
+
+
+    def test_crud(self):
+        """
+        Tests entries are created, read, updated and deleted like the MongoDB journal.
+        """
+
+        _id = self.manager.create('Test body', 5.21)
+
+        entry = self.manager.read_one(_id)[0]
+        self.assertEqual((entry.id, entry.body, entry.sentiment), (_id, 'Test body', 5.21))
+        self.assertIsInstance(entry.timestamp, dt)
+        self.assertEqual([entry['_id'] for entry in self.manager.read_all()], [_id])
+
+        self.assertEqual(self.manager.update(_id, {'body': 'New body', 'last timestamp': dt(2023, 11, 30)}), 1)
+        self.assertEqual(self.manager.read_one(str(_id))[0]['last timestamp'], dt(2023, 11, 30))
+        self.assertTrue(self.manager.check_one({'body': 'New body'}))
+
+        # the body changed, so a score for the old one isn't saved.
+        self.assertEqual(self.manager.update(_id, {'sentiment': 1.0}, match={'body': 'Test body'}), 0)
+        self.assertEqual(self.manager.update(ObjectId(), {'sentiment': 1.0}), 0)
+
+        self.assertEqual(self.manager.delete(_id), 1)
+        self.assertEqual(self.manager.delete(_id), 0)
+        self.assertEqual(self.manager.read_one(_id), [])
+
+
+    def test_read_page(self):
+        """
+        Tests pages of entries, newest first, with previews.
+        """
+
+        ids = [self.manager.create(f'Entry {i} ' + 'x' * (PREVIEW_LENGTH if i == 4 else 0), None) for i in range(5)]
+
+        first = self.manager.read_page(page_size=2)
+        self.assertEqual([entry.id for entry in first['entries']], [ids[4], ids[3]])
+        self.assertTrue(first['entries'][0].truncated)
+        self.assertEqual(len(first['entries'][0].body), PREVIEW_LENGTH)
+        self.assertIsNone(first['prev'])
+
+        second = self.manager.read_page(page_size=2, after=first['next'])
+        self.assertEqual([entry.id for entry in second['entries']], [ids[2], ids[1]])
+
+        back = self.manager.read_page(page_size=2, before=second['prev'])
+        self.assertEqual([entry.id for entry in back['entries']], [ids[4], ids[3]])
+        self.assertIsNone(back['prev'])
+
+
+    def test_read_range(self):
+        """
+        Tests entries are read by timestamp.
+        """
+
+        for day in range(5):
+            self.insert(f'Day {day}', float(day), dt(2023, 2, 1) + timedelta(days=day))
+
+        entries = self.manager.read_range(dt(2023, 2, 2), dt(2023, 2, 4))
+        self.assertEqual([entry.body for entry in entries], ['Day 2', 'Day 1'])
+        self.assertEqual([entry.body for entry in self.manager.read_range(limit=2, newest_first=False)], ['Day 0', 'Day 1'])
+
+
+    def test_users(self):
+        """
+        Tests each user only reads and writes their own entries.
+        """
+
+        mine = self.manager.create('Mine', 5.0)
+        alice = self.journal.for_user('alice')
+        theirs = alice.manager.create('Theirs', 1.0)
+
+        self.assertIs(self.journal.for_user('alice'), alice)
+        self.assertIsInstance(alice, SQLiteJournal)
+        self.assertEqual(self.manager.users(), ['alice'])
+
+        self.assertEqual([entry.body for entry in alice.manager.read_all()], ['Theirs'])
+        self.assertEqual(alice.manager.read_one(mine), [])
+        self.assertEqual(self.manager.delete(theirs), 0)
+        self.assertEqual(alice.manager.stats.read()['count'], 1)
+
+
+    def test_pipeline(self):
+        """
+        Tests the entries the sentiment pipeline scores.
+        """
+
+        _id = self.manager.create('Not scored yet', None, SENTIMENT_PENDING)
+        self.manager.create('Scored', 5.0)
+
+        self.assertEqual(list(self.manager.unscored()), [{'_id': _id, 'body': 'Not scored yet'}])
+        self.assertEqual(len(list(self.manager.bodies())), 2)
+        self.assertEqual(list(self.manager.bodies(query={'sentiment_status': SENTIMENT_PENDING})), [{'_id': _id, 'body': 'Not scored yet'}])
+
+        updated = self.manager.bulk_update([(_id, {'sentiment': 2.0, 'sentiment_status': 'done'}, {'body': 'Not scored yet'})])
+        self.assertEqual(updated, 1)
+        self.assertEqual(list(self.manager.unscored()), [])
+
+
+    def test_pipeline_batches(self):
+        """
+        Tests unscored entries are read in batches, and can be scored while they are read.
+        """
+
+        ids = [self.manager.create(f'Entry {i}', None, SENTIMENT_PENDING) for i in range(5)]
+
+        with patch.object(self.manager.collection, 'query', wraps=self.manager.collection.query) as query:
+            for entry in self.manager.unscored(batch_size=2):
+                self.manager.update(entry['_id'], {'sentiment': 5.0, 'sentiment_status': 'done'})
+
+        self.assertEqual(query.call_count, 3)
+        self.assertEqual(list(self.manager.unscored()), [])
+        self.assertEqual([entry['_id'] for entry in self.manager.bodies(batch_size=2)], ids)
+
+
+    def test_stats(self):
+        """
+        Tests the lowest, highest and recent sentiments are read off the indexes.
+        """
+
+        for day, sentiment in enumerate([4.58, 8.04, None, 7.50, 2.88, 4.67]):
+            self.insert(f'Day {day}', sentiment, dt(2023, 2, 1) + timedelta(days=day))
+
+        stats = self.manager.stats.read()
+        self.assertEqual(stats['count'], 5)
+        self.assertAlmostEqual(stats['sum'], 27.67)
+        self.assertEqual([item['sentiment'] for item in stats['lowest']], [2.88, 4.58, 4.67])
+        self.assertEqual([item['sentiment'] for item in stats['highest']], [8.04, 7.50, 4.67])
+        self.assertEqual([item['sentiment'] for item in stats['recent']], [4.58, 8.04, 7.50, 2.88, 4.67])
+
+        self.assertIn('2.88', self.journal.mood.min_sentiments())
+        self.assertIn('5.53', self.journal.mood.av_sentiment())
+
+
+    def test_rollups(self):
+        """
+        Tests entries are rolled up by day, week and month.
+        """
+
+        start = dt(2023, 1, 30, 9)
+        for day in range(10):
+            self.insert(f'Day {day}', float(day), start + timedelta(days=day))
+
+        rollups = self.manager.rollups
+        self.assertEqual(rollups.rebuild(), {'day': 10, 'week': 2, 'month': 2})
+
+        days = rollups.read('day', dt(2023, 2, 1, 12), dt(2023, 2, 3))
+        self.assertEqual([(bucket['start'], bucket['sum']) for bucket in days], [(dt(2023, 2, 1), 2.0), (dt(2023, 2, 2), 3.0)])
+
+        # Monday 30 January to Sunday 5 February, then 6 - 8 February.
+        weeks = rollups.read('week')
+        self.assertEqual([(bucket['start'], bucket['count'], bucket['min'], bucket['max']) for bucket in weeks],
+                         [(dt(2023, 1, 30), 7, 0.0, 6.0), (dt(2023, 2, 6), 3, 7.0, 9.0)])
+
+        months = rollups.read('month')
+        self.assertEqual([(bucket['start'], bucket['count']) for bucket in months], [(dt(2023, 1, 1), 2), (dt(2023, 2, 1), 8)])
+
+
+    def test_mood_data(self):
+        """
+        Tests the plot data, entry by entry for short windows and from the rollups for long ones.
+        """
+
+        start = dt(2022, 1, 1)
+        for day in range(0, 400, 2):
+            self.insert(f'Day {day}', float(day % 10), start + timedelta(days=day))
+
+        data = self.journal.mood.mood_data(start, start + timedelta(days=10))
+        self.assertEqual(data['unit'], 'entry')
+        self.assertEqual(data['sentiments'], [0.0, 2.0, 4.0, 6.0, 8.0])
+
+        data = self.journal.mood.mood_data(start, start + timedelta(days=400), max_points=100)
+        self.assertEqual(data['unit'], 'week')
+        self.assertEqual(data['count'], 200)
+        self.assertEqual(data['sentiments'][:2], [0.0, 5.0])
+
+        self.assertEqual(self.journal.mood.zoom(end=start + timedelta(days=400)), 'day')
+        self.assertIn('Your Mood So Far!', self.journal.mood.plot_mood(start, start + timedelta(days=10)))
+
+
+    def test_unknown_backend(self):
+        """
+        Tests the aggregate mood tracker, which needs MongoDB, can't be used.
+        """
+
+        with self.assertRaises(ValueError):
+            sqlite_journal(self, mood_backend='aggregate')
+
+
+    def test_shared_cache_version(self):
+        """
+        Tests a write through one journal invalidates results another journal on the file has cached.
+        """
+
+        counter = SQLiteWriteCounter(self.manager.collection)
+        first = SQLiteJournal(self.journal.dbconn, LRUCache(), counter)
+        second = SQLiteJournal(self.journal.dbconn, LRUCache(), SQLiteWriteCounter(self.manager.collection))
+
+        first.manager.create('A lovely day.', 8.0)
+        self.assertIn('8.00', first.mood.min_sentiments())
+
+        second.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertIn('0.50', first.mood.min_sentiments())
+        self.assertEqual(counter.for_user('alice').get(), 0)
+
+
+class TestSQLiteSearch(SearchTests, TestCase):
+    """
+    Tests search with the SQLite FTS5 index.
+    """
+
+    def setUp(self):
+        self.journal = sqlite_journal(self)
+        self.journal.manager.ensure_indexes()
+
+        self.manager = self.journal.manager
+        self.ids = {}
+        for body, sentiment in [
+                ('Ice cream shop ran out of my favourite flavour, so sad.', 2.5),
+                ('Ice cream store is back with my flavour, ice cream all day!', 9.0),
+                ('Learnt search and sort algorithms in my session.', 7.0),
+                ('Rainy walk to work, nothing to report.', None)
+                ]:
+            self.ids[body.split()[0]] = self.manager.create(body, sentiment)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,25 @@
-
+import argparse
 import webbrowser
 from routes import app
 
-def run():
+def run(open_browser=False):
     """
-    Run the project.
+    Run the project with Flask's development server. See serve.py for production.
     """
 
     print('Running localhost')
 
     # url that the Flask app runs on.
     url = 'http://127.0.0.1:5000'
-    webbrowser.open(url)
+
+    if open_browser:
+        webbrowser.open(url)
 
     app.run()
 
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description='Run Chill Pill with the development server.')
+    parser.add_argument('--browser', action='store_true', help='open the app in a web browser')
+
+    run(parser.parse_args().browser)
@@ -0,0 +1,243 @@
+import argparse
+import os
+import sys
+import time
+
+from config import app, journal
+from migrations import migrate_timestamps, migrate_sentiments
+from pipeline import SentimentPipeline
+from transfer import FORMATS, guess_format, export_entries, import_entries
+
+
+def journals():
+    """
+    Returns the default user's journal and the journal of every other user with entries.
+    """
+
+    return [journal] + [journal.for_user(user_id) for user_id in journal.manager.users()]
+
+
+def backfill(args):
+    """
+    Re-scores entries with no sentiment.
+    """
+
+    count = 0
+    for user_journal in journals():
+        pipeline = SentimentPipeline(user_journal.manager, args.workers)
+
+        try:
+            count += pipeline.backfill(args.batch_size)
+        finally:
+            pipeline.shutdown()
+
+    print(f'Scored {count} entries.')
+
+
+def rescore(args):
+    """
+    Re-scores every entry in batches.
+    """
+
+    count = failed = 0
+    for user_journal in journals():
+        scored, errors = SentimentPipeline(user_journal.manager, workers=0).rescore(args.batch_size)
+        count += scored
+        failed += errors
+
+    print(f'Scored {count} entries, {failed} failed.')
+
+
+def timestamps(args):
+    """
+    Converts string timestamps to datetimes.
+    """
+
+    migrated, failed = migrate_timestamps(journal.manager.collection, args.batch_size)
+
+    for user_journal in journals():
+        user_journal.manager.stats.mark_stale()
+        user_journal.manager.rollups.mark_stale()
+
+    print(f'Migrated {migrated} entries, {failed} timestamps could not be parsed.')
+
+
+def sentiments(args):
+    """
+    Converts string sentiments to numbers.
+    """
+
+    migrated = migrate_sentiments(journal.manager.collection)
+
+    for user_journal in journals():
+        user_journal.manager.stats.mark_stale()
+        user_journal.manager.rollups.mark_stale()
+
+    print(f'Migrated {migrated} entries.')
+
+
+def stats(args):
+    """
+    Recomputes the mood stats from scratch.
+    """
+
+    count = sum(user_journal.manager.stats.rebuild()['count'] for user_journal in journals())
+
+    print(f"Rebuilt mood stats from {count} scored entries.")
+
+
+def rollups(args):
+    """
+    Recomputes the daily, weekly and monthly rollups from scratch.
+    """
+
+    counts = {'day': 0, 'week': 0, 'month': 0}
+    for user_journal in journals():
+        for unit, count in user_journal.manager.rollups.rebuild(args.batch_size).items():
+            counts[unit] += count
+
+    print(f"Rebuilt {counts['day']} daily, {counts['week']} weekly and {counts['month']} monthly rollups.")
+
+
+def indexes(args):
+    """
+    Creates the indexes the journal queries rely on, e.g. as a deploy step.
+    """
+
+    journal.manager.ensure_indexes()
+
+    print('Created indexes.')
+
+
+def user_journal(user_id):
+    """
+    Returns a user's journal, or the default user's if there is no user_id.
+    """
+
+    return journal.for_user(user_id) if user_id else journal
+
+
+def report(verb, count, start):
+    """
+    Prints how many entries were moved and how fast, to stderr so it doesn't end up in an export on stdout.
+    """
+
+    elapsed = time.perf_counter() - start
+    print(f'{verb} {count} entries in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} entries/s).', file=sys.stderr)
+
+
+def export(args):
+    """
+    Streams a journal's entries to a file or stdout.
+    """
+
+    manager = user_journal(args.user).manager
+    format = args.format or guess_format(args.output)
+
+    start = time.perf_counter()
+
+    if args.output == '-':
+        count = export_entries(manager, sys.stdout, format, args.batch_size)
+    else:
+        # a resumed export adds to what's already written.
+        resuming = args.checkpoint is not None and os.path.exists(args.checkpoint)
+
+        with open(args.output, 'a' if resuming else 'w', newline='', encoding='utf-8') as out:
+            count = export_entries(manager, out, format, args.batch_size, args.checkpoint)
+
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    report('Exported', count, start)
+
+
+def load(args):
+    """
+    Inserts the entries in an export into a journal, optionally scoring them first.
+    """
+
+    manager = user_journal(args.user).manager
+    format = args.format or guess_format(args.path)
+    pipeline = SentimentPipeline(manager, workers=0) if args.score else None
+
+    start = time.perf_counter()
+
+    with open(args.path, newline='', encoding='utf-8') as f:
+        read, inserted = import_entries(manager, f, format, args.chunk_size, args.ordered, pipeline, args.checkpoint)
+
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    report('Imported', inserted, start)
+
+    if inserted < read:
+        print(f'Skipped {read - inserted} entries that were already in the journal.', file=sys.stderr)
+
+
+def main():
+    """
+    Maintenance commands, run with `python manage.py <command>`.
+    """
+
+    parser = argparse.ArgumentParser(description='Chill Pill maintenance commands.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # backfill command.
+    command = commands.add_parser('backfill', help='score entries with no sentiment')
+    command.add_argument('--batch-size', type=int, default=100, help='entries scored at a time')
+    command.add_argument('--workers', type=int, default=app.config['SENTIMENT_WORKERS'], help='scoring threads')
+    command.set_defaults(func=backfill)
+
+    # rescore command.
+    command = commands.add_parser('rescore', help='re-score every entry, e.g. after a model change')
+    command.add_argument('--batch-size', type=int, default=500, help='entries scored at a time')
+    command.set_defaults(func=rescore)
+
+    # timestamp migration command.
+    command = commands.add_parser('migrate-timestamps', help='convert string timestamps to datetimes')
+    command.add_argument('--batch-size', type=int, default=1000, help='entries migrated at a time')
+    command.set_defaults(func=timestamps)
+
+    # sentiment migration command.
+    command = commands.add_parser('migrate-sentiments', help='convert string sentiments to numbers')
+    command.set_defaults(func=sentiments)
+
+    # mood stats repair command.
+    command = commands.add_parser('rebuild-stats', help='recompute the mood stats from scratch')
+    command.set_defaults(func=stats)
+
+    # mood rollups repair command.
+    command = commands.add_parser('rebuild-rollups', help='recompute the daily, weekly and monthly rollups from scratch')
+    command.add_argument('--batch-size', type=int, default=1000, help='entries read at a time')
+    command.set_defaults(func=rollups)
+
+    # index command.
+    command = commands.add_parser('ensure-indexes', help='create the indexes the journal queries rely on')
+    command.set_defaults(func=indexes)
+
+    # export command.
+    command = commands.add_parser('export', help='stream a journal to NDJSON or CSV')
+    command.add_argument('--output', default='-', help='file to write, - for stdout')
+    command.add_argument('--format', choices=FORMATS, help='file format, guessed from --output otherwise')
+    command.add_argument('--user', help='user whose journal to export, the default user otherwise')
+    command.add_argument('--batch-size', type=int, default=1000, help='entries read at a time')
+    command.add_argument('--checkpoint', help='file to save progress to, so an interrupted export can carry on')
+    command.set_defaults(func=export)
+
+    # import command.
+    command = commands.add_parser('import', help='insert entries from an NDJSON or CSV export')
+    command.add_argument('path', help='file to read')
+    command.add_argument('--format', choices=FORMATS, help='file format, guessed from the path otherwise')
+    command.add_argument('--user', help='user whose journal to import into, the default user otherwise')
+    command.add_argument('--chunk-size', type=int, default=1000, help='entries inserted at a time')
+    command.add_argument('--ordered', action='store_true', help='stop at the first entry that already exists')
+    command.add_argument('--score', action='store_true', help='score entries with no sentiment before inserting them')
+    command.add_argument('--checkpoint', help='file to save progress to, so an interrupted import can carry on')
+    command.set_defaults(func=load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+
+
+# latency buckets in seconds, from a cache hit to a page that should have timed out.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the content type Prometheus scrapes.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value):
+    """
+    Escapes a label value for the Prometheus text format.
+    """
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    """
+    Returns the `{name="value",...}` part of a sample, or nothing if there are no labels.
+    """
+
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(extra)
+
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    """
+    Formats a sample value, whole numbers without a decimal point.
+    """
+
+    if value == float('inf'):
+        return '+Inf'
+
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """
+    The metrics the app exports, rendered in the Prometheus text format. `constant` returns labels added to
+    every sample when rendered, e.g. the worker's pid.
+    """
+
+    def __init__(self, constant=dict):
+        self.metrics = []
+        self.constant = constant
+        self._lock = threading.Lock()
+
+
+    def register(self, metric):
+        """
+        Adds a metric to the output. Returns the metric.
+        """
+
+        with self._lock:
+            self.metrics.append(metric)
+
+        return metric
+
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text format.
+        """
+
+        with self._lock:
+            metrics = list(self.metrics)
+
+        constant = self.constant()
+        names, values = tuple(constant), tuple(constant.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.lines(names, values))
+
+        return '\n'.join(lines) + '\n'
+
+
+# every metric defined with the default registry. Each gunicorn worker keeps its own, and a scrape reaches
+# one worker, so samples carry the worker's pid: every series then only goes up, and sum() by the other
+# labels adds the workers up.
+registry = Registry(lambda: {'pid': os.getpid()})
+
+
+class Counter:
+    """
+    A total that only goes up, per set of label values.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=(), registry=registry):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+        registry.register(self)
+
+
+    def inc(self, *labels, by=1):
+        """
+        Adds to the total for the label values.
+        """
+
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + by
+
+
+    def get(self, *labels):
+        """
+        Returns the total for the label values.
+        """
+
+        with self._lock:
+            return self.values.get(labels, 0)
+
+
+    def lines(self, names=(), constant=()):
+        """
+        Returns the samples in the text format, with constant label values for names first.
+        """
+
+        with self._lock:
+            values = dict(self.values)
+
+        return [f'{self.name}{format_labels(names + self.labels, constant + key)} {format_value(value)}' for key, value in sorted(values.items())]
+
+
+class Gauge:
+    """
+    Current values read from a callback when scraped, which returns a value per tuple of label values.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, help, labels=(), callback=dict, registry=registry):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+
+        registry.register(self)
+
+
+    def lines(self, names=(), constant=()):
+        """
+        Returns the samples in the text format, with constant label values for names first.
+        """
+
+        return [f'{self.name}{format_labels(names + self.labels, constant + key)} {format_value(value)}' for key, value in sorted(self.callback().items())]
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets, per set of label values, with their sum and count.
+    Observing is a bisect and three additions under a lock, cheap enough to leave on.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS, registry=registry):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+
+        # per label values: the count in each bucket (not cumulative, the last is +Inf), the sum and the count.
+        self.values = {}
+        self._lock = threading.Lock()
+
+        registry.register(self)
+
+
+    def observe(self, value, *labels):
+        """
+        Counts one observation for the label values.
+        """
+
+        i = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts = self.values.get(labels)
+
+            if counts is None:
+                counts = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            counts[0][i] += 1
+            counts[1] += value
+            counts[2] += 1
+
+
+    @contextmanager
+    def time(self, *labels):
+        """
+        Observes how long the block takes, in seconds.
+        """
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+    def count(self, *labels):
+        """
+        Returns the number of observations for the label values.
+        """
+
+        with self._lock:
+            counts = self.values.get(labels)
+
+            return counts[2] if counts is not None else 0
+
+
+    def lines(self, names=(), constant=()):
+        """
+        Returns the buckets, sum and count in the text format, with constant label values for names first.
+        """
+
+        names = names + self.labels
+
+        with self._lock:
+            values = {key: (list(buckets), total, count) for key, (buckets, total, count) in self.values.items()}
+
+        lines = []
+        for key, (buckets, total, count) in sorted(values.items()):
+            key = constant + key
+
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += n
+                le = 'le="' + format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{format_labels(names, key, le)} {cumulative}')
+
+            lines.append(f'{self.name}_sum{format_labels(names, key)} {format_value(total)}')
+            lines.append(f'{self.name}_count{format_labels(names, key)} {count}')
+
+        return lines
+
+
+# requests by route pattern rather than url, so entry ids don't each get a series.
+request_duration = Histogram('chillpill_request_duration_seconds', 'Time to handle a request, by route.', ('route', 'method', 'status'))
+
+# sentiment scoring, by backend and whether the cache answered.
+sentiment_duration = Histogram('chillpill_sentiment_duration_seconds', 'Time to score one entry, by backend.', ('backend', 'cache'))
+sentiment_errors = Counter('chillpill_sentiment_errors_total', 'Failed sentiment API calls, by backend and reason.', ('backend', 'reason'))
+
+# building the mood plot data /api/mood returns.
+plot_duration = Histogram('chillpill_plot_build_seconds', 'Time to build the mood plot data, by how it is bucketed.', ('unit',))
+
+
+def init_metrics(app):
+    """
+    Times every request the app handles. Call it before other after_request hooks, e.g. compression,
+    so their time is counted too.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop('metrics_start', None)
+
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_duration.observe(time.perf_counter() - start, route, request.method, str(response.status_code))
+
+        return response
@@ -0,0 +1,182 @@
+import os
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+from flask import Flask
+import requests
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry, init_metrics
+from db import CommandStats, command_duration, command_failures
+from sentiment import RemoteSentiment, sentiment_errors
+from utils import sentiment_analysis
+
+
+class TestMetrics(TestCase):
+    """
+    Tests metrics are rendered in the Prometheus text format.
+    """
+
+    def setUp(self):
+        self.registry = Registry()
+
+
+    def test_counter(self):
+        """
+        Tests counters add up per set of label values.
+        """
+
+        counter = Counter('test_total', 'Test counter.', ('kind',), registry=self.registry)
+        counter.inc('a')
+        counter.inc('a', by=2)
+        counter.inc('b"c')
+
+        self.assertEqual(counter.get('a'), 3)
+        self.assertEqual(self.registry.render(), '# HELP test_total Test counter.\n# TYPE test_total counter\n'
+                                                 'test_total{kind="a"} 3\ntest_total{kind="b\\"c"} 1\n')
+
+
+    def test_histogram(self):
+        """
+        Tests histogram buckets are cumulative, with a sum and count.
+        """
+
+        histogram = Histogram('test_seconds', 'Test histogram.', ('route',), buckets=(0.1, 1), registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value, '/')
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_seconds_bucket{route="/",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{route="/",le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{route="/",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{route="/"} 2.65', lines)
+        self.assertIn('test_seconds_count{route="/"} 4', lines)
+
+        with histogram.time('/other'):
+            pass
+
+        self.assertEqual(histogram.count('/other'), 1)
+
+
+    def test_constant_labels(self):
+        """
+        Tests a registry's constant labels come first on every sample.
+        """
+
+        registry = Registry(lambda: {'pid': 7})
+        counter = Counter('test_total', 'Test counter.', ('kind',), registry=registry)
+        counter.inc('a')
+
+        histogram = Histogram('test_seconds', 'Test histogram.', buckets=(1,), registry=registry)
+        histogram.observe(0.5)
+
+        lines = registry.render().splitlines()
+
+        self.assertIn('test_total{pid="7",kind="a"} 1', lines)
+        self.assertIn('test_seconds_bucket{pid="7",le="1"} 1', lines)
+        self.assertIn('test_seconds_count{pid="7"} 1', lines)
+
+
+    def test_gauge(self):
+        """
+        Tests gauges are read when rendered.
+        """
+
+        values = {('a',): 1}
+        Gauge('test_open', 'Test gauge.', ('address',), lambda: values, registry=self.registry)
+
+        values[('a',)] = 5
+        self.assertIn('test_open{address="a"} 5', self.registry.render())
+
+
+    def test_requests(self):
+        """
+        Tests requests are timed by route pattern, method and status.
+        """
+
+        app = Flask(__name__)
+        init_metrics(app)
+        app.add_url_rule('/entries/<_id>', 'entry', lambda _id: _id)
+
+        before = metrics.request_duration.count('/entries/<_id>', 'GET', '200')
+
+        client = app.test_client()
+        client.get('/entries/1')
+        client.get('/entries/2')
+        client.get('/missing')
+
+        self.assertEqual(metrics.request_duration.count('/entries/<_id>', 'GET', '200') - before, 2)
+        self.assertGreaterEqual(metrics.request_duration.count('unmatched', 'GET', '404'), 1)
+
+
+class TestAppMetrics(TestCase):
+    """
+    Tests the app's MongoDB, sentiment and plot metrics.
+    """
+
+    def test_commands(self):
+        """
+        Tests MongoDB command round trips and failures are observed.
+        """
+
+        stats = CommandStats()
+        before = command_duration.count('find'), command_failures.get('find')
+
+        stats.succeeded(MagicMock(command_name='find', duration_micros=1500))
+        stats.failed(MagicMock(command_name='find', duration_micros=500))
+
+        self.assertEqual(command_duration.count('find') - before[0], 2)
+        self.assertEqual(command_failures.get('find') - before[1], 1)
+
+
+    def test_sentiment(self):
+        """
+        Tests scoring is timed, and remote timeouts and errors are counted.
+        """
+
+        backend = RemoteSentiment('http://localhost:1/api/sentiment/', timeout=0.1)
+        before = (metrics.sentiment_duration.count('remote', 'off'), sentiment_errors.get('remote', 'timeout'), sentiment_errors.get('remote', 'error'))
+
+        with patch('utils.get_cache', return_value=None), patch('requests.post', side_effect=requests.Timeout('timed out')), patch('builtins.print'):
+            self.assertIsNone(sentiment_analysis('I love ice cream so much, it is the best!', backend=backend))
+
+        with patch('requests.post', side_effect=requests.ConnectionError('refused')), self.assertRaises(requests.ConnectionError):
+            backend.score('I love ice cream so much, it is the best!')
+
+        self.assertEqual(metrics.sentiment_duration.count('remote', 'off') - before[0], 1)
+        self.assertEqual(sentiment_errors.get('remote', 'timeout') - before[1], 1)
+        self.assertEqual(sentiment_errors.get('remote', 'error') - before[2], 1)
+
+
+class TestMetricsRoute(TestCase):
+    """
+    Tests the /metrics endpoint.
+    """
+
+    def test_scrape(self):
+        """
+        Tests the app's metrics are served in the Prometheus text format.
+        """
+
+        from routes import app
+
+        client = app.test_client()
+        client.get('/team')
+        client.get('/api/mood?unit=week')
+        response = client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+
+        # each worker's samples are told apart by its pid.
+        pid = os.getpid()
+
+        body = response.get_data(as_text=True)
+        self.assertIn(f'chillpill_request_duration_seconds_count{{pid="{pid}",route="/team",method="GET",status="200"}}', body)
+        self.assertIn('# TYPE chillpill_mongo_command_duration_seconds histogram', body)
+        self.assertIn(f'chillpill_plot_build_seconds_count{{pid="{pid}",unit="week"}}', body)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+from datetime import datetime as dt
+from pymongo import UpdateOne
+
+from models import TIMESTAMP_FORMAT
+from utils import chunked
+
+
+# timestamp fields stored as strings before datetimes.
+TIMESTAMP_FIELDS = ('timestamp', 'last timestamp')
+
+
+def migrate_timestamps(collection, batch_size=1000):
+    """
+    Converts string timestamps to datetimes, streaming batch_size documents at a time.
+    Returns the number of documents migrated and the number of values that couldn't be parsed.
+    """
+
+    query = {'$or': [{field: {'$type': 'string'}} for field in TIMESTAMP_FIELDS]}
+    projection = {field: 1 for field in TIMESTAMP_FIELDS}
+
+    cursor = collection.find(query, projection).batch_size(batch_size)
+
+    migrated = 0
+    failed = 0
+    for batch in chunked(cursor, batch_size):
+        requests = []
+
+        for doc in batch:
+            update_data = {}
+
+            for field in TIMESTAMP_FIELDS:
+                if isinstance(doc.get(field), str):
+                    try:
+                        update_data[field] = dt.strptime(doc[field], TIMESTAMP_FORMAT)
+
+                    except ValueError as e:
+                        print("Please see error below.")
+                        print(e)
+                        failed += 1
+
+            if update_data:
+                # only update values that haven't changed since they were read.
+                match = {field: doc[field] for field in update_data}
+                requests.append(UpdateOne({'_id': doc['_id'], **match}, {'$set': update_data}))
+
+        if requests:
+            migrated += collection.bulk_write(requests, ordered=False).modified_count
+
+    return migrated, failed
+
+
+def migrate_sentiments(collection):
+    """
+    Converts string sentiments to doubles on the server. Strings that aren't numbers become None,
+    so they are re-scored by a backfill. Returns the number of documents migrated.
+    """
+
+    result = collection.update_many(
+        {'sentiment': {'$type': 'string'}},
+        [{'$set': {'sentiment': {'$convert': {'input': '$sentiment', 'to': 'double', 'onError': None}}}}]
+        )
+
+    return result.modified_count
@@ -0,0 +1,87 @@
+from unittest import TestCase, main
+from datetime import datetime as dt
+
+from config import client
+from migrations import migrate_timestamps, migrate_sentiments
+
+
+class TestMigrateTimestamps(TestCase):
+    """
+    Tests the string to datetime timestamp migration.
+    """
+
+    def setUp(self):
+        """
+        Uses a test collection, emptied for each test.
+        """
+
+        self.log = client['testdb']['migrations']
+        self.log.delete_many({})
+
+
+    def test_migrate(self):
+        """
+        Tests string timestamps are converted, in batches.
+        """
+
+        for day in range(1, 6):
+            self.log.insert_one({'body': 'Test body', 'timestamp': f'0{day}/12/2023 10:30:00'})
+
+        self.log.insert_one({'body': 'Edited', 'timestamp': '30/11/2023 09:00:00', 'last timestamp': '01/12/2023 18:45:10'})
+
+        self.assertEqual(migrate_timestamps(self.log, batch_size=2), (6, 0))
+        self.assertEqual(self.log.count_documents({'timestamp': {'$type': 'string'}}), 0)
+
+        edited = self.log.find_one({'body': 'Edited'})
+        self.assertEqual(edited['timestamp'], dt(2023, 11, 30, 9, 0, 0))
+        self.assertEqual(edited['last timestamp'], dt(2023, 12, 1, 18, 45, 10))
+
+        # running again has nothing to do.
+        self.assertEqual(migrate_timestamps(self.log), (0, 0))
+
+
+    def test_unparseable(self):
+        """
+        Tests timestamps that can't be parsed are counted and left alone.
+        """
+
+        self.log.insert_one({'body': 'Test body', 'timestamp': 'yesterday'})
+
+        self.assertEqual(migrate_timestamps(self.log), (0, 1))
+        self.assertEqual(self.log.find_one()['timestamp'], 'yesterday')
+
+
+class TestMigrateSentiments(TestCase):
+    """
+    Tests the string to double sentiment migration.
+    """
+
+    def setUp(self):
+        """
+        Uses a test collection, emptied for each test.
+        """
+
+        self.log = client['testdb']['migrations']
+        self.log.delete_many({})
+
+
+    def test_migrate(self):
+        """
+        Tests numeric strings become doubles and anything else becomes None.
+        """
+
+        self.log.insert_many([
+            {'body': 'String', 'sentiment': '7.15'},
+            {'body': 'Number', 'sentiment': 2.43},
+            {'body': 'Broken', 'sentiment': 'n/a'},
+            {'body': 'Objective', 'sentiment': None}
+            ])
+
+        self.assertEqual(migrate_sentiments(self.log), 2)
+
+        sentiments = {doc['body']: doc['sentiment'] for doc in self.log.find()}
+        self.assertEqual(sentiments, {'String': 7.15, 'Number': 2.43, 'Broken': None, 'Objective': None})
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,168 @@
 
-from flask_pymongo import PyMongo
-from datetime import datetime as dt
-from bson import json_util, ObjectId
-import json
-from plotly.offline import plot
-import plotly.express as px
-import pandas as pd
+import threading
+from db import get_database
+from datetime import datetime as dt, timedelta
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from collections import defaultdict
+from collections.abc import MutableMapping
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from markupsafe import Markup
-import numpy as np
 from abc import ABC, abstractmethod
+from functools import wraps
+
+from cache import MISSING, WriteCounter
+from metrics import plot_duration
+from utils import lttb
+from search import create_search, snippet
+
+
+# display format for timestamps, also the format entries were stored in before datetimes.
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# entries with a sentiment.
+NUMERIC_SENTIMENT = {'sentiment': {'$type': 'number'}}
+
+# characters of each entry body shown on the entries page.
+PREVIEW_LENGTH = 200
+
+# windows up to a month are plotted entry by entry, longer ones from the rollups.
+RAW_WINDOW = timedelta(days=31)
+
+# single-user indexes replaced by ones starting with user_id.
+LEGACY_INDEXES = ['timestamp_-1', 'sentiment_1_timestamp_1', 'timestamp_-1_sentiment_1']
+
+# MongoDB's error code for an _id that is already taken.
+DUPLICATE_KEY = 11000
+
+# sentiment_status values for journal entries.
+SENTIMENT_PENDING = 'pending'
+SENTIMENT_DONE = 'done'
+SENTIMENT_FAILED = 'failed'
+
+
+def partition_key(name, user_id=None):
+    """
+    Returns the key a user's share of a journal's stats, rollups and write counter are stored under.
+    The default user, None, keeps the plain name, so journals from before users keep their stats.
+    """
+
+    return name if user_id is None else f'{name}:{user_id}'
+
+
+def now():
+    """
+    Returns the current time at the millisecond precision MongoDB stores, so it can be queried back exactly.
+    """
+
+    time = dt.now()
+
+    return time.replace(microsecond=time.microsecond // 1000 * 1000)
+
+
+def format_timestamp(timestamp):
+    """
+    Formats a stored timestamp for display. Accepts datetimes and legacy strings.
+    """
+
+    if isinstance(timestamp, dt):
+        return timestamp.strftime(TIMESTAMP_FORMAT)
+
+    # legacy strings are already formatted.
+    return '' if timestamp is None else str(timestamp)
+
+
+def format_sentiment(sentiment):
+    """
+    Formats a stored sentiment to 2 decimal places for display.
+    """
+
+    if isinstance(sentiment, (int, float)):
+        return f'{sentiment:.2f}'
+
+    # legacy strings are already formatted.
+    return '' if sentiment is None else str(sentiment)
+
+
+class EntryView(MutableMapping):
+    """
+    Lightweight view of a journal entry, decoded straight from BSON by the driver.
+    Fields are attributes, e.g. `entry.id`, and the entry can still be read like a dict.
+    """
+
+    # document keys that have their own attribute.
+    FIELDS = {
+        '_id': 'id',
+        'body': 'body',
+        'sentiment': 'sentiment',
+        'sentiment_status': 'sentiment_status',
+        'timestamp': 'timestamp',
+        'last timestamp': 'last_timestamp',
+        'truncated': 'truncated',
+        'user_id': 'user_id'
+    }
+
+    __slots__ = tuple(FIELDS.values()) + ('_extra',)
+
+    def __init__(self):
+        for attr in self.FIELDS.values():
+            setattr(self, attr, None)
+
+        # any other keys, rarely used.
+        self._extra = None
+
+
+    def __setitem__(self, key, value):
+        attr = self.FIELDS.get(key)
+
+        if attr is not None:
+            setattr(self, attr, value)
+
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+
+    def __getitem__(self, key):
+        attr = self.FIELDS.get(key)
+
+        if attr is not None:
+            return getattr(self, attr)
+
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+
+        raise KeyError(key)
+
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            self[key] = None
+
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+
+        else:
+            raise KeyError(key)
+
+
+    def __iter__(self):
+        yield from self.FIELDS
+        yield from self._extra or ()
+
+
+    def __len__(self):
+        return len(self.FIELDS) + len(self._extra or ())
+
+
+    def __repr__(self):
+        return f'EntryView({self.id})'
+
+
+# decodes journal entries into views. entries are flat, any nested documents would be views too.
+ENTRY_CODEC = CodecOptions(document_class=EntryView)
 
 
 class DBConn:
@@ -22,6 +176,12 @@ class DBConn:
         Connects to a collection in a DB.
         """
 
+    @abstractmethod
+    def ping(self):
+        """
+        Checks the DB is reachable, raising if not.
+        """
+
 
 class DataManager(ABC):
     """
@@ -65,9 +225,9 @@ class MongoDBConn(DBConn):
     """
 
     def __init__(self, app):
-        self.mongo = PyMongo(app)
-        self.db = self.mongo.db
-        self.collection = self.mongo.db.log
+        # shares the process's client, and its connection pool, with the rest of the app.
+        self.db = get_database(app.config['MONGO_URI'], **app.config.get('MONGO_OPTIONS', {}))
+        self.collection = self.db.log
     
 
     def __str__(self):
@@ -86,16 +246,419 @@ class MongoDBConn(DBConn):
         return self.collection
 
 
+    def ping(self):
+        """
+        Round trip to the MongoDB server.
+        """
+
+        self.db.client.admin.command('ping')
+
+
+class MoodStats:
+    """
+    Running mood aggregates for a journal, kept in one document and updated on every write.
+    """
+
+    # bounded lists kept in the document, with how $push keeps them sorted and sliced.
+    LISTS = {
+        'lowest': {'$sort': {'sentiment': 1}, '$slice': 3},
+        'highest': {'$sort': {'sentiment': -1}, '$slice': 3},
+        'recent': {'$sort': {'timestamp': 1}, '$slice': -7}
+    }
+
+    def __init__(self, log, collection, user_id=None):
+        self.log = log
+        self.collection = collection
+
+        # one document per user of each journal collection.
+        self.scope = {'user_id': user_id}
+        self.key = partition_key(log.name, user_id)
+
+
+    def read(self):
+        """
+        Returns the stats document, rebuilding it if it is missing or stale.
+        """
+
+        doc = self.collection.find_one({'_id': self.key})
+
+        if doc is None or doc.get('stale'):
+            doc = self.rebuild()
+
+        return doc
+
+
+    def change(self, old=None, new=None):
+        """
+        Applies an entry's sentiment changing from old to new. Either is an item from
+        `item()`, or None when an entry is created or deleted.
+        """
+
+        # e.g. editing an entry that hasn't been scored yet.
+        if old is None and new is None:
+            return
+
+        inc = {'count': 0, 'sum': 0}
+        update = {'$inc': inc}
+
+        refill = set()
+        if old is not None:
+            inc['count'] -= 1
+            inc['sum'] -= old['sentiment']
+
+            # lists holding the old entry are re-read from the log, which already has the change.
+            doc = self.collection.find_one({'_id': self.key}) or {}
+            refill = {name for name in self.LISTS if any(item['id'] == old['id'] for item in doc.get(name, []))}
+
+            if refill:
+                update['$set'] = {name: self.query(name) for name in refill}
+
+        if new is not None:
+            inc['count'] += 1
+            inc['sum'] += new['sentiment']
+
+            push = {name: {'$each': [new], **self.LISTS[name]} for name in self.LISTS if name not in refill}
+            if push:
+                update['$push'] = push
+
+        # with no stats yet, e.g. on a journal from before them, one entry's worth would hide its history.
+        if self.collection.update_one({'_id': self.key}, update).matched_count == 0:
+            self.mark_stale()
+
+
+    def mark_stale(self):
+        """
+        Flags the stats for a rebuild on the next read, e.g. after a bulk write.
+        """
+
+        self.collection.update_one({'_id': self.key}, {'$set': {'stale': True}}, upsert=True)
+
+
+    def query(self, name):
+        """
+        Reads one of the bounded lists from the log, using the sentiment indexes.
+        """
+
+        projection = {'sentiment': 1, 'timestamp': 1}
+
+        # both are read off the {user_id, timestamp, sentiment} and {user_id, sentiment, timestamp} indexes.
+        if name == 'recent':
+            entries = self.log.find({**self.scope, **NUMERIC_SENTIMENT}, projection).sort('timestamp', -1).limit(7)
+            return [self.item(entry) for entry in entries][::-1]
+
+        order = 1 if name == 'lowest' else -1
+        entries = self.log.find({**self.scope, **NUMERIC_SENTIMENT}, projection).sort('sentiment', order).limit(3)
+
+        return [self.item(entry) for entry in entries]
+
+
+    def compute(self):
+        """
+        Computes the stats from scratch.
+        """
+
+        totals = list(self.log.aggregate([
+            {'$match': {**self.scope, **NUMERIC_SENTIMENT}},
+            {'$group': {'_id': None, 'count': {'$sum': 1}, 'sum': {'$sum': '$sentiment'}}}
+            ]))
+
+        doc = {'_id': self.key, 'count': 0, 'sum': 0}
+        if totals:
+            doc['count'] = totals[0]['count']
+            doc['sum'] = totals[0]['sum']
+
+        for name in self.LISTS:
+            doc[name] = self.query(name)
+
+        return doc
+
+
+    def rebuild(self):
+        """
+        Recomputes the stats from scratch and saves them. Returns the new document.
+        """
+
+        doc = self.compute()
+        self.collection.replace_one({'_id': self.key}, doc, upsert=True)
+
+        return doc
+
+
+    def check(self):
+        """
+        Compares the stored stats with a fresh computation. Returns the names of fields that differ.
+        """
+
+        stored = self.collection.find_one({'_id': self.key}) or {}
+        fresh = self.compute()
+
+        # lists are compared by value, as entries tied on sentiment or timestamp can be kept in any order.
+        def values(doc, name):
+            items = doc.get(name, [])
+
+            if name == 'recent':
+                return sorted((item['timestamp'], item['sentiment']) for item in items)
+
+            return [item['sentiment'] for item in items]
+
+        differ = [name for name in self.LISTS if values(stored, name) != values(fresh, name)]
+
+        if stored.get('count') != fresh['count']:
+            differ.insert(0, 'count')
+
+        # running sums drift by float rounding.
+        if abs(stored.get('sum', 0) - fresh['sum']) > 1e-6:
+            differ.append('sum')
+
+        return differ
+
+
+    @staticmethod
+    def item(entry):
+        """
+        Returns the part of an entry kept in the bounded lists.
+        """
+
+        return {'id': entry['_id'], 'sentiment': entry['sentiment'], 'timestamp': entry.get('timestamp')}
+
+
+    @staticmethod
+    def scored(entry):
+        """
+        Returns whether an entry has a numeric sentiment.
+        """
+
+        return entry is not None and isinstance(entry.get('sentiment'), (int, float))
+
+
+def bucket_start(timestamp, unit):
+    """
+    Returns the start of the day, week (from Monday) or month a timestamp falls in.
+    """
+
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if unit == 'week':
+        return day - timedelta(days=day.weekday())
+
+    if unit == 'month':
+        return day.replace(day=1)
+
+    return day
+
+
+def bucket_end(start, unit):
+    """
+    Returns the start of the next bucket.
+    """
+
+    if unit == 'week':
+        return start + timedelta(weeks=1)
+
+    if unit == 'month':
+        return (start + timedelta(days=31)).replace(day=1)
+
+    return start + timedelta(days=1)
+
+
+class MoodRollups:
+    """
+    Daily, weekly and monthly sentiment rollups (count, sum, min, max) for a journal, updated on every write.
+    """
+
+    # rollup collection for each bucket size.
+    UNITS = {
+        'day': 'mood_daily',
+        'week': 'mood_weekly',
+        'month': 'mood_monthly'
+    }
+
+    def __init__(self, log, database, user_id=None):
+        self.log = log
+        self.collections = {unit: database[name] for unit, name in self.UNITS.items()}
+
+        # rollups from every journal and user share the collections, keyed by the log name and user.
+        self.scope = {'user_id': user_id}
+        self.key = partition_key(log.name, user_id)
+
+        # flags rollups for a rebuild, kept beside the mood stats.
+        self.meta = database['mood_stats']
+        self.meta_key = f'{self.key}:rollups'
+
+
+    def ensure_indexes(self):
+        """
+        Creates the index rollups are upserted and range queried by.
+        """
+
+        for collection in self.collections.values():
+            collection.create_index([('log', 1), ('start', 1)], unique=True)
+
+
+    def read(self, unit, start=None, end=None):
+        """
+        Returns the buckets overlapping start (inclusive) to end (exclusive), oldest first, rebuilding them if stale
+        or never built.
+        """
+
+        meta = self.meta.find_one({'_id': self.meta_key})
+
+        # rollups that were never built, e.g. on a journal from before them, are built from its history.
+        if meta is None or meta.get('stale'):
+            self.rebuild()
+
+        query = {'log': self.key}
+
+        window = {}
+        if start is not None:
+            window['$gte'] = bucket_start(start, unit)
+        if end is not None:
+            window['$lt'] = end
+        if window:
+            query['start'] = window
+
+        return list(self.collections[unit].find(query, {'_id': 0, 'log': 0}).sort('start', 1))
+
+
+    def change(self, old=None, new=None):
+        """
+        Applies an entry's sentiment changing from old to new. Either is an item from
+        `MoodStats.item()`, or None when an entry is created or deleted.
+        """
+
+        # only datetime timestamps can be bucketed.
+        old = old if old is not None and isinstance(old['timestamp'], dt) else None
+        new = new if new is not None and isinstance(new['timestamp'], dt) else None
+
+        for unit, collection in self.collections.items():
+            refresh = None
+
+            if old is not None:
+                start = bucket_start(old['timestamp'], unit)
+                doc = collection.find_one_and_update(
+                    {'log': self.key, 'start': start},
+                    {'$inc': {'count': -1, 'sum': -old['sentiment']}},
+                    return_document=ReturnDocument.AFTER
+                    )
+
+                # min and max can't be undone, so buckets that lose them are re-read from the log.
+                if doc is None or doc['count'] <= 0 or old['sentiment'] <= doc['min'] or old['sentiment'] >= doc['max']:
+                    refresh = start
+
+            if new is not None:
+                start = bucket_start(new['timestamp'], unit)
+
+                # the log already has the new sentiment, so a refreshed bucket includes it.
+                if start != refresh:
+                    collection.update_one(
+                        {'log': self.key, 'start': start},
+                        {
+                            '$inc': {'count': 1, 'sum': new['sentiment']},
+                            '$min': {'min': new['sentiment']},
+                            '$max': {'max': new['sentiment']}
+                        },
+                        upsert=True
+                        )
+
+            if refresh is not None:
+                self.refresh(unit, refresh)
+
+
+    def refresh(self, unit, start):
+        """
+        Recomputes one bucket from the log, using the timestamp index.
+        """
+
+        totals = list(self.log.aggregate([
+            {'$match': {**self.scope, 'timestamp': {'$gte': start, '$lt': bucket_end(start, unit)}, **NUMERIC_SENTIMENT}},
+            {'$group': {'_id': None, 'count': {'$sum': 1}, 'sum': {'$sum': '$sentiment'}, 'min': {'$min': '$sentiment'}, 'max': {'$max': '$sentiment'}}}
+            ]))
+
+        # the bucket's last entry was removed.
+        if not totals or not totals[0]['count']:
+            self.collections[unit].delete_one({'log': self.key, 'start': start})
+            return
+
+        totals[0].pop('_id')
+        self.collections[unit].update_one({'log': self.key, 'start': start}, {'$set': totals[0]}, upsert=True)
+
+
+    def mark_stale(self):
+        """
+        Flags the rollups for a rebuild on the next read, e.g. after a bulk write.
+        """
+
+        self.meta.update_one({'_id': self.meta_key}, {'$set': {'stale': True}}, upsert=True)
+
+
+    def rebuild(self, batch_size=1000):
+        """
+        Recomputes every rollup from scratch in one pass over the log. Returns the number of buckets per unit.
+        """
+
+        buckets = {unit: defaultdict(lambda: {'count': 0, 'sum': 0, 'min': None, 'max': None}) for unit in self.collections}
+
+        query = {**self.scope, 'timestamp': {'$type': 'date'}, **NUMERIC_SENTIMENT}
+        for entry in self.log.find(query, {'_id': 0, 'sentiment': 1, 'timestamp': 1}).batch_size(batch_size):
+            sentiment = entry['sentiment']
+
+            for unit in self.collections:
+                bucket = buckets[unit][bucket_start(entry['timestamp'], unit)]
+                bucket['count'] += 1
+                bucket['sum'] += sentiment
+                bucket['min'] = sentiment if bucket['min'] is None else min(bucket['min'], sentiment)
+                bucket['max'] = sentiment if bucket['max'] is None else max(bucket['max'], sentiment)
+
+        for unit, collection in self.collections.items():
+            collection.delete_many({'log': self.key})
+
+            if buckets[unit]:
+                collection.insert_many([{'log': self.key, 'start': start, **bucket} for start, bucket in buckets[unit].items()])
+
+        self.meta.update_one({'_id': self.meta_key}, {'$set': {'stale': False}}, upsert=True)
+
+        return {unit: len(buckets[unit]) for unit in self.collections}
+
+
+    def check(self):
+        """
+        Compares the stored rollups with a rebuild, without saving it. Returns the units that differ.
+        """
+
+        differ = []
+        for unit, collection in self.collections.items():
+            stored = {doc['start']: doc for doc in collection.find({'log': self.key})}
+
+            fresh = {}
+            query = {**self.scope, 'timestamp': {'$type': 'date'}, **NUMERIC_SENTIMENT}
+            for entry in self.log.find(query, {'sentiment': 1, 'timestamp': 1}):
+                fresh.setdefault(bucket_start(entry['timestamp'], unit), []).append(entry['sentiment'])
+
+            # running sums drift by float rounding.
+            same = stored.keys() == fresh.keys() and all(
+                stored[start]['count'] == len(values)
+                and abs(stored[start]['sum'] - sum(values)) < 1e-6
+                and (stored[start]['min'], stored[start]['max']) == (min(values), max(values))
+                for start, values in fresh.items()
+                )
+
+            if not same:
+                differ.append(unit)
+
+        return differ
+
+
 class JournalEntry:
 
-  def __init__(self, body, sentiment):
+  def __init__(self, body, sentiment, sentiment_status=SENTIMENT_DONE):
     """
     An instance of a journal entry.
     """
     
     self.body = body
     self.sentiment = sentiment
-    self.timestamp = dt.now().strftime("%d/%m/%Y %H:%M:%S")
+    self.sentiment_status = sentiment_status
+    self.timestamp = now()
 
 
 class JournalManager(DataManager):
@@ -103,26 +666,54 @@ class JournalManager(DataManager):
     Inherits from DataManager for the journal CRUD functionalities.
     """
 
-    def __init__(self, dbconnection):
+    def __init__(self, dbconnection, counter=None, search_backend='text', user_id=None):
 
         # get the collection from the DB connection.
         self.collection = dbconnection.get_collection()
+
+        # every query is limited to one user's entries, and starts with user_id so it uses the user's part of each index.
+        self.user_id = user_id
+        self.scope = {'user_id': user_id}
+
+        # counts writes, so cached analytics know when they're stale.
+        self.counter = counter or WriteCounter()
+
+        # running mood aggregates, updated on every write.
+        self.stats = MoodStats(self.collection, self.collection.database['mood_stats'], user_id)
+
+        # daily, weekly and monthly rollups for long-range history, updated on every write.
+        self.rollups = MoodRollups(self.collection, self.collection.database, user_id)
+
+        # the same collection, read as entry views.
+        self.entries = self.collection.with_options(codec_options=ENTRY_CODEC)
+
+        # full-text search over entry bodies.
+        self.search_backend = create_search(search_backend, self.entries, self.scope)
     
 
-    def create(self, body, sentiment):
+    def create(self, body, sentiment, sentiment_status=SENTIMENT_DONE):
         """
         Creates a journal entry and sends it to the collection.
         """
 
         # initialise a journal entry as an object.
-        entry = JournalEntry(body, sentiment)
+        entry = JournalEntry(body, sentiment, sentiment_status)
 
         # add entry to mongo db collection.
         submission = self.collection.insert_one({
+        'user_id': self.user_id,
         'body': entry.body,
         'sentiment': entry.sentiment,
+        'sentiment_status': entry.sentiment_status,
         'timestamp': entry.timestamp
         })
+        self.counter.bump()
+        self.search_backend.add(submission.inserted_id, entry.body)
+
+        if MoodStats.scored({'sentiment': entry.sentiment}):
+            item = MoodStats.item({'_id': submission.inserted_id, 'sentiment': entry.sentiment, 'timestamp': entry.timestamp})
+            self.stats.change(new=item)
+            self.rollups.change(new=item)
     
         # return entry id
         return submission.inserted_id
@@ -130,212 +721,888 @@ class JournalManager(DataManager):
 
     def read_all(self):
         """
-        Returns all entries in the log collection.
+        Returns all the user's entries, streamed as EntryViews.
         """
         
-        # return all entries.
-        all_entries = self.collection.find()
-
-        # returns in json formatting.
-        return json.loads(json_util.dumps(all_entries))
+        # return all entries, the cursor decodes them as they're iterated.
+        return self.entries.find(self.scope)
     
    
+    def read_page(self, page_size=20, after=None, before=None):
+        """
+        Reads a page of entries, newest first, with a preview of each body. Pages are keyed on _id:
+        `after` reads the page following an entry id, `before` the page preceding one.
+        Returns the entries with the `next` and `prev` cursors, None at either end.
+        """
+
+        # the body preview is cut short on the server.
+        body = {'$ifNull': ['$body', '']}
+        projection = {
+            'body': {'$substrCP': [body, 0, PREVIEW_LENGTH]},
+            'truncated': {'$gt': [{'$strLenCP': body}, PREVIEW_LENGTH]},
+            'sentiment': 1,
+            'sentiment_status': 1,
+            'timestamp': 1
+        }
+
+        # read one extra entry to see if there's another page.
+        if before is not None:
+            cursor = self.entries.find({**self.scope, '_id': {'$gt': ObjectId(before)}}, projection).sort('_id', 1).limit(page_size + 1)
+        elif after is not None:
+            cursor = self.entries.find({**self.scope, '_id': {'$lt': ObjectId(after)}}, projection).sort('_id', -1).limit(page_size + 1)
+        else:
+            cursor = self.entries.find(self.scope, projection).sort('_id', -1).limit(page_size + 1)
+
+        entries = list(cursor)
+        more = len(entries) > page_size
+        entries = entries[:page_size]
+
+        # pages before a cursor are read oldest first.
+        if before is not None:
+            entries.reverse()
+
+        page = {
+            'entries': entries,
+            'next': None,
+            'prev': None
+        }
+
+        if entries:
+            # there are newer entries if we paged forwards or there's more before the cursor.
+            if after is not None or (before is not None and more):
+                page['prev'] = str(entries[0].id)
+
+            # there are older entries if there's more after the cursor or we paged backwards.
+            if before is not None or more:
+                page['next'] = str(entries[-1].id)
+
+        return page
+
+   
     def read_one(self, _id):
         """
         Reads a single entry based on its id.
         """
         
         # return a single entry.
-        entry = self.collection.find({'_id': ObjectId(_id)})
-
-        return json.loads(json_util.dumps(entry))
+        return list(self.entries.find({**self.scope, '_id': ObjectId(_id)}))
     
 
+    def read_range(self, start=None, end=None, limit=None, newest_first=True):
+        """
+        Reads entries with a timestamp from start (inclusive) to end (exclusive), using the timestamp index.
+        """
+
+        query = {}
+        if start is not None:
+            query['$gte'] = start
+        if end is not None:
+            query['$lt'] = end
+
+        # only entries with datetime timestamps, legacy strings can't be compared.
+        query['$type'] = 'date'
+
+        entries = self.entries.find({**self.scope, 'timestamp': query}).sort('timestamp', -1 if newest_first else 1)
+
+        if limit:
+            entries = entries.limit(limit)
+
+        return list(entries)
+
+
+    def search(self, query, limit=20, cursor=None, min_sentiment=None, max_sentiment=None, start=None, end=None):
+        """
+        Searches entry bodies, best matches first, optionally within a sentiment range and from start (inclusive)
+        to end (exclusive). `cursor` is the `next` cursor of the previous page.
+        Returns the entries, each with a score and a highlighted snippet, and the `next` cursor, None at the end.
+        """
+
+        # relevance order can't be keyed on a field, so pages are offsets.
+        skip = max(int(cursor), 0) if cursor else 0
+
+        filter = dict(self.scope)
+
+        sentiment = {}
+        if min_sentiment is not None:
+            sentiment['$gte'] = min_sentiment
+        if max_sentiment is not None:
+            sentiment['$lte'] = max_sentiment
+        if sentiment:
+            filter['sentiment'] = sentiment
+
+        if start is not None or end is not None:
+            filter['timestamp'] = {'$type': 'date'}
+        if start is not None:
+            filter['timestamp']['$gte'] = start
+        if end is not None:
+            filter['timestamp']['$lt'] = end
+
+        projection = {'body': 1, 'sentiment': 1, 'sentiment_status': 1, 'timestamp': 1}
+
+        # read one extra entry to see if there's another page.
+        entries = self.search_backend.find(query, filter, skip, limit + 1, projection)
+        more = len(entries) > limit
+        entries = entries[:limit]
+
+        for entry in entries:
+            entry['snippet'] = snippet(entry.get('body'), query)
+
+        return {
+            'results': entries,
+            'next': str(skip + limit) if more else None
+        }
+
+
+    def export(self, batch_size=1000, after=None):
+        """
+        Streams the user's entries as EntryViews in _id order, batch_size per round trip, optionally after an entry id.
+        """
+
+        query = dict(self.scope)
+        if after is not None:
+            query['_id'] = {'$gt': ObjectId(after)}
+
+        # read off the {user_id, _id} index, so an export can carry on from any entry.
+        return self.entries.find(query).sort('_id', 1).batch_size(batch_size)
+
+
+    def insert_many(self, entries, ordered=False):
+        """
+        Inserts many entries in one round trip, keeping any _id they have so importing them again skips them.
+        Unordered inserts skip entries that already exist, ordered ones stop at the first. Returns the number inserted.
+        """
+
+        docs = [{**entry, 'user_id': self.user_id} for entry in entries]
+
+        if not docs:
+            return 0
+
+        written = []
+        try:
+            self.collection.insert_many(docs, ordered=ordered)
+            written = docs
+
+        except BulkWriteError as e:
+            # an ordered insert stops at its first error, an unordered one skips the entries that failed.
+            if ordered:
+                written = docs[:e.details['nInserted']]
+            else:
+                failed = {error['index'] for error in e.details['writeErrors']}
+                written = [doc for i, doc in enumerate(docs) if i not in failed]
+
+            # anything but entries that are already there is a real failure.
+            if ordered or any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                raise
+
+        finally:
+            if written:
+                self.counter.bump()
+
+                # skipped entries keep the bodies already indexed for them.
+                for doc in written:
+                    self.search_backend.add(doc['_id'], doc.get('body'))
+
+                # cheaper to rebuild the mood stats and rollups once than to track each entry.
+                self.stats.mark_stale()
+                self.rollups.mark_stale()
+
+        return len(written)
+
+
+    def unscored(self, batch_size=100):
+        """
+        Returns the entries never scored, still pending or failed, with their _id and body.
+        """
+
+        query = {**self.scope, 'sentiment': None, 'sentiment_status': {'$ne': SENTIMENT_DONE}}
+
+        return self.collection.find(query, {'body': 1}).batch_size(batch_size)
+
+
+    def bodies(self, batch_size=500, query=None):
+        """
+        Returns every entry matching an optional query, with its _id and body.
+        """
+
+        return self.collection.find({**self.scope, **(query or {})}, {'body': 1}).batch_size(batch_size)
+
+
+    def users(self):
+        """
+        Returns the id of every user with entries, not counting the default user.
+        """
+
+        # covered by the indexes starting with user_id.
+        return [user_id for user_id in self.collection.distinct('user_id') if user_id is not None]
+
+
+    def ensure_indexes(self):
+        """
+        Creates the indexes the journal queries rely on.
+        """
+
+        # indexes from before users, every query now starts with user_id.
+        existing = self.collection.index_information()
+        for name in LEGACY_INDEXES:
+            if name in existing:
+                self.collection.drop_index(name)
+
+        # "last N entries", date ranges and the recent sentiments. {user_id, timestamp} is the shard key.
+        self.collection.create_index([('user_id', 1), ('timestamp', 1), ('sentiment', 1)])
+
+        # lowest/highest sentiments, covering the timestamps they display.
+        self.collection.create_index([('user_id', 1), ('sentiment', 1), ('timestamp', 1)])
+
+        # pages of entries, newest first.
+        self.collection.create_index([('user_id', 1), ('_id', 1)])
+
+        # rollup upserts and range reads.
+        self.rollups.ensure_indexes()
+
+        # full-text search.
+        self.search_backend.ensure_indexes()
+
+    
     def check_one(self, query):
         """
         Checks that an entry exists based on a query.
         """
 
         # check that a query exists.
-        if self.collection.find_one(query):
+        if self.collection.find_one({**self.scope, **query}):
             return True
         return False
     
     
-    def update(self, _id, update_data):
+    def update(self, _id, update_data, match=None):
         """
-        Updates an entry with new data based on its id.
+        Updates an entry with new data based on its id. `match` adds fields the entry must still have.
+        Returns the number of entries matched, 0 if the entry is gone or no longer matches.
         """
         
-        self.collection.update_one(
-            {"_id": ObjectId(_id)},
-            {"$set": update_data}
-            )
+        query = {"_id": ObjectId(_id), **self.scope, **(match or {})}
+
+        # sentiment changes update the mood stats and rollups, which need the old value.
+        if 'sentiment' in update_data:
+            old = self.collection.find_one_and_update(
+                query,
+                {"$set": update_data},
+                projection={'sentiment': 1, 'timestamp': 1}
+                )
+            matched = int(old is not None)
+
+            if old is not None:
+                new = {**old, 'sentiment': update_data['sentiment']}
+                old = MoodStats.item(old) if MoodStats.scored(old) else None
+                new = MoodStats.item(new) if MoodStats.scored(new) else None
+
+                self.stats.change(old=old, new=new)
+                self.rollups.change(old=old, new=new)
+        else:
+            matched = self.collection.update_one(query, {"$set": update_data}).matched_count
+
+        if not matched:
+            return 0
+
+        self.counter.bump()
+
+        if 'body' in update_data:
+            self.search_backend.add(ObjectId(_id), update_data['body'])
+
+        return matched
+
+    
+    def bulk_update(self, updates):
+        """
+        Applies many (_id, update_data, match) updates in one round trip. Returns the number modified.
+        """
+
+        requests = [
+            UpdateOne({"_id": ObjectId(_id), **self.scope, **(match or {})}, {"$set": update_data})
+            for _id, update_data, match in updates
+            ]
+
+        if not requests:
+            return 0
+
+        result = self.collection.bulk_write(requests, ordered=False)
+        self.counter.bump()
+
+        # cheaper to rebuild the mood stats and rollups once than to track each change.
+        self.stats.mark_stale()
+        self.rollups.mark_stale()
+
+        return result.modified_count
 
     
     def delete(self, _id):
         """
-        Deletes an entry with an _id.
+        Deletes an entry with an _id. Returns the number of entries deleted, 0 if it was already gone.
         """
         
-        self.collection.delete_one(
-            {"_id": ObjectId(_id)}
+        old = self.collection.find_one_and_delete(
+            {"_id": ObjectId(_id), **self.scope},
+            projection={'sentiment': 1, 'timestamp': 1}
             )
+
+        if old is None:
+            return 0
+
+        self.counter.bump()
+        self.search_backend.remove(ObjectId(_id))
+
+        if MoodStats.scored(old):
+            self.stats.change(old=MoodStats.item(old))
+            self.rollups.change(old=MoodStats.item(old))
+
+        return 1
  
 
+def plot_sentiments(df):
+    """
+    Plots a styled line graph of a timestamp/sentiment DataFrame. Returns the figure as HTML.
+    """
+
+    # plotly takes a few hundred ms to import, so only mood pages pay for it.
+    import numpy as np
+    import plotly.express as px
+    from plotly.offline import plot
+
+    # setup plot.
+    fig = px.line(df, x='timestamp', y='sentiment', title='Your Mood So Far!')
+
+    # add plot markers.
+    fig.update_traces(mode='lines+markers')
+    
+    colors = np.where(df['sentiment'] < 4, '#add8e6', np.where(df['sentiment'] <= 6, '#c5a3ff', '#ffb6c1'))
+    
+    # plot styling.
+    fig.update_traces(marker=dict(color=colors), line=dict(color='#c36c83'))
+    fig.update_layout(
+        plot_bgcolor='#f7c7d8',
+        paper_bgcolor='white',
+        font=dict(color='#c36c83'),
+        title=dict(font=dict(color='#f0668c')),
+        yaxis=dict(
+            range=[0, 10],
+            linecolor='white',
+            linewidth=2
+        ),
+        xaxis=dict(
+            linecolor='white',
+            linewidth=2
+        ),
+        margin=dict(l=40, r=40, t=40, b=40)
+    )
+    # plotly.js is served once as a static asset, so only embed the figure.
+    my_plot = plot(fig, output_type='div', include_plotlyjs=False)
+
+    # markup the figure as HTML
+    return Markup(my_plot)
+
+
+def cached(method):
+    """
+    Caches a MoodTracker result until the journal is next written to.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args):
+        if self.cache is None:
+            return method(self, *args)
+
+        # results are kept per user and versioned by the user's write counter.
+        key = f'{self.name}:{self.stats.key}:{method.__name__}:{self.counter.get()}:{args}'
+        cached_value = self.cache.get(key)
+
+        if cached_value is not MISSING:
+            value, markup = cached_value
+            return Markup(value) if markup else value
+
+        value = method(self, *args)
+
+        # remember which results are HTML, as stores may return plain strings.
+        self.cache.set(key, [str(value), isinstance(value, Markup)])
+
+        return value
+
+    return wrapper
+
+
 class MoodTracker:
     """
     Mood tracker functionality.
     """
-    
-    def __init__(self, dbconnection):
+
+    # name used to select the tracker in config.
+    name = 'pandas'
+
+    def __init__(self, dbconnection, cache=None, counter=None, stats=None, rollups=None, user_id=None):
         self.collection = dbconnection.get_collection()
+
+        # only the user's entries are read.
+        self.scope = {'user_id': user_id}
+
+        # running aggregates for the lowest, highest and recent sentiments.
+        self.stats = stats or MoodStats(self.collection, self.collection.database['mood_stats'], user_id)
+
+        # daily, weekly and monthly rollups for long windows.
+        self.rollups = rollups or MoodRollups(self.collection, self.collection.database, user_id)
+
+        # optional result cache, versioned by the journal's write counter.
+        self.cache = cache
+        self.counter = counter or WriteCounter()
+
+
+    def cache_stats(self):
+        """
+        Returns hit/miss counters for the result cache.
+        """
+
+        return self.cache.stats() if self.cache is not None else {}
         
     
-    def recent_data(self):
+    def recent_data(self, start=None, end=None):
         """
-        Fetches the most recent data from the DB.
+        Fetches the most recent data from the DB, optionally from start (inclusive) to end (exclusive).
         """
 
-        # return updated data.
+        import pandas as pd
+
+        query = dict(self.scope)
+        if start is not None or end is not None:
+            query['timestamp'] = {'$type': 'date'}
+        if start is not None:
+            query['timestamp']['$gte'] = start
+        if end is not None:
+            query['timestamp']['$lt'] = end
+
+        # return updated data, oldest first for plotting.
         return pd.DataFrame(list(self.collection.find(
-            {},
+            query,
             {'sentiment': 1, 'timestamp': 1}
-            )))
+            ).sort('timestamp', 1)))
+
+
+    def oldest(self):
+        """
+        Returns the timestamp of the oldest entry, or None if there are none.
+        """
+
+        oldest = self.collection.find_one({**self.scope, 'timestamp': {'$type': 'date'}}, {'timestamp': 1}, sort=[('timestamp', 1)])
+
+        return oldest['timestamp'] if oldest is not None else None
+
+
+    def scored_entries(self, start=None, end=None):
+        """
+        Returns the timestamp and sentiment of each scored entry from start (inclusive) to end (exclusive), oldest first.
+        """
+
+        window = {'$type': 'date'}
+        if start is not None:
+            window['$gte'] = start
+        if end is not None:
+            window['$lt'] = end
+
+        # covered by the timestamp/sentiment index.
+        return list(self.collection.find(
+            {**self.scope, 'timestamp': window, **NUMERIC_SENTIMENT},
+            {'_id': 0, 'timestamp': 1, 'sentiment': 1}
+            ).sort('timestamp', 1))
+
+
+    def zoom(self, start=None, end=None, max_points=1000):
+        """
+        Returns how to plot a window: 'entry' for every entry, or the finest rollup unit with at most max_points buckets.
+        """
+
+        # a window with no start runs from the oldest entry.
+        if start is None:
+            start = self.oldest()
+
+            if start is None:
+                return 'entry'
+
+        span = (end or now()) - start
+
+        if span <= RAW_WINDOW:
+            return 'entry'
+
+        for unit, days in (('day', 1), ('week', 7)):
+            if span.days / days <= max_points:
+                return unit
+
+        return 'month'
     
     
-    def plot_mood(self):
+    def mood_data(self, start=None, end=None, max_points=1000, unit=None):
         """
-        Plots a graph of the sentiment values against datetime.
+        Returns the sentiments from start (inclusive) to end (exclusive) as columns, oldest first.
+        Timestamps are milliseconds since the epoch. `unit` is 'entry' for every entry, with windows of more
+        than max_points entries downsampled, or 'day', 'week' or 'month' for the average of each rollup.
+        By default it is picked by `zoom()`.
         """
 
-        df = self.recent_data().copy()
+        unit = unit or self.zoom(start, end, max_points)
 
-        # clean up None values.
-        df['sentiment'].replace({None: pd.NA}, inplace=True)
-        df.dropna(subset=['sentiment'], inplace=True)
+        # what /api/mood spends building the plot.
+        with plot_duration.time(unit):
+            if unit != 'entry':
+                return self.rollup_data(unit, start, end, max_points)
 
-        try:
-            # convert 'sentiment' column to numeric.
-            df['sentiment'] = pd.to_numeric(df['sentiment'])
-        
-        except KeyError:
-            # if 'sentiment' column doesn't exist, manually get the data.
-            sentiment = [entry['sentiment'] for entry in list(self.collection.find({}, {'sentiment': 1}))]
+            return self.entry_data(start, end, max_points)
 
-            try:
-                # converting to numeric again.
-                df['sentiment'] = pd.to_numeric(sentiment, errors='raise')
-            
-            except TypeError as e:
-                print("Please see error below.")
-                print(e)
 
-                # final try, set the column to empty.
-                df['sentiment'] = []
+    def entry_data(self, start=None, end=None, max_points=1000):
+        """
+        Returns the sentiment of every entry in a window as columns, oldest first, downsampled to max_points.
+        """
 
-        # setup plot.
-        fig = px.line(df, x='timestamp', y='sentiment', title='Your Mood So Far!')
+        import numpy as np
 
-        # add plot markers.
-        fig.update_traces(mode='lines+markers')
-        
-        colors = np.where(df['sentiment'] < 4, '#add8e6', np.where(df['sentiment'] <= 6, '#c5a3ff', '#ffb6c1'))
-        
-        # plot styling.
-        fig.update_traces(marker=dict(color=colors), line=dict(color='#c36c83'))
-        fig.update_layout(
-            plot_bgcolor='#f7c7d8',
-            paper_bgcolor='white',
-            font=dict(color='#c36c83'),
-            title=dict(font=dict(color='#f0668c')),
-            yaxis=dict(
-                range=[0, 10],
-                linecolor='white',
-                linewidth=2
-            ),
-            xaxis=dict(
-                linecolor='white',
-                linewidth=2
-            ),
-            margin=dict(l=40, r=40, t=40, b=40)
-        )
-        my_plot = plot(fig, output_type='div', include_plotlyjs=True)
-
-        # markup the figure as HTML
-        return Markup(my_plot)
+        entries = self.scored_entries(start, end)
+        timestamps = np.array([entry['timestamp'] for entry in entries], dtype='datetime64[ms]').astype(np.int64)
+        sentiments = np.array([entry['sentiment'] for entry in entries], dtype=float)
+
+        # keep the shape of the line with at most max_points points.
+        keep = lttb(timestamps, sentiments, max_points)
+
+        return {
+            'unit': 'entry',
+            'timestamps': timestamps[keep].tolist(),
+            'sentiments': sentiments[keep].tolist(),
+            'count': len(entries),
+            'downsampled': len(keep) < len(entries)
+        }
+
+
+    def rollup_data(self, unit, start=None, end=None, max_points=1000):
+        """
+        Returns the average, min and max sentiment of each rollup bucket in a window as columns, oldest first.
+        Reads one document per bucket, rather than every entry.
+        """
+
+        import numpy as np
+
+        buckets = self.rollups.read(unit, start, end)
+
+        timestamps = np.array([bucket['start'] for bucket in buckets], dtype='datetime64[ms]').astype(np.int64)
+        sentiments = np.array([bucket['sum'] / bucket['count'] for bucket in buckets], dtype=float)
+
+        # more buckets than points, e.g. decades of months.
+        keep = lttb(timestamps, sentiments, max_points)
+        count = sum(bucket['count'] for bucket in buckets)
+
+        return {
+            'unit': unit,
+            'timestamps': timestamps[keep].tolist(),
+            'sentiments': sentiments[keep].tolist(),
+            'min': [buckets[i]['min'] for i in keep],
+            'max': [buckets[i]['max'] for i in keep],
+            'count': count,
+            'downsampled': len(keep) < count
+        }
+
+
+    def summary(self):
+        """
+        Returns the lowest, highest and recent sentiments.
+        """
+
+        return self.stats.read()
+
+
+    @cached
+    def plot_mood(self, start=None, end=None):
+        """
+        Plots a graph of the sentiment values against datetime, from the rollups for long windows.
+        """
+
+        import pandas as pd
+
+        unit = self.zoom(start, end)
+
+        if unit != 'entry':
+            data = self.rollup_data(unit, start, end)
+            df = pd.DataFrame({
+                'timestamp': pd.to_datetime(data['timestamps'], unit='ms'),
+                'sentiment': data['sentiments']
+                })
+
+            return plot_sentiments(df)
+
+        # an empty collection has no columns.
+        df = self.recent_data(start, end).reindex(columns=['timestamp', 'sentiment'])
+
+        # clean up None values, sentiments are already numeric.
+        df = df.dropna(subset=['sentiment'])
+        df['sentiment'] = df['sentiment'].astype(float)
+
+        return plot_sentiments(df)
     
 
+    @cached
     def min_sentiments(self):
         """
         Retrieve data of 3 lowest sentiment entries.
         """
 
-        # sort sentiment values by ascending.
-        lowest_posts = self.collection.find({'sentiment': {'$ne': None}}).sort('sentiment', 1).limit(3)
+        # lowest sentiments, kept up to date in the mood stats.
+        lowest_posts = self.summary()['lowest']
         
         # setup result string with sentiment and timestamp to return.
         result_string = "Your lowest moments were:<br>"
         for index, post in enumerate(lowest_posts, 1):
-            sentiment = post['sentiment']
-            timestamp = post['timestamp']
+            sentiment = format_sentiment(post['sentiment'])
+            timestamp = format_timestamp(post['timestamp'])
             result_string += f"{index}. Timestamp: {timestamp}, <br>Sentiment: {sentiment}<br>"
 
         return Markup(result_string)
 
 
+    @cached
     def max_sentiments(self):
         """
         Retrieve data of 3 highest sentiment entries.
         """
 
-        # sort sentiment values by descending.
-        highest_posts = self.collection.find({'sentiment': {'$ne': None}}).sort('sentiment', -1).limit(3)
+        # highest sentiments, kept up to date in the mood stats.
+        highest_posts = self.summary()['highest']
         
         # setup result string with sentiment and timestamp to return.
         result_string = "Your highest moments were:<br>"
         for index, post in enumerate(highest_posts, 1):
-            sentiment = post['sentiment']
-            timestamp = post['timestamp']
+            sentiment = format_sentiment(post['sentiment'])
+            timestamp = format_timestamp(post['timestamp'])
             result_string += f"{index}. Timestamp: {timestamp}, <br>Sentiment: {sentiment}<br>"
 
         return Markup(result_string)
   
  
+    @cached
     def av_sentiment(self):
         """
         Retrieve average sentiment data from the last seven posts.
         """
 
-        # find the most recent seven posts, ordering by timestamp.
-        entries = self.collection.find({'sentiment': {'$ne': None}}).sort('timestamp', -1).limit(7)
+        # the most recent seven posts, kept up to date in the mood stats.
+        sentiment_scores = [entry['sentiment'] for entry in self.summary()['recent']]
 
-        try:
-            # extra caution to remove None values.
-            sentiment_scores = pd.to_numeric([float(entry['sentiment']) for entry in entries], errors='raise')
-        
-        except TypeError as e:
-            print("Please see error below.")
-            print(e)
-            return "No valid sentiment scores to display"
-        
-        else:
-            # return average sentiment if exists.
-            if len(sentiment_scores) > 0:
-                average_sentiment = sum(sentiment_scores) / len(sentiment_scores)
-                return f"The average sentiment of your last 7 entries is: {average_sentiment:.2f}"
-                
-            else:
-                return "No valid sentiment scores to display"
+        # return average sentiment if exists.
+        if len(sentiment_scores) > 0:
+            average_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+            return f"The average sentiment of your last 7 entries is: {average_sentiment:.2f}"
+
+        return "No valid sentiment scores to display"
+
+
+class AggregateMoodTracker(MoodTracker):
+    """
+    Mood tracker that summarises the journal in one MongoDB aggregation, so only the summary crosses the wire.
+    Bucketing uses $dateTrunc, which needs MongoDB 5.0 or later.
+    """
+
+    name = 'aggregate'
+
+    # sentiments are averaged per bucket of this size.
+    UNITS = ('day', 'week', 'month')
+
+    def __init__(self, dbconnection, cache=None, counter=None, stats=None, rollups=None, unit='day', user_id=None):
+        super().__init__(dbconnection, cache, counter, stats, rollups, user_id)
+
+        if unit not in self.UNITS:
+            raise ValueError(f'Unknown bucket unit: {unit}')
+
+        self.unit = unit
+
+        # the last whole-journal summary and the write version it was computed at.
+        self._summary = (None, None)
+
+
+    def pipeline(self, start=None, end=None, unit=None):
+        """
+        Returns the aggregation summarising the entries from start (inclusive) to end (exclusive), bucketed by unit.
+        """
+
+        unit = unit or self.unit
+
+        window = {'$type': 'date'}
+        if start is not None:
+            window['$gte'] = start
+        if end is not None:
+            window['$lt'] = end
+
+        bucket = {'date': '$timestamp', 'unit': unit}
+        if unit == 'week':
+            bucket['startOfWeek'] = 'monday'
+
+        stats = {'count': {'$sum': 1}, 'avg': {'$avg': '$sentiment'}, 'min': {'$min': '$sentiment'}, 'max': {'$max': '$sentiment'}}
+
+        return [
+            {'$match': {**self.scope, 'sentiment': {'$ne': None}}},
+
+            # coerce legacy string sentiments and timestamps, anything that doesn't convert becomes null.
+            {'$project': {
+                'sentiment': {'$convert': {'input': '$sentiment', 'to': 'double', 'onError': None, 'onNull': None}},
+                'timestamp': {'$cond': [
+                    {'$eq': [{'$type': '$timestamp'}, 'string']},
+                    {'$dateFromString': {'dateString': '$timestamp', 'format': TIMESTAMP_FORMAT, 'onError': None}},
+                    '$timestamp'
+                    ]}
+                }},
+            {'$match': {'timestamp': window, 'sentiment': {'$type': 'number'}}},
+
+            # every summary in one pass over the matched entries.
+            {'$facet': {
+                'buckets': [
+                    {'$group': {'_id': {'$dateTrunc': bucket}, **stats}},
+                    {'$sort': {'_id': 1}}
+                    ],
+                'overall': [{'$group': {'_id': None, **stats}}],
+                'lowest': [{'$sort': {'sentiment': 1, 'timestamp': 1}}, {'$limit': 3}],
+                'highest': [{'$sort': {'sentiment': -1, 'timestamp': 1}}, {'$limit': 3}],
+                'recent': [{'$sort': {'timestamp': -1}}, {'$limit': 7}]
+                }}
+            ]
+
+
+    def summary(self, start=None, end=None, unit=None):
+        """
+        Returns the per-bucket and overall count, avg, min and max, with the lowest, highest and recent sentiments.
+        """
+
+        whole = start is None and end is None and unit in (None, self.unit)
+
+        # the analytics on one page share a whole-journal summary until the next write.
+        if whole:
+            version = self.counter.get()
+
+            if self._summary[0] == version:
+                return self._summary[1]
+
+        result = next(self.collection.aggregate(self.pipeline(start, end, unit)))
+
+        summary = {
+            'buckets': result['buckets'],
+            'overall': result['overall'][0] if result['overall'] else {'count': 0, 'avg': None, 'min': None, 'max': None},
+            'lowest': [MoodStats.item(entry) for entry in result['lowest']],
+            'highest': [MoodStats.item(entry) for entry in result['highest']],
+
+            # oldest first, as in the mood stats.
+            'recent': [MoodStats.item(entry) for entry in result['recent']][::-1]
+        }
+
+        if whole:
+            self._summary = (version, summary)
+
+        return summary
+
+
+    def mood_data(self, start=None, end=None, max_points=1000, unit=None):
+        """
+        Returns the average, min and max sentiment per bucket as columns, oldest first.
+        Timestamps are the start of each bucket in milliseconds since the epoch.
+        `unit` overrides the configured bucket size, 'entry' returns every entry.
+        """
+
+        import numpy as np
+
+        if unit == 'entry':
+            return super().mood_data(start, end, max_points, unit)
+
+        unit = unit or self.unit
+
+        # what /api/mood spends building the plot.
+        with plot_duration.time(unit):
+            summary = self.summary(start, end, unit)
+            buckets = summary['buckets']
+
+            timestamps = np.array([bucket['_id'] for bucket in buckets], dtype='datetime64[ms]').astype(np.int64)
+            sentiments = np.array([bucket['avg'] for bucket in buckets], dtype=float)
+
+            # more buckets than points, e.g. years of daily buckets.
+            keep = lttb(timestamps, sentiments, max_points)
+
+            return {
+                'unit': unit,
+                'timestamps': timestamps[keep].tolist(),
+                'sentiments': sentiments[keep].tolist(),
+                'min': [buckets[i]['min'] for i in keep],
+                'max': [buckets[i]['max'] for i in keep],
+                'count': summary['overall']['count'],
+                'downsampled': len(keep) < summary['overall']['count']
+            }
+
+
+    @cached
+    def plot_mood(self, start=None, end=None):
+        """
+        Plots a graph of the average sentiment per bucket against datetime.
+        """
+
+        import pandas as pd
+
+        buckets = self.summary(start, end)['buckets']
+        df = pd.DataFrame({
+            'timestamp': [bucket['_id'] for bucket in buckets],
+            'sentiment': [bucket['avg'] for bucket in buckets]
+            }, columns=['timestamp', 'sentiment'])
+
+        return plot_sentiments(df)
+
+
+# available mood trackers by config name.
+MOOD_BACKENDS = {
+    MoodTracker.name: MoodTracker,
+    AggregateMoodTracker.name: AggregateMoodTracker
+}
 
 
 class Journal:
     """
     Connecting the entire journal to the MongoDB.
     """
+
+    # the journal manager and the mood trackers by config name, for this kind of DB.
+    manager_class = JournalManager
+    mood_backends = MOOD_BACKENDS
     
-    def __init__(self, dbconn):
+    def __init__(self, dbconn, mood_cache=None, counter=None, mood_backend='pandas', mood_options=None, search_backend='text', user_id=None):
         # get the connection and send to our journal manager and mood tracker.
         self.dbconn = dbconn
-        self.manager = JournalManager(self.dbconn)
-        self.mood = MoodTracker(self.dbconn)
+        self.user_id = user_id
+        self.manager = self.manager_class(self.dbconn, counter, search_backend, user_id)
+
+        try:
+            tracker = self.mood_backends[mood_backend]
+
+        except KeyError:
+            raise ValueError(f'Unknown mood backend: {mood_backend}')
+
+        # the mood tracker shares the manager's write counter, mood stats and rollups.
+        self.mood = tracker(self.dbconn, mood_cache, self.manager.counter, self.manager.stats, self.manager.rollups, **(mood_options or {}), user_id=user_id)
+
+        # settings for other users' journals, and the journals made so far, shared by all of them.
+        self._settings = (mood_cache, self.manager.counter, mood_backend, mood_options, search_backend)
+        self._users = {user_id: self}
+        self._lock = threading.Lock()
+
+
+    def for_user(self, user_id):
+        """
+        Returns one user's journal, sharing this journal's connection, mood cache and backends. Each user
+        has their own write counter, stats and rollups. Made once per process and user, so they're kept.
+        """
+
+        with self._lock:
+            journal = self._users.get(user_id)
+
+            if journal is None:
+                mood_cache, counter, mood_backend, mood_options, search_backend = self._settings
+                journal = type(self)(self.dbconn, mood_cache, counter.for_user(user_id), mood_backend, mood_options, search_backend, user_id)
+
+                journal._settings, journal._users, journal._lock = self._settings, self._users, self._lock
+                self._users[user_id] = journal
+
+        return journal
@@ -1,14 +1,15 @@
 
 from unittest import TestCase, main
 from unittest.mock import MagicMock
-from bson import ObjectId
-from bson.json_util import dumps
+from bson import ObjectId, encode, decode
 from random import uniform
+from datetime import datetime as dt, timedelta, timezone
 from flask import Flask
 import pandas as pd
 
+from cache import LRUCache, MongoWriteCounter
 from utils import sentiment_analysis
-from models import JournalEntry, MongoDBConn, Journal
+from models import JournalEntry, MongoDBConn, Journal, EntryView, ENTRY_CODEC, format_timestamp, bucket_start, bucket_end, PREVIEW_LENGTH
 from config import client, journal
 
 
@@ -54,6 +55,51 @@ class TestJournalEntry(TestCase):
         self.assertEqual(entry.body, body)
         self.assertEqual(entry.sentiment, sentiment)
 
+        # timestamps are datetimes at millisecond precision.
+        self.assertIsInstance(entry.timestamp, dt)
+        self.assertEqual(entry.timestamp.microsecond % 1000, 0)
+
+
+class TestEntryView(TestCase):
+    """
+    Test decoding entries into views.
+    """
+
+    def test(self):
+        """
+        Tests fields are attributes and the view still reads like a dict.
+        """
+
+        doc = {'_id': ObjectId(), 'body': 'Test body', 'sentiment': 5.21, 'last timestamp': dt(2023, 11, 30), 'mood': 'chill'}
+        entry = decode(encode(doc), ENTRY_CODEC)
+
+        self.assertIsInstance(entry, EntryView)
+        self.assertEqual(entry.id, doc['_id'])
+        self.assertEqual(entry.body, 'Test body')
+        self.assertEqual(entry.last_timestamp, dt(2023, 11, 30))
+        self.assertEqual(entry['last timestamp'], dt(2023, 11, 30))
+
+        # keys without an attribute are kept too.
+        self.assertEqual(entry['mood'], 'chill')
+        self.assertIsNone(entry.get('missing'))
+
+
+class TestFormatTimestamp(TestCase):
+    """
+    Test timestamp display formatting.
+    """
+
+    def test(self):
+        """
+        Tests datetimes and legacy strings format the same way.
+        """
+
+        timestamp = dt(2023, 11, 30, 9, 5, 1)
+
+        self.assertEqual(format_timestamp(timestamp), '30/11/2023 09:05:01')
+        self.assertEqual(format_timestamp('30/11/2023 09:05:01'), '30/11/2023 09:05:01')
+        self.assertEqual(format_timestamp(None), '')
+
 
 class TestJournalManager(TestCase):
     """
@@ -78,6 +124,8 @@ class TestJournalManager(TestCase):
 
         # delete all entries in collection, refreshing.
         self.journal.dbconn.db.log.delete_many({})
+        self.journal.manager.stats.rebuild()
+        self.journal.manager.rollups.rebuild()
         
 
     def test_create(self):
@@ -94,7 +142,7 @@ class TestJournalManager(TestCase):
         inserted = self.journal.manager.read_one(_id)[0]
         
         # check the details match.
-        self.assertIsNotNone(inserted['_id']['$oid'])
+        self.assertEqual(inserted.id, _id)
         self.assertEqual(inserted['body'], body)
         self.assertEqual(inserted['sentiment'], sentiment)
         
@@ -104,11 +152,15 @@ class TestJournalManager(TestCase):
         Tests all entries in the db match the entries read by the journal manager.
         """
         
+        # add entries to read.
+        for body in ['Test body', 'Another test body']:
+            self.journal.manager.create(body, None)
+
         # find all entries in the db log collection.
-        db_entries = dumps(self.journal.dbconn.db.log.find())
+        db_entries = [(doc['_id'], doc['body'], doc['timestamp']) for doc in self.journal.dbconn.db.log.find()]
 
         # find the entries the Journal class returns.
-        class_entries = dumps(self.journal.manager.read_all())
+        class_entries = [(entry.id, entry.body, entry.timestamp) for entry in self.journal.manager.read_all()]
 
         self.assertEqual(db_entries, class_entries)
 
@@ -131,6 +183,127 @@ class TestJournalManager(TestCase):
         self.assertEqual(len(check), 1)
     
 
+    def test_read_range(self):
+        """
+        Tests entries are read newest first within a date range.
+        """
+
+        start = dt(2023, 11, 1)
+        for day in range(10):
+            self.journal.dbconn.db.log.insert_one({'body': f'Day {day}', 'sentiment': None, 'timestamp': start + timedelta(days=day)})
+
+        # legacy string timestamps are left out.
+        self.journal.dbconn.db.log.insert_one({'body': 'Legacy', 'sentiment': None, 'timestamp': '05/11/2023 10:00:00'})
+
+        entries = self.journal.manager.read_range(start + timedelta(days=2), start + timedelta(days=5))
+        self.assertEqual([entry['body'] for entry in entries], ['Day 4', 'Day 3', 'Day 2'])
+
+        # last N entries.
+        entries = self.journal.manager.read_range(limit=2)
+        self.assertEqual([entry['body'] for entry in entries], ['Day 9', 'Day 8'])
+
+
+    def test_read_page(self):
+        """
+        Tests paging forwards and backwards through entries, newest first.
+        """
+
+        for i in range(5):
+            self.journal.manager.create(f'Body {i}', None)
+
+        def bodies(page):
+            return [entry['body'] for entry in page['entries']]
+
+        first = self.journal.manager.read_page(2)
+        self.assertEqual(bodies(first), ['Body 4', 'Body 3'])
+        self.assertIsNone(first['prev'])
+
+        second = self.journal.manager.read_page(2, after=first['next'])
+        self.assertEqual(bodies(second), ['Body 2', 'Body 1'])
+
+        last = self.journal.manager.read_page(2, after=second['next'])
+        self.assertEqual(bodies(last), ['Body 0'])
+        self.assertIsNone(last['next'])
+
+        # back to the start.
+        back = self.journal.manager.read_page(2, before=second['prev'])
+        self.assertEqual(bodies(back), ['Body 4', 'Body 3'])
+        self.assertIsNone(back['prev'])
+        self.assertEqual(back['next'], first['next'])
+
+
+    def test_read_page_preview(self):
+        """
+        Tests long bodies are cut short.
+        """
+
+        self.journal.manager.create('a' * (PREVIEW_LENGTH + 1), None)
+        self.journal.manager.create('Short body', None)
+
+        short, long = self.journal.manager.read_page()['entries']
+
+        self.assertEqual(short['body'], 'Short body')
+        self.assertFalse(short['truncated'])
+        self.assertEqual(long['body'], 'a' * PREVIEW_LENGTH)
+        self.assertTrue(long['truncated'])
+
+
+    def test_ensure_indexes(self):
+        """
+        Tests the mood analytics indexes are created.
+        """
+
+        self.journal.manager.ensure_indexes()
+        keys = [index['key'] for index in self.journal.dbconn.db.log.index_information().values()]
+
+        # every index starts with the user, {user_id, timestamp} is the shard key.
+        self.assertIn([('user_id', 1), ('timestamp', 1), ('sentiment', 1)], keys)
+        self.assertIn([('user_id', 1), ('sentiment', 1), ('timestamp', 1)], keys)
+        self.assertIn([('user_id', 1), ('_id', 1)], keys)
+        self.assertNotIn([('timestamp', -1), ('sentiment', 1)], keys)
+
+
+    def test_users(self):
+        """
+        Tests each user only reads and writes their own entries, with their own stats and rollups.
+        """
+
+        alice = self.journal.for_user('alice')
+        bob = self.journal.for_user('bob')
+
+        # one journal per user.
+        self.assertIs(self.journal.for_user('alice'), alice)
+        self.assertIs(alice.for_user(None), self.journal)
+
+        alice_id = alice.manager.create('Alice body', 8.0)
+        bob_id = bob.manager.create('Bob body', 2.0)
+        self.journal.manager.create('Default body', 5.0)
+
+        self.assertEqual([entry['body'] for entry in alice.manager.read_all()], ['Alice body'])
+        self.assertEqual([entry['body'] for entry in self.journal.manager.read_all()], ['Default body'])
+        self.assertEqual(alice.manager.read_one(alice_id)[0]['user_id'], 'alice')
+
+        # other users' entries can't be read, edited or deleted.
+        self.assertEqual(alice.manager.read_one(bob_id), [])
+        self.assertEqual(alice.manager.update(bob_id, {'body': 'Mine now'}), 0)
+        self.assertEqual(alice.manager.delete(bob_id), 0)
+        self.assertEqual(bob.manager.read_one(bob_id)[0]['body'], 'Bob body')
+
+        # stats and rollups are kept per user.
+        self.assertEqual(alice.manager.stats.read()['count'], 1)
+        self.assertEqual(bob.manager.stats.read()['lowest'][0]['sentiment'], 2.0)
+        self.assertEqual(self.journal.manager.stats.read()['count'], 1)
+        self.assertEqual([bucket['sum'] for bucket in bob.manager.rollups.read('day')], [2.0])
+        self.assertEqual(alice.manager.stats.check(), [])
+        self.assertEqual(bob.manager.rollups.check(), [])
+
+        self.assertEqual(alice.mood.mood_data()['sentiments'], [8.0])
+
+        # each user's cached results are versioned by their own writes.
+        self.assertEqual(bob.manager.counter.get(), 1)
+        self.assertIsNot(alice.mood.counter, bob.mood.counter)
+
+
     def test_check_one(self):
         """
         Tests a query exists in the DB.
@@ -166,11 +339,16 @@ class TestJournalManager(TestCase):
         }
 
         # update and retrieve the entry.
-        self.journal.manager.update(test_entry_id, update_data)
+        self.assertEqual(self.journal.manager.update(test_entry_id, update_data), 1)
         updated_entry = self.journal.dbconn.db.log.find_one({"_id": ObjectId(test_entry_id)})
 
         self.assertEqual(updated_entry['body'], update_data['body'])
         self.assertEqual(updated_entry['sentiment'], update_data['sentiment'])
+
+        # entries that no longer match aren't updated.
+        self.assertEqual(self.journal.manager.update(test_entry_id, {'body': 'again'}, match={'body': 'initial_body'}), 0)
+        self.journal.manager.delete(test_entry_id)
+        self.assertEqual(self.journal.manager.update(test_entry_id, {'body': 'again'}), 0)
     
 
     def test_delete(self):
@@ -180,12 +358,15 @@ class TestJournalManager(TestCase):
 
         # create and delete an entry.
         test_entry_id = self.journal.manager.create("I'm trying", sentiment_analysis("I'm trying"))
-        self.journal.manager.delete(test_entry_id)
+        self.assertEqual(self.journal.manager.delete(test_entry_id), 1)
 
         # check the entry is none.
         deleted_entry = self.journal.dbconn.db.log.find_one({"_id": ObjectId(test_entry_id)})
         self.assertIsNone(deleted_entry, "we did it saima")
 
+        # deleting it again finds nothing.
+        self.assertEqual(self.journal.manager.delete(test_entry_id), 0)
+
 
 class TestMoodTracker(TestCase):
     """
@@ -213,6 +394,8 @@ class TestMoodTracker(TestCase):
 
         # delete all entries in collection, refreshing.
         self.journal.dbconn.db.testing.delete_many({})
+        self.journal.manager.stats.rebuild()
+        self.journal.manager.rollups.rebuild()
 
         # override data in recent_data method for plotting.
         self.data = [
@@ -256,6 +439,35 @@ class TestMoodTracker(TestCase):
         self.assertNotIn('3.98', plot)
     
 
+    def test_mood_data(self):
+        """
+        Tests sentiments in a window are returned as columns, oldest first.
+        """
+
+        start = dt(2023, 11, 1)
+        for day in range(10):
+            self.journal.dbconn.db.testing.insert_one({'body': f'Day {day}', 'sentiment': float(day), 'timestamp': start + timedelta(days=day)})
+
+        # unscored and legacy entries are left out.
+        self.journal.dbconn.db.testing.insert_one({'body': 'Unscored', 'sentiment': None, 'timestamp': start})
+        self.journal.dbconn.db.testing.insert_one({'body': 'Legacy', 'sentiment': 3.0, 'timestamp': '05/11/2023 10:00:00'})
+
+        data = self.journal.mood.mood_data(start + timedelta(days=2), start + timedelta(days=5))
+
+        self.assertEqual(data['sentiments'], [2.0, 3.0, 4.0])
+        self.assertEqual(data['timestamps'][0], int((start + timedelta(days=2)).replace(tzinfo=timezone.utc).timestamp() * 1000))
+        self.assertEqual(data['count'], 3)
+        self.assertFalse(data['downsampled'])
+
+        # large windows are downsampled.
+        data = self.journal.mood.mood_data(start, start + timedelta(days=10), max_points=4)
+
+        self.assertEqual(len(data['sentiments']), 4)
+        self.assertEqual((data['sentiments'][0], data['sentiments'][-1]), (0.0, 9.0))
+        self.assertEqual(data['count'], 10)
+        self.assertTrue(data['downsampled'])
+
+
     def create_entries(self, entries):
         """
         Sends the entries to the testing collection.
@@ -272,9 +484,9 @@ class TestMoodTracker(TestCase):
         Tests correctly reads 3 lowest sentiment values.
         """
 
-        self.assertIn('2.43', self.journal.mood.min_sentiments())
-        self.assertIn('2.50', self.journal.mood.min_sentiments())
-        self.assertIn('3.98', self.journal.mood.min_sentiments())
+        self.assertIn('2.88', self.journal.mood.min_sentiments())
+        self.assertIn('4.58', self.journal.mood.min_sentiments())
+        self.assertIn('4.67', self.journal.mood.min_sentiments())
 
 
     def test_max_sentiments(self):
@@ -282,9 +494,237 @@ class TestMoodTracker(TestCase):
         Tests correctly reads 3 highest sentiment values.
         """
 
-        self.assertIn('7.15', self.journal.mood.max_sentiments())
-        self.assertIn('6.55', self.journal.mood.max_sentiments())
-        self.assertIn('3.98', self.journal.mood.max_sentiments())
+        self.assertIn('8.04', self.journal.mood.max_sentiments())
+        self.assertIn('7.50', self.journal.mood.max_sentiments())
+        self.assertIn('4.67', self.journal.mood.max_sentiments())
+
+
+    def test_cache(self):
+        """
+        Tests results are cached until the journal is written to.
+        """
+
+        self.journal.mood.cache = LRUCache()
+
+        lowest = self.journal.mood.min_sentiments()
+        self.assertEqual(self.journal.mood.min_sentiments(), lowest)
+        self.assertEqual(self.journal.mood.cache_stats()['hits'], 1)
+
+        # cached HTML stays markup.
+        self.assertTrue(hasattr(self.journal.mood.min_sentiments(), '__html__'))
+
+        # a new entry invalidates the cached result.
+        self.journal.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertIn('0.50', self.journal.mood.min_sentiments())
+
+
+    def test_cache_shared(self):
+        """
+        Tests a write through one process's journal invalidates results another process has cached in memory.
+        """
+
+        meta = self.journal.dbconn.db.meta
+        meta.delete_many({})
+
+        # two workers, each with its own cache, sharing the write counter.
+        first = Journal(self.journal.dbconn, LRUCache(), MongoWriteCounter(meta, 'testing'))
+        second = Journal(self.journal.dbconn, LRUCache(), MongoWriteCounter(meta, 'testing'))
+
+        lowest = first.mood.min_sentiments()
+        self.assertEqual(first.mood.min_sentiments(), lowest)
+
+        second.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertIn('0.50', first.mood.min_sentiments())
+
+
+    def test_upgrade(self):
+        """
+        Tests a journal from before the mood stats and rollups has them built from its history, not just from new writes.
+        """
+
+        stats = self.journal.manager.stats
+        rollups = self.journal.manager.rollups
+
+        # as the journal was before they existed.
+        stats.collection.delete_one({'_id': stats.key})
+        rollups.meta.delete_one({'_id': rollups.meta_key})
+        for collection in rollups.collections.values():
+            collection.delete_many({'log': rollups.key})
+
+        self.journal.manager.create('Worst day ever, everything is awful.', 0.5)
+
+        count = stats.read()['count']
+        self.assertEqual(count, self.journal.dbconn.db.testing.count_documents({'sentiment': {'$type': 'number'}}))
+        self.assertEqual(stats.check(), [])
+        self.assertEqual(sum(bucket['count'] for bucket in rollups.read('day')), count)
+
+
+    def test_stats_consistent(self):
+        """
+        Tests the mood stats kept on write match a rebuild after creates, updates and deletes.
+        """
+
+        stats = self.journal.manager.stats
+        self.assertEqual(stats.check(), [])
+
+        # a new lowest entry.
+        _id = self.journal.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertEqual(stats.check(), [])
+
+        # updating it to the highest moves it across the lists.
+        self.journal.manager.update(_id, {'sentiment': 9.5})
+        self.assertEqual(stats.check(), [])
+
+        # scored entries becoming unscored, and back.
+        self.journal.manager.update(_id, {'sentiment': None})
+        self.assertEqual(stats.check(), [])
+        self.journal.manager.update(_id, {'sentiment': 1.25})
+        self.assertEqual(stats.check(), [])
+
+        # deleting entries in the recent, lowest and highest lists.
+        for entry in list(self.journal.dbconn.db.testing.find())[:3]:
+            self.journal.manager.delete(entry['_id'])
+            self.assertEqual(stats.check(), [])
+
+        self.assertEqual(stats.read()['count'], 3)
+
+
+    def test_stats_rebuild(self):
+        """
+        Tests stale or missing stats are rebuilt on read.
+        """
+
+        stats = self.journal.manager.stats
+
+        # bulk writes mark the stats stale.
+        entry = self.journal.dbconn.db.testing.find_one()
+        self.journal.manager.bulk_update([(entry['_id'], {'sentiment': 0.1}, None)])
+        self.assertIn('0.10', self.journal.mood.min_sentiments())
+        self.assertEqual(stats.check(), [])
+
+        stats.collection.delete_many({})
+        self.assertEqual(stats.read()['count'], 5)
+
+
+    def test_rollups_consistent(self):
+        """
+        Tests the rollups kept on write match a rebuild after creates, updates and deletes.
+        """
+
+        rollups = self.journal.manager.rollups
+        self.assertEqual(rollups.check(), [])
+
+        # a new lowest entry, then the highest.
+        _id = self.journal.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertEqual(rollups.check(), [])
+
+        self.journal.manager.update(_id, {'sentiment': 9.5})
+        self.assertEqual(rollups.check(), [])
+
+        # scored entries becoming unscored, and back.
+        self.journal.manager.update(_id, {'sentiment': None})
+        self.assertEqual(rollups.check(), [])
+        self.journal.manager.update(_id, {'sentiment': 1.25})
+        self.assertEqual(rollups.check(), [])
+
+        # deleting every entry empties the rollups.
+        for entry in list(self.journal.dbconn.db.testing.find()):
+            self.journal.manager.delete(entry['_id'])
+            self.assertEqual(rollups.check(), [])
+
+        self.assertEqual(rollups.read('day'), [])
+
+
+    def test_rollups(self):
+        """
+        Tests entries are rolled up by day, week and month.
+        """
+
+        self.journal.dbconn.db.testing.delete_many({})
+
+        start = dt(2023, 1, 30, 9)
+        for day in range(10):
+            self.journal.dbconn.db.testing.insert_one({'body': f'Day {day}', 'sentiment': float(day), 'timestamp': start + timedelta(days=day)})
+
+        # legacy string timestamps can't be bucketed.
+        self.journal.dbconn.db.testing.insert_one({'body': 'Legacy', 'sentiment': 5.0, 'timestamp': '05/02/2023 10:00:00'})
+
+        rollups = self.journal.manager.rollups
+        self.assertEqual(rollups.rebuild(), {'day': 10, 'week': 2, 'month': 2})
+
+        days = rollups.read('day', dt(2023, 2, 1, 12), dt(2023, 2, 3))
+        self.assertEqual([(bucket['start'], bucket['sum']) for bucket in days], [(dt(2023, 2, 1), 2.0), (dt(2023, 2, 2), 3.0)])
+
+        # Monday 30 January to Sunday 5 February, then 6 - 8 February.
+        weeks = rollups.read('week')
+        self.assertEqual([(bucket['start'], bucket['count'], bucket['min'], bucket['max']) for bucket in weeks],
+                         [(dt(2023, 1, 30), 7, 0.0, 6.0), (dt(2023, 2, 6), 3, 7.0, 9.0)])
+
+        months = rollups.read('month')
+        self.assertEqual([(bucket['start'], bucket['count']) for bucket in months], [(dt(2023, 1, 1), 2), (dt(2023, 2, 1), 8)])
+
+        # bulk writes mark the rollups stale, they are rebuilt on read.
+        entry = self.journal.dbconn.db.testing.find_one({'body': 'Day 0'})
+        self.journal.manager.bulk_update([(entry['_id'], {'sentiment': 10.0}, None)])
+        self.assertEqual(rollups.read('month')[0]['max'], 10.0)
+        self.assertEqual(rollups.check(), [])
+
+
+    def test_buckets(self):
+        """
+        Tests bucket boundaries.
+        """
+
+        timestamp = dt(2023, 12, 31, 18, 30)
+
+        self.assertEqual(bucket_start(timestamp, 'day'), dt(2023, 12, 31))
+        self.assertEqual(bucket_start(timestamp, 'week'), dt(2023, 12, 25))
+        self.assertEqual(bucket_start(timestamp, 'month'), dt(2023, 12, 1))
+        self.assertEqual(bucket_end(dt(2023, 12, 1), 'month'), dt(2024, 1, 1))
+        self.assertEqual(bucket_end(dt(2024, 2, 1), 'month'), dt(2024, 3, 1))
+
+
+    def test_zoom(self):
+        """
+        Tests long windows are plotted from the rollups.
+        """
+
+        mood = self.journal.mood
+        end = dt(2023, 12, 1)
+
+        self.assertEqual(mood.zoom(end - timedelta(days=7), end), 'entry')
+        self.assertEqual(mood.zoom(end - timedelta(days=365), end), 'day')
+        self.assertEqual(mood.zoom(end - timedelta(days=365), end, max_points=100), 'week')
+        self.assertEqual(mood.zoom(end - timedelta(days=3650), end, max_points=100), 'month')
+
+        # the entries in setUp were all created today.
+        self.assertEqual(mood.zoom(), 'entry')
+
+
+    def test_rollup_data(self):
+        """
+        Tests the plot data for long windows is the average of each rollup.
+        """
+
+        self.journal.dbconn.db.testing.delete_many({})
+
+        start = dt(2022, 1, 1)
+        for day in range(0, 400, 2):
+            self.journal.dbconn.db.testing.insert_one({'body': f'Day {day}', 'sentiment': float(day % 10), 'timestamp': start + timedelta(days=day)})
+
+        self.journal.manager.rollups.rebuild()
+
+        data = self.journal.mood.mood_data(start, start + timedelta(days=400), max_points=100)
+
+        self.assertEqual(data['unit'], 'week')
+        self.assertEqual(data['count'], 200)
+        self.assertEqual(len(data['timestamps']), 58)
+
+        # Saturday 1 January is alone in its week, then 3 - 9 January has days 2, 4, 6 and 8.
+        self.assertEqual(data['sentiments'][:2], [0.0, 5.0])
+
+        # the plot reads the same rollups.
+        self.assertIn('Your Mood So Far!', self.journal.mood.plot_mood(start, start + timedelta(days=400)))
 
 
     def test_av_sentiments(self):
@@ -293,11 +733,140 @@ class TestMoodTracker(TestCase):
         """
 
         # only 5 entries being tested.
-        manual_av = (3.98 + 6.55 + 7.15 + 2.43 + 2.50) / 5
+        manual_av = (4.58 + 8.04 + 7.50 + 2.88 + 4.67) / 5
 
         # test that calculated average is the same as the returned.
         self.assertIn(str(format(manual_av, '.2f')), self.journal.mood.av_sentiment())
 
 
+
+class TestAggregateMoodTracker(TestCase):
+    """
+    Tests the aggregation pipeline mood tracker, which needs MongoDB 5.0 or later.
+    """
+
+    def setUp(self):
+        """
+        Setting up a journal using the aggregate mood tracker, with entries over three days.
+        """
+
+        app = Flask(__name__)
+        app.config['MONGO_URI'] = 'mongodb://localhost:27017/testdb'
+
+        mongo_conn = MongoDBConn(app)
+        mongo_conn.collection = mongo_conn.db.testing
+        self.journal = Journal(mongo_conn, mood_backend='aggregate')
+        self.collection = self.journal.dbconn.db.testing
+
+        self.collection.delete_many({})
+        self.journal.manager.stats.rebuild()
+
+        start = dt(2023, 11, 1, 9)
+        self.collection.insert_many([
+            {'body': 'a', 'sentiment': 2.0, 'timestamp': start},
+            {'body': 'b', 'sentiment': 6.0, 'timestamp': start + timedelta(hours=5)},
+            {'body': 'c', 'sentiment': 9.0, 'timestamp': start + timedelta(days=1)},
+
+            # legacy string sentiments and timestamps are coerced.
+            {'body': 'd', 'sentiment': '4.5', 'timestamp': '03/11/2023 10:00:00'},
+
+            # unscored and unparseable entries are left out.
+            {'body': 'e', 'sentiment': None, 'timestamp': start},
+            {'body': 'f', 'sentiment': 'n/a', 'timestamp': start},
+            {'body': 'g', 'sentiment': 5.0, 'timestamp': 'yesterday'}
+            ])
+
+
+    def test_unknown(self):
+        """
+        Tests unknown backends and bucket units are rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            Journal(self.journal.dbconn, mood_backend='spreadsheet')
+
+        with self.assertRaises(ValueError):
+            Journal(self.journal.dbconn, mood_backend='aggregate', mood_options={'unit': 'fortnight'})
+
+
+    def test_summary(self):
+        """
+        Tests daily buckets and overall stats are summarised in MongoDB.
+        """
+
+        summary = self.journal.mood.summary()
+
+        self.assertEqual([bucket['_id'] for bucket in summary['buckets']], [dt(2023, 11, 1), dt(2023, 11, 2), dt(2023, 11, 3)])
+        self.assertEqual([bucket['avg'] for bucket in summary['buckets']], [4.0, 9.0, 4.5])
+        self.assertEqual((summary['buckets'][0]['min'], summary['buckets'][0]['max'], summary['buckets'][0]['count']), (2.0, 6.0, 2))
+        self.assertEqual((summary['overall']['count'], summary['overall']['min'], summary['overall']['max']), (4, 2.0, 9.0))
+
+        self.assertEqual([item['sentiment'] for item in summary['lowest']], [2.0, 4.5, 6.0])
+        self.assertEqual([item['sentiment'] for item in summary['highest']], [9.0, 6.0, 4.5])
+        self.assertEqual([item['sentiment'] for item in summary['recent']], [2.0, 6.0, 9.0, 4.5])
+
+
+    def test_weekly(self):
+        """
+        Tests buckets can be a week long.
+        """
+
+        journal = Journal(self.journal.dbconn, mood_backend='aggregate', mood_options={'unit': 'week'})
+        buckets = journal.mood.summary()['buckets']
+
+        # 1 - 3 November 2023 are in the week starting Monday 30 October.
+        self.assertEqual([bucket['_id'] for bucket in buckets], [dt(2023, 10, 30)])
+        self.assertEqual(buckets[0]['count'], 4)
+
+
+    def test_window(self):
+        """
+        Tests the summary can be limited to a time window.
+        """
+
+        summary = self.journal.mood.summary(dt(2023, 11, 2), dt(2023, 11, 4))
+
+        self.assertEqual([bucket['avg'] for bucket in summary['buckets']], [9.0, 4.5])
+        self.assertEqual(summary['overall']['count'], 2)
+
+
+    def test_same_as_pandas(self):
+        """
+        Tests the analytics match the default tracker for numeric entries.
+        """
+
+        self.collection.delete_many({'$or': [{'sentiment': {'$type': 'string'}}, {'timestamp': {'$type': 'string'}}]})
+        self.journal.manager.stats.rebuild()
+
+        pandas = Journal(self.journal.dbconn).mood
+
+        for method in ['min_sentiments', 'max_sentiments', 'av_sentiment']:
+            self.assertEqual(getattr(self.journal.mood, method)(), getattr(pandas, method)(), method)
+
+
+    def test_mood_data(self):
+        """
+        Tests the plot data is the average sentiment per bucket.
+        """
+
+        data = self.journal.mood.mood_data()
+
+        self.assertEqual(data['sentiments'], [4.0, 9.0, 4.5])
+        self.assertEqual(data['min'], [2.0, 9.0, 4.5])
+        self.assertEqual(data['count'], 4)
+        self.assertTrue(data['downsampled'])
+
+
+    def test_summary_cached(self):
+        """
+        Tests the analytics share one aggregation until the journal is written to.
+        """
+
+        summary = self.journal.mood.summary()
+        self.assertIs(self.journal.mood.summary(), summary)
+
+        self.journal.manager.create('Worst day ever, everything is awful.', 0.5)
+        self.assertIn('0.50', self.journal.mood.min_sentiments())
+
 if __name__ == '__main__':
     main()
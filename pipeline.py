@@ -0,0 +1,148 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from models import SENTIMENT_DONE, SENTIMENT_FAILED
+from utils import sentiment_result, sentiment_analysis_batch, chunked
+
+
+class SentimentPipeline:
+    """
+    Scores saved journal entries on background worker threads.
+    """
+
+    def __init__(self, manager, workers=4):
+        self.manager = manager
+        self.workers = workers
+
+        # no workers scores entries inline, e.g. for tests.
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sentiment') if workers else None
+
+
+    def submit(self, _id, body, manager=None):
+        """
+        Queues an entry for scoring. Returns a future of its sentiment.
+        `manager` is the journal of the entry's user, the pipeline's own by default.
+        """
+
+        if self.executor is None:
+            future = Future()
+            future.set_result(self.score(_id, body, manager))
+            return future
+
+        return self.executor.submit(self.score, _id, body, manager)
+
+
+    def score(self, _id, body, manager=None):
+        """
+        Scores an entry and saves the result, unless the entry has been edited since.
+        """
+
+        manager = manager or self.manager
+
+        try:
+            sentiment, error = sentiment_result(body)
+
+        except Exception as e:
+            sentiment, error = None, str(e)
+
+        if error is None:
+            status = SENTIMENT_DONE
+
+        else:
+            print("Please see error below.")
+            print(error)
+
+            # left for backfill to retry.
+            status = SENTIMENT_FAILED
+
+        manager.update(_id, {'sentiment': sentiment, 'sentiment_status': status}, match={'body': body})
+
+        return sentiment
+
+
+    def backfill(self, batch_size=100):
+        """
+        Re-scores entries with no sentiment, batch_size at a time. Returns the number of entries scored.
+        """
+
+        # entries never scored, still pending or failed.
+        cursor = self.manager.unscored(batch_size)
+
+        count = 0
+        batch = []
+        for entry in cursor:
+            batch.append(self.submit(entry['_id'], entry['body']))
+
+            # wait for each batch so only batch_size entries are in flight.
+            if len(batch) == batch_size:
+                wait(batch)
+                count += len(batch)
+                batch = []
+
+        wait(batch)
+        return count + len(batch)
+
+
+    def rescore(self, batch_size=500, query=None):
+        """
+        Re-scores every matching entry with the batch API, e.g. after a model change.
+        Returns the number of entries scored and the number that failed.
+        """
+
+        cursor = self.manager.bodies(batch_size, query)
+
+        count = 0
+        failed = 0
+        for batch in chunked(cursor, batch_size):
+            bodies = [entry.get('body') or '' for entry in batch]
+            results = sentiment_analysis_batch(bodies, use_cache=False)
+
+            updates = []
+            for entry, body, (sentiment, error) in zip(batch, bodies, results):
+                status = SENTIMENT_DONE if error is None else SENTIMENT_FAILED
+                updates.append((entry['_id'], {'sentiment': sentiment, 'sentiment_status': status}, {'body': body}))
+
+                if error is not None:
+                    print(f"Could not score entry {entry['_id']}: {error}")
+                    failed += 1
+
+            self.manager.bulk_update(updates)
+            count += len(batch)
+
+        return count, failed
+
+
+    def score_new(self, entries):
+        """
+        Scores entries that haven't been saved yet with the batch API, e.g. on import, so each is written once.
+        Entries already scored, or done with no sentiment, are left alone. Returns the number that failed.
+        """
+
+        todo = [entry for entry in entries if entry.get('sentiment') is None and entry.get('sentiment_status') != SENTIMENT_DONE]
+        results = sentiment_analysis_batch([entry.get('body') or '' for entry in todo])
+
+        failed = 0
+        for entry, (sentiment, error) in zip(todo, results):
+            entry['sentiment'] = sentiment
+            entry['sentiment_status'] = SENTIMENT_DONE if error is None else SENTIMENT_FAILED
+
+            if error is not None:
+                failed += 1
+
+        return failed
+
+
+    def shutdown(self):
+        """
+        Waits for queued entries to finish scoring.
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def status(entry):
+    """
+    Returns the sentiment_status of an entry, treating entries from before the pipeline as done.
+    """
+
+    return entry.get('sentiment_status') or SENTIMENT_DONE
@@ -0,0 +1,118 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from bson import ObjectId
+from flask import Flask
+
+from models import MongoDBConn, Journal, SENTIMENT_PENDING, SENTIMENT_DONE, SENTIMENT_FAILED
+from pipeline import SentimentPipeline
+from utils import sentiment_analysis
+from utils_test import FlakySentiment
+
+
+class TestSentimentPipeline(TestCase):
+    """
+    Tests background scoring of journal entries.
+    """
+
+    def setUp(self):
+        """
+        Setting up resources needed for test cases, connects to the test db.
+        """
+
+        # setup flask server.
+        app = Flask(__name__)
+        app.config['MONGO_URI'] = 'mongodb://localhost:27017/testdb'
+
+        # send the app to the MongoDB and Journal.
+        self.journal = Journal(MongoDBConn(app))
+        self.log = self.journal.dbconn.db.log
+
+        # delete all entries in collection, refreshing.
+        self.log.delete_many({})
+        self.journal.manager.stats.rebuild()
+
+        self.pipeline = SentimentPipeline(self.journal.manager, workers=2)
+        self.addCleanup(self.pipeline.shutdown)
+
+
+    def test_submit(self):
+        """
+        Tests a pending entry is scored and marked done.
+        """
+
+        body = 'I had a great day today!'
+        _id = self.journal.manager.create(body, None, SENTIMENT_PENDING)
+
+        sentiment = self.pipeline.submit(_id, body).result()
+        entry = self.log.find_one({'_id': ObjectId(_id)})
+
+        self.assertEqual(sentiment, sentiment_analysis(body))
+        self.assertEqual(entry['sentiment'], sentiment)
+        self.assertEqual(entry['sentiment_status'], SENTIMENT_DONE)
+
+
+    def test_failed(self):
+        """
+        Tests an entry the backend fails to score is marked failed, so backfill retries it.
+        """
+
+        body = 'I love my lovely frog!'
+        _id = self.journal.manager.create(body, None, SENTIMENT_PENDING)
+
+        with patch('utils.get_backend', return_value=FlakySentiment()), patch('utils.get_cache', return_value=None), patch('builtins.print'):
+            self.assertIsNone(self.pipeline.submit(_id, body).result())
+
+        self.assertEqual(self.log.find_one({'_id': ObjectId(_id)})['sentiment_status'], SENTIMENT_FAILED)
+        self.assertEqual([entry['_id'] for entry in self.journal.manager.unscored()], [ObjectId(_id)])
+
+
+    def test_edited(self):
+        """
+        Tests a stale score doesn't overwrite an entry edited since it was queued.
+        """
+
+        _id = self.journal.manager.create('I had a great day today!', None, SENTIMENT_PENDING)
+        self.journal.manager.update(_id, {'body': 'I HATE my job!'})
+
+        self.pipeline.submit(_id, 'I had a great day today!').result()
+        entry = self.log.find_one({'_id': ObjectId(_id)})
+
+        self.assertIsNone(entry['sentiment'])
+        self.assertEqual(entry['sentiment_status'], SENTIMENT_PENDING)
+
+
+    def test_backfill(self):
+        """
+        Tests entries without a sentiment are re-scored in batches.
+        """
+
+        bodies = ['I had a great day today!', 'I HATE my job!', 'So happy!', 'Feeling sad.', 'What a lovely morning.']
+        for body in bodies:
+            self.log.insert_one({'body': body, 'sentiment': None})
+
+        # entries already scored are skipped.
+        self.journal.manager.create('I am a frog.', None)
+
+        self.assertEqual(self.pipeline.backfill(batch_size=2), len(bodies))
+        self.assertEqual(self.log.count_documents({'sentiment': None}), 1)
+        self.assertEqual(self.log.count_documents({'sentiment_status': SENTIMENT_DONE}), len(bodies) + 1)
+
+
+    def test_rescore(self):
+        """
+        Tests every entry is re-scored with the batch API.
+        """
+
+        bodies = ['I had a great day today!', 'I HATE my job!', 'I am a frog.']
+        for body in bodies:
+            self.journal.manager.create(body, 5.0)
+
+        self.assertEqual(self.pipeline.rescore(batch_size=2), (3, 0))
+
+        for body in bodies:
+            entry = self.log.find_one({'body': body})
+            self.assertEqual(entry['sentiment'], sentiment_analysis(body))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,60 @@
 
-from flask import render_template, request, redirect, url_for
-from datetime import datetime as dt
-from config import app, journal
+import time
+import pymongo
+from flask import render_template, request, redirect, url_for, jsonify, abort, Response
+from bson.errors import InvalidId
+from datetime import datetime as dt, timedelta
+from config import app, journal, pipeline
+from db import pool_stats
+from metrics import registry, CONTENT_TYPE
 
-from utils import sentiment_analysis, daily_affirmation
+from models import SENTIMENT_PENDING, now, format_timestamp, format_sentiment
+from pipeline import status
+from utils import daily_affirmation
+
+
+# entries shown per page on the entries page.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# points plotted on the mood tracker, larger windows are downsampled.
+DEFAULT_MOOD_POINTS = 1000
+MAX_MOOD_POINTS = 5000
+
+# how the mood tracker can plot a window, by default picked from its length.
+MOOD_UNITS = ('entry', 'day', 'week', 'month')
+
+
+def affirmation(sentiment):
+    """
+    Returns a daily affirmation for a sentiment, or None if the entry has no sentiment.
+    """
+
+    # filters for non-None sentiments.
+    if isinstance(sentiment, (int, float)):
+        return daily_affirmation(sentiment)
+
+
+def parse_datetime(value):
+    """
+    Parses an ISO 8601 datetime as the naive local time entries are stored in, or None if there isn't one.
+    """
+
+    if not value:
+        return
+
+    value = dt.fromisoformat(value)
+
+    # e.g. dates sent from a browser in UTC.
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+
+    return value
+
+
+# display stored timestamps and sentiments in templates.
+app.add_template_filter(format_timestamp, 'timestamp')
+app.add_template_filter(format_sentiment, 'sentiment')
 
 
 # home app route.
@@ -40,19 +91,13 @@ def add_entry():
 
             return render_template('index.html', result=result)
         
-        sentiment = sentiment_analysis(entry)
-        journal.manager.create(entry, sentiment)
+        # save straight away, the sentiment is scored in the background.
+        _id = journal.manager.create(entry, None, SENTIMENT_PENDING)
+        pipeline.submit(_id, entry)
         result = 'New journal entry added!'
 
-        # filters for non-None sentiments.
-        if isinstance(sentiment, str):
-            daily_affirm = daily_affirmation(float(sentiment))
-
-            # redirects to submission page.
-            return redirect(url_for('submission_page', result=result, daily_affirm=daily_affirm))
-        
-        # otherwise, no daily affirmation/sentiment.
-        return redirect(url_for('submission_page', result=result))
+        # redirects to submission page, which shows the affirmation once scored.
+        return redirect(url_for('submission_page', result=result, entry_id=str(_id)))
             
     # if 'entry' key doesn't exist.
     except KeyError as e:
@@ -72,24 +117,88 @@ def submission_page():
     # get args for the template.
     result = request.args.get('result')
     daily_affirm = request.args.get('daily_affirm')
+    entry_id = request.args.get('entry_id')
 
-    return render_template('submission.html', result=result, daily_affirm=daily_affirm)
+    return render_template('submission.html', result=result, daily_affirm=daily_affirm, entry_id=entry_id)
+
+
+@app.route('/entries/<_id>/sentiment', methods=['GET'])
+def entry_sentiment(_id):
+    """
+    Returns the scoring status of an entry, with a daily affirmation once scored.
+    """
+
+    try:
+        entry_data = journal.manager.read_one(_id)
+
+    # if the id isn't an entry id.
+    except InvalidId:
+        abort(404)
+
+    if not entry_data:
+        abort(404)
+
+    entry = entry_data[0]
+
+    return jsonify(
+        status=status(entry),
+        sentiment=entry.get('sentiment'),
+        daily_affirm=affirmation(entry.get('sentiment'))
+        )
 
 
 @app.route('/entries', methods=['GET'])
 def entries():
     """
-    Retrieves all entries from the DB to read to the web page.
+    Retrieves a page of entries from the DB to read to the web page.
     """
 
-    entries_data = journal.manager.read_all()
+    # page size is bounded so a page always costs the same.
+    page_size = min(max(request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
 
-    # convert to an iterable for iterating in HTML.
-    if isinstance(entries_data, dict):
-        entries_data = [entries_data]
+    try:
+        page = journal.manager.read_page(page_size, after=request.args.get('after'), before=request.args.get('before'))
+
+    # if the cursor isn't an entry id.
+    except InvalidId:
+        abort(400)
+
+    # return the web page that has the page of entries on it.
+    return render_template('entries.html', entries_data=page['entries'], next=page['next'], prev=page['prev'], page_size=page_size)
+
+
+@app.route('/search', methods=['GET'])
+def search():
+    """
+    Searches entries, optionally within a sentiment and date range.
+    """
+
+    query = request.args.get('q', '').strip()
+    page_size = min(max(request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    # filters are optional, dates are ISO 8601.
+    filters = {
+        'min_sentiment': request.args.get('min_sentiment', type=float),
+        'max_sentiment': request.args.get('max_sentiment', type=float)
+    }
 
-    # return the web page that has all entries on it.
-    return render_template('entries.html', entries_data=entries_data)
+    try:
+        filters['start'] = parse_datetime(request.args.get('start'))
+        filters['end'] = parse_datetime(request.args.get('end'))
+
+        # an empty query shows the search form.
+        page = {'results': [], 'next': None}
+        if query:
+            page = journal.manager.search(query, page_size, request.args.get('cursor'), **filters)
+
+    # if a date or the cursor can't be parsed.
+    except ValueError:
+        abort(400)
+
+    # the query and filters are kept when paging.
+    args = {name: value for name, value in request.args.items() if name != 'cursor'}
+
+    return render_template('search.html', query=query, results=page['results'], next=page['next'], args=args)
 
 
 @app.route('/entries/<_id>', methods=['GET'])
@@ -113,15 +222,19 @@ def delete_entry(entry_id):
     """
     Deletes an entry, redirects to the entries page.
     """
-    journal.manager.delete(entry_id)
 
-    # return to entries page.
-    entries_data = journal.manager.read_all()
+    try:
+        deleted = journal.manager.delete(entry_id)
 
-    if isinstance(entries_data, dict):
-        entries_data = [entries_data]
+    # if the id isn't an entry id.
+    except InvalidId:
+        abort(404)
 
-    return redirect(url_for('entries', entries_data=entries_data))
+    if not deleted:
+        abort(404)
+
+    # return to entries page, which reads its own first page.
+    return redirect(url_for('entries'))
 
 
 @app.route('/update/<entry_id>', methods=['POST'])
@@ -141,33 +254,29 @@ def update_entry(entry_id):
 
             return render_template('entry.html', entry_data=entry_data, result=result)
         
-        time = dt.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # update sentiment analysis on updated entry.
-        sentiment = sentiment_analysis(entry)
-
+        # the updated entry is re-scored in the background.
         update_data = {
             'body': entry,
-            'sentiment': sentiment,
-            'last timestamp': time
+            'sentiment': None,
+            'sentiment_status': SENTIMENT_PENDING,
+            'last timestamp': now()
         }
-        
-        journal.manager.update(entry_id, update_data)
 
-        # check if the entry was updated successfully.
-        query = {'body': entry,
-                'last timestamp': time}
+        # the update reports whether the entry was there, no need to read it back.
+        try:
+            updated = journal.manager.update(entry_id, update_data)
 
-        updated = journal.manager.check_one(query)
+        # if the id isn't an entry id.
+        except InvalidId:
+            updated = 0
 
-        # if entry has been updated, redirect.
-        if updated:
-            entries_data = journal.manager.read_all()
+        if not updated:
+            abort(404)
 
-            if isinstance(entries_data, dict):
-                entries_data = [entries_data]
+        pipeline.submit(entry_id, entry)
 
-            return redirect(url_for('entries', entries_data=entries_data))
+        # return to entries page, which reads its own first page.
+        return redirect(url_for('entries'))
     
     # if 'entry' key doesn't exist.
     except KeyError as e:
@@ -186,14 +295,80 @@ def mood_plot():
     Generates sentiment plot and analysis.
     """
     
-    # get the plot and sentiment analytics.
-    plot_html = journal.mood.plot_mood()
+    # get the sentiment analytics, the plot is drawn in the browser from /api/mood.
     lowest_posts = journal.mood.min_sentiments()
     avg_sentiment = journal.mood.av_sentiment()
     highest_posts = journal.mood.max_sentiments()
 
     # render web page.
-    return render_template('mood.html', plot_1=plot_html, lowest=lowest_posts, last_seven_avg_sentiment=avg_sentiment, highest = highest_posts)
+    return render_template('mood.html', lowest=lowest_posts, last_seven_avg_sentiment=avg_sentiment, highest = highest_posts)
+
+
+@app.route('/api/mood', methods=['GET'])
+def mood_data():
+    """
+    Returns sentiments over a time window as JSON columns for plotting.
+    """
+
+    # bounded so a large window costs the same as a small one.
+    max_points = min(max(request.args.get('points', DEFAULT_MOOD_POINTS, type=int), 3), MAX_MOOD_POINTS)
+
+    # start and end are optional ISO 8601 datetimes, or days is how far back to start.
+    try:
+        start = parse_datetime(request.args.get('start'))
+        end = parse_datetime(request.args.get('end'))
+
+        if request.args.get('days'):
+            start = now() - timedelta(days=int(request.args['days']))
+
+    # if a datetime or number of days can't be parsed, or days reaches past the earliest date.
+    except (ValueError, OverflowError):
+        abort(400)
+
+    # entry by entry, or a rollup.
+    unit = request.args.get('unit')
+
+    if unit is not None and unit not in MOOD_UNITS:
+        abort(400)
+
+    return jsonify(journal.mood.mood_data(start, end, max_points, unit))
+
+
+@app.route('/stats/pool', methods=['GET'])
+def pool_usage():
+    """
+    Returns MongoDB connection pool counters per server, for scraping.
+    """
+
+    return jsonify(pool_stats.snapshot())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Request latency, MongoDB commands, sentiment scoring and plot build times in the Prometheus text format, for scraping.
+    """
+
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/healthz', methods=['GET'])
+def health():
+    """
+    Readiness check for load balancers and process managers: 200 if the DB answers a ping, 503 if not.
+    """
+
+    start = time.perf_counter()
+
+    try:
+        # fail fast rather than waiting out the server selection timeout.
+        with pymongo.timeout(app.config['HEALTH_TIMEOUT']):
+            journal.dbconn.ping()
+
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'db': str(e)}), 503
+
+    return jsonify({'status': 'ok', 'db': 'ok', 'ping_ms': round((time.perf_counter() - start) * 1000, 1)})
 
 
 @app.route('/team')
@@ -0,0 +1,143 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from collections import Counter
+from bson import ObjectId
+
+from db import command_stats
+from models import SENTIMENT_PENDING
+from routes import app, journal
+
+
+class TestWriteRoutes(TestCase):
+    """
+    Tests the update and delete routes, and the MongoDB commands each request sends.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # the first request starts creating indexes in the background, which would be counted with the commands.
+        app.test_client().get('/healthz')
+        if not app.extensions['indexes'].wait(30):
+            raise RuntimeError('indexes were not created')
+
+
+    def setUp(self):
+        self.client = app.test_client()
+
+        # unscored entries, so only the entry itself is written.
+        self.entry_id = journal.manager.create('Test body', None, SENTIMENT_PENDING)
+
+        # scoring would run in the background and send its own commands.
+        patcher = patch('routes.pipeline')
+        self.pipeline = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+        journal.manager.delete(self.entry_id)
+
+
+    def commands(self, url, **kwargs):
+        """
+        Posts to a url. Returns the response and the commands the request sent, by name.
+        """
+
+        before = Counter(command_stats.snapshot())
+        response = self.client.post(url, **kwargs)
+
+        return response, Counter(command_stats.snapshot()) - before
+
+
+    def test_update(self):
+        """
+        Tests an update is one command, plus bumping the shared write counter, and a plain redirect.
+        """
+
+        response, commands = self.commands(f'/update/{self.entry_id}', data={'entry': 'New body'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, '/entries')
+        self.assertEqual(commands, Counter({'findAndModify': 1, 'update': 1}))
+
+        self.assertEqual(journal.manager.read_one(self.entry_id)[0]['body'], 'New body')
+        self.pipeline.submit.assert_called_once_with(str(self.entry_id), 'New body')
+
+
+    def test_update_missing(self):
+        """
+        Tests updating a missing entry is a 404, and isn't scored.
+        """
+
+        response, _ = self.commands(f'/update/{ObjectId()}', data={'entry': 'New body'})
+        self.assertEqual(response.status_code, 404)
+
+        response, commands = self.commands('/update/not-an-id', data={'entry': 'New body'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(commands, Counter())
+
+        self.pipeline.submit.assert_not_called()
+
+
+    def test_sentiment(self):
+        """
+        Tests an entry's scoring status is returned, and ids that aren't entries are a 404.
+        """
+
+        response = self.client.get(f'/entries/{self.entry_id}/sentiment')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], SENTIMENT_PENDING)
+
+        self.assertEqual(self.client.get(f'/entries/{ObjectId()}/sentiment').status_code, 404)
+        self.assertEqual(self.client.get('/entries/not-an-id/sentiment').status_code, 404)
+
+
+    def test_entry_page(self):
+        """
+        Tests an entry's page links to the other pages from the site root, not from under /entries.
+        """
+
+        response = self.client.get(f'/entries/{self.entry_id}')
+        self.assertEqual(response.status_code, 200)
+
+        for url in ['/entries', '/search', '/moodtracker', '/team']:
+            self.assertIn(f'href="{url}"', response.get_data(as_text=True))
+
+
+    def test_delete(self):
+        """
+        Tests a delete is one command, plus bumping the shared write counter, and a plain redirect, and deleting again is a 404.
+        """
+
+        response, commands = self.commands(f'/delete/{self.entry_id}')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, '/entries')
+        self.assertEqual(commands, Counter({'findAndModify': 1, 'update': 1}))
+
+        response, _ = self.commands(f'/delete/{self.entry_id}')
+        self.assertEqual(response.status_code, 404)
+
+        response, _ = self.commands('/delete/not-an-id')
+        self.assertEqual(response.status_code, 404)
+
+
+class TestMoodRoutes(TestCase):
+    """
+    Tests the mood data route's arguments.
+    """
+
+    def test_bad_window(self):
+        """
+        Tests windows that can't be parsed or are out of range are a 400.
+        """
+
+        client = app.test_client()
+
+        for query in ['days=soon', 'days=99999999999', 'days=-99999999999', 'start=yesterday', 'unit=fortnight']:
+            self.assertEqual(client.get(f'/api/mood?{query}').status_code, 400, query)
+
+        self.assertEqual(client.get('/api/mood?days=7').status_code, 200)
+
+
+if __name__ == '__main__':
+    main()
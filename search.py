@@ -0,0 +1,280 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from markupsafe import Markup, escape
+
+
+# characters of body shown around the first match.
+SNIPPET_LENGTH = 160
+
+# common words MongoDB's english text index ignores too.
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'if', 'in', 'into', 'is', 'it',
+    'my', 'no', 'not', 'of', 'on', 'or', 'so', 'such', 'that', 'the', 'their', 'then', 'there',
+    'these', 'they', 'this', 'to', 'was', 'were', 'will', 'with', 'i', 'me', 'am', 'im'
+}
+
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase search terms, without stopwords or possessive endings.
+    """
+
+    terms = []
+    for word in WORD.findall((text or '').lower()):
+        word = word.split("'")[0]
+
+        if word and word not in STOPWORDS:
+            terms.append(word)
+
+    return terms
+
+
+def snippet(body, query, length=SNIPPET_LENGTH):
+    """
+    Returns the part of a body around the first query term as HTML, with the terms highlighted.
+    """
+
+    body = body or ''
+    terms = set(tokenize(query))
+
+    # every occurrence of a term as a whole word, with any possessive ending.
+    pattern = re.compile(r"\b(" + '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + r")(?:'[a-z]+)?\b", re.IGNORECASE) if terms else None
+    match = pattern.search(body) if pattern else None
+
+    # centre the snippet on the first match.
+    start = max(match.start() - length // 3, 0) if match else 0
+    end = min(start + length, len(body))
+
+    # keep whole words at either end.
+    if start > 0:
+        space = body.find(' ', start)
+        start = space + 1 if 0 <= space < end else start
+    if end < len(body):
+        space = body.rfind(' ', start, end)
+        end = space if space > start else end
+
+    text = body[start:end]
+    html = Markup('&hellip;') if start > 0 else Markup('')
+
+    # escape the text between matches, mark the matches.
+    position = 0
+    for found in pattern.finditer(text) if pattern else ():
+        html += escape(text[position:found.start()]) + Markup('<mark>') + escape(found.group()) + Markup('</mark>')
+        position = found.end()
+
+    html += escape(text[position:])
+
+    if end < len(body):
+        html += Markup('&hellip;')
+
+    return html
+
+
+class TextSearch:
+    """
+    Search backed by a MongoDB text index on the entry body, ranked by text score.
+    """
+
+    name = 'text'
+
+    def __init__(self, collection, scope=None):
+        # the user is in every query's filter, so the scope isn't kept.
+        self.collection = collection
+
+
+    def ensure_indexes(self):
+        """
+        Creates the text index, a collection can only have one. Its user_id prefix keeps each search to one user's entries.
+        """
+
+        # the text index from before users.
+        if 'body_text' in self.collection.index_information():
+            self.collection.drop_index('body_text')
+
+        self.collection.create_index([('user_id', 1), ('body', 'text')], default_language='english', name='user_body_text')
+
+
+    def find(self, query, filter, skip, limit, projection):
+        """
+        Returns up to limit entries matching the query and filter, best first, from skip onwards.
+        """
+
+        projection = {**projection, 'score': {'$meta': 'textScore'}}
+
+        return list(self.collection.find({'$text': {'$search': query}, **filter}, projection)
+                    .sort([('score', {'$meta': 'textScore'}), ('_id', -1)])
+                    .skip(skip)
+                    .limit(limit))
+
+
+    def add(self, _id, body):
+        """
+        MongoDB keeps the text index up to date.
+        """
+
+
+    def remove(self, _id):
+        """
+        MongoDB keeps the text index up to date.
+        """
+
+
+class MemorySearch:
+    """
+    Search backed by an in-process inverted index, ranked by TF-IDF. For test and development databases
+    without text indexes. Each process keeps its own index, built from the collection on the first search.
+    """
+
+    name = 'memory'
+
+    def __init__(self, collection, scope=None):
+        self.collection = collection
+
+        # only the user's entries are indexed.
+        self.scope = scope or {}
+
+        # term -> {entry id: term count}, and the number of terms in each entry.
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+
+        # entry id -> its distinct terms, so removing an entry only touches its own postings.
+        self.terms = {}
+
+        self.built = False
+        self._lock = threading.Lock()
+
+
+    def ensure_indexes(self):
+        """
+        The index is built on the first search.
+        """
+
+
+    def build(self):
+        """
+        Indexes every entry in the collection.
+        """
+
+        with self._lock:
+            self.postings.clear()
+            self.lengths.clear()
+            self.terms.clear()
+
+            for entry in self.collection.find(self.scope, {'body': 1}):
+                self._add(entry['_id'], entry.get('body'))
+
+            self.built = True
+
+
+    def find(self, query, filter, skip, limit, projection):
+        """
+        Returns up to limit entries matching the query and filter, best first, from skip onwards.
+        """
+
+        if not self.built:
+            self.build()
+
+        scores = self.scores(query)
+
+        if not scores:
+            return []
+
+        entries = list(self.collection.find({'_id': {'$in': list(scores)}, **filter}, projection))
+        for entry in entries:
+            entry['score'] = scores[entry['_id']]
+
+        # best first, newest first for equal scores.
+        entries.sort(key=lambda entry: (entry['score'], entry['_id']), reverse=True)
+
+        return entries[skip:skip + limit]
+
+
+    def scores(self, query):
+        """
+        Returns the TF-IDF score of every entry matching any query term.
+        """
+
+        scores = Counter()
+
+        with self._lock:
+            total = len(self.lengths)
+
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+
+                if not postings:
+                    continue
+
+                # rarer terms count for more.
+                idf = math.log(1 + total / len(postings))
+
+                for _id, count in postings.items():
+                    scores[_id] += count / self.lengths[_id] * idf
+
+        return scores
+
+
+    def add(self, _id, body):
+        """
+        Indexes a new or edited entry.
+        """
+
+        if self.built:
+            with self._lock:
+                self._remove(_id)
+                self._add(_id, body)
+
+
+    def remove(self, _id):
+        """
+        Removes a deleted entry from the index.
+        """
+
+        if self.built:
+            with self._lock:
+                self._remove(_id)
+
+
+    def _add(self, _id, body):
+        terms = Counter(tokenize(body))
+
+        for term, count in terms.items():
+            self.postings[term][_id] = count
+
+        # avoids dividing by zero for entries with no terms.
+        self.lengths[_id] = max(sum(terms.values()), 1)
+        self.terms[_id] = tuple(terms)
+
+
+    def _remove(self, _id):
+        self.lengths.pop(_id, None)
+
+        for term in self.terms.pop(_id, ()):
+            postings = self.postings[term]
+            postings.pop(_id, None)
+
+            if not postings:
+                del self.postings[term]
+
+
+# available search backends by config name.
+SEARCH_BACKENDS = {
+    TextSearch.name: TextSearch,
+    MemorySearch.name: MemorySearch
+}
+
+
+def create_search(name, collection, scope=None):
+    """
+    Creates a search backend from its config name, for the entries matching scope.
+    """
+
+    try:
+        return SEARCH_BACKENDS[name](collection, scope)
+
+    except KeyError:
+        raise ValueError(f'Unknown search backend: {name}')
@@ -0,0 +1,188 @@
+from unittest import TestCase, main
+from datetime import datetime as dt, timedelta
+from flask import Flask
+
+from models import MongoDBConn, Journal
+from search import tokenize, snippet, create_search
+
+
+class TestTokenize(TestCase):
+    """
+    Tests text is split into search terms.
+    """
+
+    def test_tokenize(self):
+        """
+        Tests terms are lowercase, without stopwords, punctuation or possessives.
+        """
+
+        self.assertEqual(tokenize("I'm SO happy today, the ice-cream shop's open!"), ['happy', 'today', 'ice', 'cream', 'shop', 'open'])
+        self.assertEqual(tokenize(None), [])
+
+
+class TestSnippet(TestCase):
+    """
+    Tests highlighted snippets of entry bodies.
+    """
+
+    def test_highlight(self):
+        """
+        Tests every match is marked and the rest of the body is escaped.
+        """
+
+        html = snippet('<b>Ice cream</b> and more ice cream!', 'CREAM')
+
+        self.assertEqual(html, '&lt;b&gt;Ice <mark>cream</mark>&lt;/b&gt; and more ice <mark>cream</mark>!')
+        self.assertTrue(hasattr(html, '__html__'))
+
+
+    def test_window(self):
+        """
+        Tests long bodies are cut around the first match, at word boundaries.
+        """
+
+        body = ' '.join(f'word{i}' for i in range(100)) + ' sunshine ' + ' '.join(f'word{i}' for i in range(100))
+        html = snippet(body, 'sunshine', length=60)
+
+        self.assertIn('<mark>sunshine</mark>', html)
+        self.assertTrue(html.startswith('&hellip;word'))
+        self.assertTrue(html.endswith('&hellip;'))
+        self.assertLess(len(html), 120)
+
+
+    def test_no_match(self):
+        """
+        Tests the start of the body is shown when nothing matches.
+        """
+
+        self.assertEqual(snippet('Lovely day.', 'rain'), 'Lovely day.')
+
+
+    def test_unknown(self):
+        """
+        Tests unknown backends are rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            create_search('grep', None)
+
+
+class SearchTests:
+    """
+    Tests shared by every search backend.
+    """
+
+    backend = None
+
+    def setUp(self):
+        """
+        Setting up a journal on a test collection with a few entries.
+        """
+
+        app = Flask(__name__)
+        app.config['MONGO_URI'] = 'mongodb://localhost:27017/testdb'
+
+        mongo_conn = MongoDBConn(app)
+        mongo_conn.collection = mongo_conn.db.searching
+        mongo_conn.collection.delete_many({})
+
+        self.journal = Journal(mongo_conn, search_backend=self.backend)
+        self.journal.manager.ensure_indexes()
+
+        self.manager = self.journal.manager
+        self.ids = {}
+        for body, sentiment in [
+                ('Ice cream shop ran out of my favourite flavour, so sad.', 2.5),
+                ('Ice cream store is back with my flavour, ice cream all day!', 9.0),
+                ('Learnt search and sort algorithms in my session.', 7.0),
+                ('Rainy walk to work, nothing to report.', None)
+                ]:
+            self.ids[body.split()[0]] = self.manager.create(body, sentiment)
+
+
+    def test_ranked(self):
+        """
+        Tests matches are ranked, with snippets, and other entries are left out.
+        """
+
+        page = self.manager.search('ice cream')
+        bodies = [entry['body'] for entry in page['results']]
+
+        # the entry mentioning ice cream twice ranks first.
+        self.assertEqual(len(bodies), 2)
+        self.assertTrue(bodies[0].startswith('Ice cream store'))
+        self.assertIn('<mark>cream</mark>', page['results'][0]['snippet'])
+        self.assertGreater(page['results'][0]['score'], page['results'][1]['score'])
+        self.assertIsNone(page['next'])
+
+
+    def test_pages(self):
+        """
+        Tests results are paged with the next cursor.
+        """
+
+        first = self.manager.search('ice cream', limit=1)
+        second = self.manager.search('ice cream', limit=1, cursor=first['next'])
+
+        self.assertEqual(len(first['results']), 1)
+        self.assertEqual(second['next'], None)
+        self.assertNotEqual(first['results'][0]['_id'], second['results'][0]['_id'])
+
+
+    def test_filters(self):
+        """
+        Tests results can be limited to a sentiment and date range.
+        """
+
+        page = self.manager.search('ice cream', max_sentiment=5)
+        self.assertEqual([entry['sentiment'] for entry in page['results']], [2.5])
+
+        page = self.manager.search('ice cream', min_sentiment=5, start=dt.now() - timedelta(days=1))
+        self.assertEqual([entry['sentiment'] for entry in page['results']], [9.0])
+
+        page = self.manager.search('ice cream', end=dt.now() - timedelta(days=1))
+        self.assertEqual(page['results'], [])
+
+
+    def test_writes(self):
+        """
+        Tests edited and deleted entries are searched as they are now.
+        """
+
+        self.manager.update(self.ids['Rainy'], {'body': 'Sunny walk, then ice cream.'})
+        self.manager.delete(self.ids['Learnt'])
+
+        self.assertEqual(len(self.manager.search('ice')['results']), 3)
+        self.assertEqual(self.manager.search('algorithms')['results'], [])
+
+
+    def test_users(self):
+        """
+        Tests each user only finds their own entries.
+        """
+
+        alice = self.journal.for_user('alice').manager
+        alice.create('Ice cream with friends.', 8.0)
+
+        self.assertEqual([entry['body'] for entry in alice.search('ice cream')['results']], ['Ice cream with friends.'])
+        self.assertEqual(len(self.manager.search('ice cream')['results']), 2)
+
+
+class TestTextSearch(SearchTests, TestCase):
+    """
+    Tests search with a MongoDB text index.
+    """
+
+    backend = 'text'
+
+
+class TestMemorySearch(SearchTests, TestCase):
+    """
+    Tests search with the in-process inverted index.
+    """
+
+    backend = 'memory'
+
+
+if __name__ == '__main__':
+    main()
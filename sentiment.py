@@ -0,0 +1,303 @@
+import hashlib
+import threading
+from collections import namedtuple
+from abc import ABC, abstractmethod
+
+from metrics import sentiment_errors
+
+
+# result of scoring one text in a batch, error is None on success.
+BatchResult = namedtuple('BatchResult', ['value', 'error'])
+
+
+# the original remote sentiment API.
+REMOTE_URL = 'http://text-processing.com/api/sentiment/'
+
+# shared pattern lexicon, loaded once per process on first use.
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def analyzer():
+    """
+    Returns the shared pattern analyzer, importing TextBlob the first time.
+    """
+
+    global _analyzer
+
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                from textblob.en.sentiments import PatternAnalyzer
+                _analyzer = PatternAnalyzer()
+
+    return _analyzer
+
+
+def warm_lexicon():
+    """
+    Loads the pattern lexicon into memory so the first request doesn't pay for it.
+    """
+
+    # the lexicon is read from disk on the first analysis.
+    analyzer().analyze('warm up')
+
+
+def analyse(text):
+    """
+    Returns the lexicon's polarity and subjectivity of a piece of text, from one pass over it.
+    """
+
+    return analyzer().analyze(text)
+
+
+def subjectivity(text):
+    """
+    Returns the subjectivity of a piece of text on a scale of 0 - 1.
+    """
+
+    return analyse(text).subjectivity
+
+
+class SentimentBackend(ABC):
+    """
+    Scores the positivity of a piece of text.
+    """
+
+    # name used to select the backend in config.
+    name = None
+
+    @abstractmethod
+    def score(self, text):
+        """
+        Returns the positive probability on a scale of 0 - 1, or None if the text can't be scored.
+        Raises if scoring failed and should be retried.
+        """
+
+
+    def score_analysis(self, text, analysis):
+        """
+        Scores a text that `analyse()` has already been run on for its subjectivity.
+        Backends that score with the same lexicon use the analysis rather than repeating it.
+        """
+
+        return self.score(text)
+
+
+    def score_analyses(self, texts, analyses):
+        """
+        Scores many texts that `analyse()` has already been run on, like score_analysis. Returns a BatchResult per text.
+        """
+
+        return self.score_batch(texts)
+
+
+    def score_batch(self, texts):
+        """
+        Scores many texts. Returns a BatchResult per text, recording failures instead of raising.
+        """
+
+        results = []
+        for text in texts:
+            try:
+                results.append(BatchResult(self.score(text), None))
+
+            except Exception as e:
+                results.append(BatchResult(None, str(e)))
+
+        return results
+
+
+class LocalSentiment(SentimentBackend):
+    """
+    In-process sentiment scoring using the pattern lexicon shipped with TextBlob.
+    """
+
+    name = 'local'
+
+    def score(self, text):
+        """
+        Maps the lexicon polarity (-1 - 1) onto a positive probability (0 - 1).
+        """
+
+        return self.score_analysis(text, analyse(text))
+
+
+    def score_analysis(self, text, analysis):
+        """
+        Maps the polarity of an existing analysis onto a positive probability.
+        """
+
+        return (analysis.polarity + 1) / 2
+
+
+    def score_batch(self, texts):
+        """
+        Scores many texts, analysing each once.
+        """
+
+        return self.score_analyses(texts, [analyse(text) for text in texts])
+
+
+    def score_analyses(self, texts, analyses):
+        """
+        Maps the polarity of each existing analysis onto a positive probability.
+        """
+
+        return [BatchResult(self.score_analysis(text, analysis), None) for text, analysis in zip(texts, analyses)]
+
+
+class RemoteSentiment(SentimentBackend):
+    """
+    Sentiment scoring via the text-processing.com API.
+    """
+
+    name = 'remote'
+
+    # API has an 80k char limit.
+    max_length = 80000
+
+    def __init__(self, url=REMOTE_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+
+    def score(self, text):
+        """
+        Posts the text to the API and returns its positive probability. Raises if the API can't be reached,
+        so the failure isn't mistaken for an objective text.
+        """
+
+        import requests
+
+        return self._post(requests, text)
+
+
+    def score_batch(self, texts):
+        """
+        Posts each text to the API over one kept-alive connection.
+        """
+
+        import requests
+
+        results = []
+        with requests.Session() as session:
+            for text in texts:
+                try:
+                    results.append(BatchResult(self._post(session, text), None))
+
+                except Exception as e:
+                    results.append(BatchResult(None, str(e)))
+
+        return results
+
+
+    def _post(self, session, text):
+        """
+        Posts a text to the API with a requests session or module, raising on failed requests.
+        """
+
+        import requests
+
+        if len(text) >= self.max_length:
+            return
+
+        try:
+            req = session.post(self.url, data={"text": text}, timeout=self.timeout)
+            req.raise_for_status()
+            data = req.json()
+
+        except requests.Timeout:
+            sentiment_errors.inc(self.name, 'timeout')
+            raise
+
+        except Exception:
+            sentiment_errors.inc(self.name, 'error')
+            raise
+
+        pos = data.get('probability', {}).get('pos')
+
+        # only return pos value is numeric.
+        if isinstance(pos, int) or isinstance(pos, float):
+            return pos
+
+        sentiment_errors.inc(self.name, 'error')
+        raise ValueError(f'No numeric pos probability in response: {data}')
+
+
+# available backends by config name.
+BACKENDS = {
+    LocalSentiment.name: LocalSentiment,
+    RemoteSentiment.name: RemoteSentiment
+}
+
+# the backend and result cache used by sentiment_analysis, set at startup.
+_backend = None
+_cache = None
+
+
+def create_backend(name, **kwargs):
+    """
+    Creates a sentiment backend from its config name.
+    """
+
+    try:
+        return BACKENDS[name](**kwargs)
+
+    except KeyError:
+        raise ValueError(f'Unknown sentiment backend: {name}')
+
+
+def set_backend(backend):
+    """
+    Sets the backend used by sentiment_analysis.
+    """
+
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    """
+    Returns the current backend, defaulting to the local scorer.
+    """
+
+    if _backend is None:
+        set_backend(LocalSentiment())
+
+    return _backend
+
+
+def set_cache(cache):
+    """
+    Sets the result cache used by sentiment_analysis, or None to disable caching.
+    """
+
+    global _cache
+    _cache = cache
+
+
+def get_cache():
+    """
+    Returns the current result cache, if any.
+    """
+
+    return _cache
+
+
+def normalise(text):
+    """
+    Collapses whitespace so re-saving an unchanged entry hits the cache.
+    """
+
+    return ' '.join(text.split())
+
+
+def cache_key(text, backend):
+    """
+    Returns a content hash of the normalised text, scoped to the backend that scores it.
+    """
+
+    digest = hashlib.sha256(normalise(text).encode('utf-8')).hexdigest()
+
+    return f'{backend.name}:{digest}'
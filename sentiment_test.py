@@ -0,0 +1,153 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+import requests
+
+from benchmarks.stub_server import start_stub_server
+from cache import LRUCache
+from sentiment import LocalSentiment, RemoteSentiment, create_backend, get_cache, set_cache
+from utils import sentiment_analysis
+
+
+class TestLocalSentiment(TestCase):
+    """
+    Tests the in-process sentiment backend.
+    """
+
+    def setUp(self):
+        """
+        Setting up the local backend.
+        """
+
+        self.backend = LocalSentiment()
+
+
+    def test_range(self):
+        """
+        Tests scores are probabilities between 0 and 1.
+        """
+
+        for text in ['I had a great day today!', 'I HATE my job!', 'I am a frog.']:
+            score = self.backend.score(text)
+            self.assertGreaterEqual(score, 0)
+            self.assertLessEqual(score, 1)
+
+
+    def test_order(self):
+        """
+        Tests positive texts score higher than negative texts.
+        """
+
+        self.assertGreater(self.backend.score('I had a great day today!'), self.backend.score('I HATE my job!'))
+
+
+    def test_scale(self):
+        """
+        Tests sentiment_analysis returns the local score on the 0 - 10 scale.
+        """
+
+        self.assertEqual(sentiment_analysis('I had a great day today!', backend=self.backend), 10.0)
+
+
+    def test_score_batch(self):
+        """
+        Tests batch scores match scoring each text on its own.
+        """
+
+        texts = ['I had a great day today!', 'I HATE my job!', 'I am a frog.']
+        results = self.backend.score_batch(texts)
+
+        self.assertEqual([result.value for result in results], [self.backend.score(text) for text in texts])
+
+
+class TestRemoteSentiment(TestCase):
+    """
+    Tests the remote sentiment backend against a local stub of the API.
+    """
+
+    def setUp(self):
+        """
+        Starts the stub API server.
+        """
+
+        self.server, self.url = start_stub_server()
+        self.addCleanup(self.server.shutdown)
+
+
+    def test_score(self):
+        """
+        Tests the pos probability is read from the API response.
+        """
+
+        text = 'I had a great day today!'
+        self.assertEqual(RemoteSentiment(self.url).score(text), (len(text) % 100) / 100)
+
+
+    def test_unavailable(self):
+        """
+        Tests an unreachable API raises, and sentiment_analysis returns no data without caching it.
+        """
+
+        backend = RemoteSentiment('http://127.0.0.1:1/api/sentiment/', timeout=1)
+
+        with self.assertRaises(requests.ConnectionError):
+            backend.score('I had a great day today!')
+
+        self.addCleanup(set_cache, get_cache())
+        cache = LRUCache()
+        set_cache(cache)
+
+        with patch('builtins.print'):
+            self.assertIsNone(sentiment_analysis('I had a great day today!', backend=backend))
+
+        self.assertEqual(len(cache), 0)
+
+
+    def test_score_batch(self):
+        """
+        Tests a batch is scored over the stub API, with failures reported per text.
+        """
+
+        texts = ['I had a great day today!', 'a' * 80000, 'So happy!']
+        results = RemoteSentiment(self.url).score_batch(texts)
+
+        self.assertEqual([result.value for result in results], [(len(texts[0]) % 100) / 100, None, (len(texts[2]) % 100) / 100])
+        self.assertTrue(all(result.error is None for result in results))
+
+        # an unreachable API fails every text.
+        results = RemoteSentiment('http://127.0.0.1:1/api/sentiment/', timeout=1).score_batch(texts[:2])
+        self.assertIsNotNone(results[0].error)
+
+
+    def test_too_long(self):
+        """
+        Tests texts over the API char limit return no data.
+        """
+
+        self.assertIsNone(RemoteSentiment(self.url).score('a' * 80000))
+
+
+class TestCreateBackend(TestCase):
+    """
+    Tests backend selection by config name.
+    """
+
+    def test_create(self):
+        """
+        Tests known names create their backend.
+        """
+
+        self.assertIsInstance(create_backend('local'), LocalSentiment)
+        self.assertIsInstance(create_backend('remote', url='http://127.0.0.1:1/'), RemoteSentiment)
+
+
+    def test_unknown(self):
+        """
+        Tests unknown names raise a ValueError.
+        """
+
+        with self.assertRaises(ValueError):
+            create_backend('magic')
+
+
+if __name__ == '__main__':
+    main()
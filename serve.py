@@ -0,0 +1,229 @@
+import argparse
+import importlib.util
+import sys
+
+from db import close_clients
+
+
+# servers in order of preference: gunicorn forks worker processes, waitress runs on Windows,
+# werkzeug's threaded server always works but is one process.
+SERVERS = ['gunicorn', 'waitress', 'werkzeug']
+
+# gunicorn worker classes: gthread gives each in-flight request a thread, gevent runs them as greenlets,
+# so requests waiting on MongoDB or the sentiment API don't each hold a thread.
+WORKER_CLASSES = ['gthread', 'gevent']
+
+
+def available(package):
+    """
+    Returns whether a server or worker package is installed.
+    """
+
+    return package == 'werkzeug' or importlib.util.find_spec(package) is not None
+
+
+def choose_server(name='auto'):
+    """
+    Returns the server to run, the best installed one for 'auto'.
+    """
+
+    if name == 'auto':
+        return next(server for server in SERVERS if available(server))
+
+    if name not in SERVERS:
+        raise ValueError(f'Unknown server: {name}')
+
+    if not available(name):
+        raise ValueError(f'{name} is not installed, run `pip install {name}`')
+
+    return name
+
+
+def check_worker_class(server, worker_class, preload=False):
+    """
+    Raises ValueError if a worker class can't be used with a server and settings.
+    """
+
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f'Unknown worker class: {worker_class}')
+
+    if worker_class == 'gthread':
+        return
+
+    if server != 'gunicorn':
+        raise ValueError(f'The {worker_class} worker class needs gunicorn')
+
+    if not available(worker_class):
+        raise ValueError(f'{worker_class} is not installed, run `pip install {worker_class}`')
+
+    # the app must be imported after gevent patches the standard library, or PyMongo keeps blocking locks.
+    if preload:
+        raise ValueError(f'The {worker_class} worker class can\'t preload the app')
+
+
+def load_app():
+    """
+    Imports the app. Each worker does this after forking, so none share sockets or threads with the master.
+    """
+
+    from routes import app
+
+    return app
+
+
+def post_worker_init(worker):
+    """
+    Gunicorn hook: loads pandas, plotly and TextBlob in the background once a worker is up.
+    """
+
+    from utils import warm_imports
+
+    warm_imports()
+
+
+def worker_exit(server, worker):
+    """
+    Gunicorn hook: lets queued sentiment scoring finish and closes the worker's MongoDB connections.
+    """
+
+    config = sys.modules.get('config')
+
+    if config is not None:
+        config.pipeline.shutdown()
+
+    close_clients()
+
+
+def gunicorn_options(args):
+    """
+    Returns gunicorn settings for the command line arguments.
+    """
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        # threads or greenlets per worker, either way keep-alive connections don't tie up a worker.
+        'worker_class': args.worker_class,
+        'worker_connections': args.connections,
+        'keepalive': args.keep_alive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        # recycle workers now and then, staggered so they don't all restart at once.
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        # off by default so a HUP reloads the code as well as the workers.
+        'preload_app': args.preload,
+        'accesslog': '-' if args.access_log else None,
+        'worker_exit': worker_exit
+    }
+
+    # a preloaded app is warmed once in the master, and the workers share its memory.
+    if args.warm and not args.preload:
+        options['post_worker_init'] = post_worker_init
+
+    return options
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        """
+        Gunicorn with settings from code rather than a config file.
+        """
+
+        def load_config(self):
+            for key, value in gunicorn_options(args).items():
+                self.cfg.set(key, value)
+
+
+        def load(self):
+            app = load_app()
+
+            if args.warm and args.preload:
+                from utils import warm_imports
+                warm_imports(background=False)
+
+            return app
+
+    Server().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+    from utils import warm_imports
+
+    app = load_app()
+
+    if args.warm:
+        warm_imports()
+
+    # waitress is one process, so it gets every worker's threads.
+    serve(app, listen=args.bind, threads=args.workers * args.threads, channel_timeout=args.keep_alive + args.timeout)
+
+
+def run_werkzeug(args):
+    from werkzeug.serving import run_simple, WSGIRequestHandler
+    from utils import warm_imports
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        """
+        HTTP/1.1, so browsers and load balancers can reuse connections.
+        """
+
+        protocol_version = 'HTTP/1.1'
+
+    host, _, port = args.bind.rpartition(':')
+    app = load_app()
+
+    if args.warm:
+        warm_imports()
+
+    print('Gunicorn and waitress are not installed, running a single threaded process.')
+    run_simple(host or '127.0.0.1', int(port), app, threaded=True, request_handler=KeepAliveHandler)
+
+
+RUNNERS = {
+    'gunicorn': run_gunicorn,
+    'waitress': run_waitress,
+    'werkzeug': run_werkzeug
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run Chill Pill with a production server.')
+    parser.add_argument('--server', default='auto', choices=['auto'] + SERVERS, help='server to run, auto picks the best installed')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes (gunicorn)')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--worker-class', default='gthread', choices=WORKER_CLASSES, help='gunicorn worker class, gevent for many slow requests')
+    parser.add_argument('--connections', type=int, default=1000, help='concurrent requests per gevent worker')
+    parser.add_argument('--keep-alive', type=int, default=5, help='seconds an idle keep-alive connection is held open')
+    parser.add_argument('--timeout', type=int, default=30, help='seconds a request may take before its worker is restarted')
+    parser.add_argument('--graceful-timeout', type=int, default=30, help='seconds workers get to finish requests on reload or shutdown')
+    parser.add_argument('--max-requests', type=int, default=10000, help='requests a worker serves before it is replaced, 0 never')
+    parser.add_argument('--preload', action='store_true', help='import the app once before forking, faster start but HUP no longer reloads code')
+    parser.add_argument('--no-warm', dest='warm', action='store_false', help='load pandas, plotly and TextBlob on first use rather than at startup')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stdout')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Production entry point, run with `python serve.py`. Under gunicorn, `kill -HUP <master pid>`
+    reloads the code and replaces the workers one by one without dropping requests.
+    """
+
+    args = parse_args(argv)
+    server = choose_server(args.server)
+    check_worker_class(server, args.worker_class, args.preload)
+
+    print(f'Running {server} on http://{args.bind}')
+
+    RUNNERS[server](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from serve import SERVERS, choose_server, check_worker_class, gunicorn_options, parse_args, post_worker_init, worker_exit
+from routes import app, journal
+
+
+class TestServe(TestCase):
+    """
+    Tests the production server settings.
+    """
+
+    def test_choose_server(self):
+        """
+        Tests auto picks the best installed server, and a missing or unknown one is refused.
+        """
+
+        with patch('serve.available', lambda server: server != 'gunicorn'):
+            self.assertEqual(choose_server(), 'waitress')
+            self.assertEqual(choose_server('werkzeug'), 'werkzeug')
+
+            with self.assertRaises(ValueError):
+                choose_server('gunicorn')
+
+        with patch('serve.available', lambda server: server == 'werkzeug'):
+            self.assertEqual(choose_server('auto'), 'werkzeug')
+
+        with self.assertRaises(ValueError):
+            choose_server('uwsgi')
+
+        self.assertEqual(SERVERS[-1], 'werkzeug')
+
+
+    def test_worker_class(self):
+        """
+        Tests gevent workers need gunicorn and gevent, and can't preload the app.
+        """
+
+        check_worker_class('werkzeug', 'gthread')
+
+        with patch('serve.available', lambda server: True):
+            check_worker_class('gunicorn', 'gevent')
+
+            with self.assertRaises(ValueError):
+                check_worker_class('waitress', 'gevent')
+
+            with self.assertRaises(ValueError):
+                check_worker_class('gunicorn', 'gevent', preload=True)
+
+            with self.assertRaises(ValueError):
+                check_worker_class('gunicorn', 'eventlet')
+
+        with patch('serve.available', lambda server: server != 'gevent'):
+            with self.assertRaises(ValueError):
+                check_worker_class('gunicorn', 'gevent')
+
+
+    def test_gunicorn_options(self):
+        """
+        Tests the command line maps onto threaded gunicorn workers that reload on HUP.
+        """
+
+        options = gunicorn_options(parse_args(['--bind', '0.0.0.0:9000', '--workers', '2', '--threads', '16', '--keep-alive', '10']))
+
+        self.assertEqual(options['bind'], '0.0.0.0:9000')
+        self.assertEqual(options['workers'], 2)
+        self.assertEqual(options['threads'], 16)
+        self.assertEqual(options['worker_class'], 'gthread')
+        self.assertEqual(options['keepalive'], 10)
+        self.assertEqual(options['max_requests_jitter'], 1000)
+        self.assertFalse(options['preload_app'])
+        self.assertIsNone(options['accesslog'])
+        self.assertIs(options['worker_exit'], worker_exit)
+
+        self.assertIs(options['post_worker_init'], post_worker_init)
+
+        # preloaded apps are warmed before forking.
+        options = gunicorn_options(parse_args(['--preload']))
+        self.assertTrue(options['preload_app'])
+        self.assertNotIn('post_worker_init', options)
+
+        self.assertNotIn('post_worker_init', gunicorn_options(parse_args(['--no-warm'])))
+
+        options = gunicorn_options(parse_args(['--worker-class', 'gevent', '--connections', '500']))
+        self.assertEqual(options['worker_class'], 'gevent')
+        self.assertEqual(options['worker_connections'], 500)
+
+
+class TestHealth(TestCase):
+    """
+    Tests the readiness endpoint.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+
+
+    def test_ready(self):
+        """
+        Tests 200 when the DB answers.
+        """
+
+        with patch.object(journal.dbconn, 'ping'):
+            response = self.client.get('/healthz')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'ok')
+
+
+    def test_unavailable(self):
+        """
+        Tests 503 when the DB doesn't answer.
+        """
+
+        with patch.object(journal.dbconn, 'ping', side_effect=Exception('No servers found')):
+            response = self.client.get('/healthz')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['status'], 'unavailable')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+// Draws the mood plot from the sentiment columns returned by /api/mood.
+
+(function() {
+    const plot = document.getElementById('mood-plot');
+    const ranges = document.querySelectorAll('#mood-range button');
+
+    // titles for plots of rollup averages.
+    const averages = {day: 'Daily', week: 'Weekly', month: 'Monthly'};
+
+    // marker colours for low, neutral and high sentiments.
+    function colour(sentiment) {
+        if (sentiment < 4) {
+            return '#add8e6';
+        }
+        return sentiment <= 6 ? '#c5a3ff' : '#ffb6c1';
+    }
+
+    function draw(data) {
+        const trace = {
+            // plotly reads epoch milliseconds as dates without shifting them into the browser's timezone.
+            x: data.timestamps,
+            y: data.sentiments,
+            mode: 'lines+markers',
+            marker: {color: data.sentiments.map(colour)},
+            line: {color: '#c36c83'}
+        };
+
+        // same styling as the server-side plot.
+        const layout = {
+            title: {
+                text: data.unit in averages ? 'Your ' + averages[data.unit] + ' Mood' : 'Your Mood So Far!',
+                font: {color: '#f0668c'}
+            },
+            plot_bgcolor: '#f7c7d8',
+            paper_bgcolor: 'white',
+            font: {color: '#c36c83'},
+            yaxis: {title: 'sentiment', range: [0, 10], linecolor: 'white', linewidth: 2},
+            xaxis: {title: 'timestamp', type: 'date', linecolor: 'white', linewidth: 2},
+            margin: {l: 40, r: 40, t: 40, b: 40}
+        };
+
+        Plotly.react(plot, [trace], layout, {responsive: true});
+    }
+
+    // the server picks entries or a rollup to suit the range.
+    function load(days) {
+        const url = days ? plot.dataset.url + '?days=' + days : plot.dataset.url;
+
+        fetch(url)
+            .then(response => response.json())
+            .then(draw)
+            .catch(error => {
+                console.error('Error fetching mood data:', error);
+            });
+    }
+
+    ranges.forEach(button => {
+        button.addEventListener('click', event => {
+            event.preventDefault();
+
+            ranges.forEach(other => other.classList.remove('selected'));
+            button.classList.add('selected');
+
+            load(button.dataset.days);
+        });
+    });
+
+    load(document.querySelector('#mood-range .selected').dataset.days);
+})();
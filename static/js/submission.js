@@ -0,0 +1,32 @@
+// Polls the entry's sentiment and shows the daily affirmation once it has been scored.
+
+(function() {
+    const affirmation = document.getElementById('affirmation');
+    const url = '/entries/' + affirmation.dataset.entryId + '/sentiment';
+
+    // give up after a minute.
+    let attempts = 120;
+
+    function poll() {
+        fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'pending') {
+                    if (--attempts > 0) {
+                        setTimeout(poll, 500);
+                    }
+                    return;
+                }
+
+                // objective entries have no sentiment, so no affirmation.
+                if (data.daily_affirm) {
+                    affirmation.textContent = 'Your Daily Affirmation: ' + data.daily_affirm;
+                }
+            })
+            .catch(error => {
+                console.error('Error fetching sentiment:', error);
+            });
+    }
+
+    poll();
+})();
@@ -0,0 +1,186 @@
+import csv
+import json
+import os
+from datetime import datetime as dt
+from itertools import islice
+from bson import ObjectId
+
+from models import TIMESTAMP_FORMAT, SENTIMENT_DONE, SENTIMENT_PENDING, now
+from utils import chunked
+
+
+# fields written for each entry, in CSV column order.
+FIELDS = ['_id', 'body', 'sentiment', 'sentiment_status', 'timestamp', 'last timestamp']
+
+# file formats by name: one JSON object per line, or CSV with a header row.
+FORMATS = ['ndjson', 'csv']
+
+
+def guess_format(path):
+    """
+    Returns the format a file name suggests, NDJSON unless it ends in .csv.
+    """
+
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def to_record(entry):
+    """
+    Returns an entry as a flat record of strings, numbers and None, with ISO 8601 timestamps.
+    """
+
+    record = {}
+    for field in FIELDS:
+        value = entry.get(field)
+
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, dt):
+            value = value.isoformat(timespec='milliseconds')
+
+        record[field] = value
+
+    return record
+
+
+def parse_timestamp(value):
+    """
+    Parses an ISO 8601 or legacy formatted timestamp, or None if there isn't one. Other strings are kept as they are.
+    """
+
+    if value is None or value == '':
+        return None
+
+    try:
+        return dt.fromisoformat(value)
+    except ValueError:
+        pass
+
+    try:
+        return dt.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        # kept like an unmigrated entry.
+        return value
+
+
+def from_record(record):
+    """
+    Returns an entry to insert from a record. CSV values are all strings, with empty strings for None.
+    """
+
+    sentiment = record.get('sentiment')
+    sentiment = float(sentiment) if sentiment not in (None, '') else None
+
+    entry = {
+        'body': record.get('body') or '',
+        'sentiment': sentiment,
+        # entries from elsewhere with no sentiment are left to be scored.
+        'sentiment_status': record.get('sentiment_status') or (SENTIMENT_DONE if sentiment is not None else SENTIMENT_PENDING),
+        'timestamp': parse_timestamp(record.get('timestamp')) or now()
+    }
+
+    if record.get('_id'):
+        entry['_id'] = ObjectId(record['_id'])
+
+    last_timestamp = parse_timestamp(record.get('last timestamp'))
+    if last_timestamp is not None:
+        entry['last timestamp'] = last_timestamp
+
+    return entry
+
+
+def read_checkpoint(path):
+    """
+    Returns the progress saved at a checkpoint file, empty if there is none.
+    """
+
+    if path is None or not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """
+    Saves progress to a checkpoint file. The file is replaced in one step, so it's never half written.
+    """
+
+    if path is None:
+        return
+
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(state, f)
+
+    os.replace(f'{path}.tmp', path)
+
+
+def export_entries(manager, out, format='ndjson', batch_size=1000, checkpoint=None):
+    """
+    Streams a journal's entries to a text file, batch_size at a time, so memory use doesn't grow with the journal.
+    With a checkpoint file, an interrupted export carries on after the last batch it saved, appending to out.
+    Returns the number of entries written.
+    """
+
+    state = read_checkpoint(checkpoint)
+    writer = csv.DictWriter(out, FIELDS) if format == 'csv' else None
+
+    # a resumed CSV export already has its header.
+    if writer is not None and not state:
+        writer.writeheader()
+
+    count = 0
+    for batch in chunked(manager.export(batch_size, state.get('last_id')), batch_size):
+        for entry in batch:
+            record = to_record(entry)
+
+            if writer is not None:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record) + '\n')
+
+        # the batch is written before the checkpoint moves past it.
+        out.flush()
+        count += len(batch)
+        save_checkpoint(checkpoint, {'last_id': str(batch[-1]['_id']), 'written': state.get('written', 0) + count})
+
+    return count
+
+
+def read_records(f, format='ndjson'):
+    """
+    Yields the records in a text file one at a time.
+    """
+
+    if format == 'csv':
+        yield from csv.DictReader(f)
+        return
+
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def import_entries(manager, f, format='ndjson', chunk_size=1000, ordered=False, pipeline=None, checkpoint=None):
+    """
+    Inserts the entries in a text file into a journal, chunk_size per insert, so memory use doesn't grow with the file.
+    With a pipeline, entries that haven't been scored are scored a chunk at a time before they're inserted.
+    With a checkpoint file, an interrupted import skips the records it has already inserted.
+    Returns the number of records read and the number of entries inserted, which is lower if some already existed.
+    """
+
+    state = read_checkpoint(checkpoint)
+    done = state.get('read', 0)
+
+    read = inserted = 0
+    for batch in chunked(islice(read_records(f, format), done, None), chunk_size):
+        entries = [from_record(record) for record in batch]
+
+        if pipeline is not None:
+            pipeline.score_new(entries)
+
+        inserted += manager.insert_many(entries, ordered)
+        read += len(batch)
+        save_checkpoint(checkpoint, {'read': done + read})
+
+    return read, inserted
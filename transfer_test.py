@@ -0,0 +1,235 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+from datetime import datetime as dt, timedelta
+from flask import Flask
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from embedded_test import sqlite_journal
+from models import MongoDBConn, Journal, SENTIMENT_DONE, SENTIMENT_PENDING
+from pipeline import SentimentPipeline
+from transfer import export_entries, import_entries, read_records, from_record, to_record
+
+
+class TransferTests:
+    """
+    Export and import tests run against each storage backend. Subclasses set self.journal and clear().
+    """
+
+    def fill(self, n):
+        """
+        Inserts n scored entries a minute apart.
+        """
+
+        start = dt(2024, 1, 1, 12)
+        entries = [{'body': f'entry {i}', 'sentiment': i % 10, 'sentiment_status': SENTIMENT_DONE, 'timestamp': start + timedelta(minutes=i)}
+                   for i in range(n)]
+
+        self.assertEqual(self.journal.manager.insert_many(entries), n)
+
+
+    def bodies(self, journal):
+        """
+        Returns the bodies in a journal, oldest first.
+        """
+
+        return [entry['body'] for entry in journal.manager.export()]
+
+
+    def test_round_trip(self):
+        """
+        Tests entries exported in either format are restored unchanged.
+        """
+
+        self.fill(25)
+
+        for format in ('ndjson', 'csv'):
+            before = [to_record(entry) for entry in self.journal.manager.export()]
+
+            out = io.StringIO()
+            self.assertEqual(export_entries(self.journal.manager, out, format, batch_size=10), 25)
+
+            self.clear()
+            self.assertEqual(import_entries(self.journal.manager, io.StringIO(out.getvalue()), format, chunk_size=7), (25, 25))
+            self.assertEqual([to_record(entry) for entry in self.journal.manager.export()], before)
+
+
+    def test_duplicates(self):
+        """
+        Tests an unordered import skips entries already there, and an ordered one fails on them.
+        """
+
+        self.fill(10)
+
+        out = io.StringIO()
+        export_entries(self.journal.manager, out)
+
+        self.assertEqual(import_entries(self.journal.manager, io.StringIO(out.getvalue())), (10, 0))
+        self.assertEqual(len(self.bodies(self.journal)), 10)
+
+        with self.assertRaises(Exception):
+            import_entries(self.journal.manager, io.StringIO(out.getvalue()), ordered=True)
+
+
+    def test_export_resume(self):
+        """
+        Tests an export with a checkpoint carries on after the last batch it wrote.
+        """
+
+        self.fill(25)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'export.json')
+            out = io.StringIO()
+
+            # interrupted after the second batch.
+            with patch('transfer.to_record', side_effect=[to_record({'_id': i}) for i in range(20)] + [KeyboardInterrupt()]):
+                with self.assertRaises(KeyboardInterrupt):
+                    export_entries(self.journal.manager, out, batch_size=10, checkpoint=checkpoint)
+
+            self.assertEqual(len(out.getvalue().splitlines()), 20)
+            self.assertEqual(export_entries(self.journal.manager, out, batch_size=10, checkpoint=checkpoint), 5)
+            self.assertEqual(len(out.getvalue().splitlines()), 25)
+
+
+    def test_import_resume(self):
+        """
+        Tests an import with a checkpoint skips the records it has already inserted.
+        """
+
+        self.fill(25)
+
+        out = io.StringIO()
+        export_entries(self.journal.manager, out)
+
+        self.clear()
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'import.json')
+
+            # interrupted on the third chunk.
+            with patch.object(self.journal.manager, 'insert_many', side_effect=[10, 10, KeyboardInterrupt()]):
+                with self.assertRaises(KeyboardInterrupt):
+                    import_entries(self.journal.manager, io.StringIO(out.getvalue()), chunk_size=10, checkpoint=checkpoint)
+
+            self.assertEqual(import_entries(self.journal.manager, io.StringIO(out.getvalue()), chunk_size=10, checkpoint=checkpoint), (5, 5))
+            self.assertEqual(self.bodies(self.journal), [f'entry {i}' for i in range(20, 25)])
+
+
+    def test_score(self):
+        """
+        Tests unscored entries are scored through the pipeline before they're inserted.
+        """
+
+        records = '{"body": "I love ice cream so much, it is the best!", "timestamp": "2024-01-01T12:00:00"}\n' \
+                  '{"body": "kept as it was", "sentiment": 3, "timestamp": "2024-01-01T12:01:00"}\n'
+
+        self.assertEqual(import_entries(self.journal.manager, io.StringIO(records), pipeline=SentimentPipeline(self.journal.manager, workers=0)), (2, 2))
+
+        entries = list(self.journal.manager.export())
+
+        self.assertIsNotNone(entries[0]['sentiment'])
+        self.assertEqual(entries[0]['sentiment_status'], SENTIMENT_DONE)
+        self.assertEqual(entries[1]['sentiment'], 3)
+
+
+class TestRecords(TestCase):
+    """
+    Tests converting entries to and from flat records.
+    """
+
+    def test_from_record(self):
+        """
+        Tests CSV strings are converted back, and missing sentiments are left to be scored.
+        """
+
+        entry = from_record({'_id': '', 'body': 'hi', 'sentiment': '', 'sentiment_status': '', 'timestamp': '2024-01-01T12:00:00.000', 'last timestamp': ''})
+
+        self.assertEqual(entry, {'body': 'hi', 'sentiment': None, 'sentiment_status': SENTIMENT_PENDING, 'timestamp': dt(2024, 1, 1, 12)})
+        self.assertEqual(from_record({'sentiment': '7.5', 'timestamp': '2024-01-01 12:00:00'})['sentiment_status'], SENTIMENT_DONE)
+
+
+    def test_read_records(self):
+        """
+        Tests blank NDJSON lines are skipped.
+        """
+
+        self.assertEqual(list(read_records(io.StringIO('{"body": "a"}\n\n{"body": "b"}\n'))), [{'body': 'a'}, {'body': 'b'}])
+
+
+class TestMongoTransfer(TransferTests, TestCase):
+    """
+    Tests export and import with MongoDB.
+    """
+
+    def setUp(self):
+        """
+        Setting up resources needed for test cases, connects to the test db.
+        """
+
+        app = Flask(__name__)
+        app.config['MONGO_URI'] = 'mongodb://localhost:27017/testdb'
+
+        self.journal = Journal(MongoDBConn(app))
+        self.clear()
+
+
+    def clear(self):
+        """
+        Deletes every entry.
+        """
+
+        self.journal.dbconn.db.log.delete_many({})
+
+
+    def test_duplicates_indexed(self):
+        """
+        Tests only the entries an import writes are indexed for search, not the ones it skips or stops before.
+        """
+
+        self.fill(3)
+        existing = [to_record(entry) for entry in self.journal.manager.export()]
+        new = [to_record({'_id': ObjectId(), 'body': f'new {i}', 'timestamp': dt(2024, 2, 1)}) for i in range(3)]
+
+        def added(records, ordered):
+            f = io.StringIO(''.join(json.dumps(record) + '\n' for record in records))
+
+            with patch.object(self.journal.manager.search_backend, 'add') as add:
+                try:
+                    import_entries(self.journal.manager, f, ordered=ordered)
+                except BulkWriteError:
+                    pass
+
+            return [call.args[0] for call in add.call_args_list]
+
+        # the existing entries keep their bodies in the index.
+        self.assertEqual(added([{**existing[0], 'body': 'changed'}, new[0], existing[1], new[1]], False),
+                         [ObjectId(new[0]['_id']), ObjectId(new[1]['_id'])])
+
+        # an ordered import stops at the first entry already there.
+        self.assertEqual(added([new[2], existing[2], {**new[2], '_id': str(ObjectId())}], True), [ObjectId(new[2]['_id'])])
+
+
+class TestSQLiteTransfer(TransferTests, TestCase):
+    """
+    Tests export and import with SQLite.
+    """
+
+    def setUp(self):
+        self.journal = sqlite_journal(self)
+
+
+    def clear(self):
+        """
+        Deletes every entry.
+        """
+
+        self.journal.manager.collection.execute('DELETE FROM {log}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,50 +1,141 @@
-import requests
-from textblob import TextBlob
+import importlib
 import random
+import threading
+import time
+from itertools import islice
+from cache import MISSING
+from metrics import sentiment_duration
+from sentiment import BatchResult, get_backend, get_cache, cache_key, analyse, warm_lexicon
 
 
-def sentiment_analysis(text):
+# slow imports only the mood tracker and sentiment scoring need, loaded on first use.
+HEAVY_MODULES = ['numpy', 'pandas', 'plotly.express', 'plotly.offline', 'textblob.en.sentiments', 'requests']
+
+
+def sentiment_analysis(text, backend=None):
     """
     Sentiment analysis of a piece of text. Returns the positivity value on a scale of 0 - 10.
     """
 
-    url = 'http://text-processing.com/api/sentiment/'
-    textblob = TextBlob(text)
-    subj = textblob.sentiment.subjectivity
+    sentiment, error = sentiment_result(text, backend)
+
+    if error is not None:
+        print("Please see error below.")
+        print(error)
+
+    return sentiment
+
+
+def sentiment_result(text, backend=None):
+    """
+    Sentiment analysis of a piece of text. Returns a BatchResult of (sentiment, error), error is None on success.
+    Failures aren't cached, so the text is scored again next time.
+    """
+
+    # use the configured backend unless one is given.
+    backend = backend or get_backend()
+    cache = get_cache()
+    start = time.perf_counter()
+
+    if cache is None:
+        result, outcome = _score(text, backend), 'off'
+
+    else:
+        # unchanged entries are scored once.
+        key = cache_key(text, backend)
+        sentiment, outcome = cache.get(key), 'hit'
+
+        if sentiment is not MISSING:
+            result = BatchResult(sentiment, None)
+
+        else:
+            result, outcome = _score(text, backend), 'miss'
+
+            if result.error is None:
+                cache.set(key, result.value)
+
+    sentiment_duration.observe(time.perf_counter() - start, backend.name, outcome)
+
+    return result
+
+
+def _score(text, backend):
+    """
+    Scores a piece of text with a backend, uncached. Returns a BatchResult.
+    """
+
+    # subjectivity analysis to exclude objective entries, which the local backend reuses for polarity.
+    analysis = analyse(text)
+
+    if analysis.subjectivity > 0.2:
+        try:
+            pos = backend.score_analysis(text, analysis)
+
+        except Exception as e:
+            return BatchResult(None, str(e))
+
+        # only return pos value is numeric.
+        if isinstance(pos, int) or isinstance(pos, float):
+            return BatchResult(round(pos * 10, 2), None)
+
+        # otherwise return no data.
+        return BatchResult(None, None)
+
+    # return no data if subjectivity <= 0.2.
+    return BatchResult(None, None)
+
+
+def sentiment_analysis_batch(texts, backend=None, use_cache=True):
+    """
+    Sentiment analysis of many texts. Returns a BatchResult of (sentiment, error) per text, in order.
+    `use_cache=False` re-scores every text, e.g. after a model change, and refreshes the cache.
+    """
+
+    backend = backend or get_backend()
+    cache = get_cache()
 
-    # subjectivity analysis to exclude objective entries.
-    if subj > 0.2:
+    results = [None] * len(texts)
+    keys = [cache_key(text, backend) for text in texts]
 
-        # API has an 80k char limit.
-        if len(text) < 80000:
-            
-            try:
-                req = requests.post(url, data={"text": text}, timeout=10)
+    # look up every text in the cache first.
+    todo = []
+    for i, key in enumerate(keys):
+        sentiment = cache.get(key) if cache is not None and use_cache else MISSING
 
-                # perform sentiment analysis on OK response.
-                if req.status_code == 200:
-                    data = req.json()
-                    pos = data.get('probability', {}).get('pos')
+        if sentiment is MISSING:
+            todo.append(i)
+        else:
+            results[i] = BatchResult(sentiment, None)
 
-                    # only return pos value is numeric.
-                    if isinstance(pos, int) or isinstance(pos, float):
-                        return format(pos * 10, '.2f')
+    # subjectivity analysis to exclude objective entries, which the local backend reuses for polarity.
+    analyses = {i: analyse(texts[i]) for i in todo}
 
-                    # otherwise return no data.
-                    return
+    scored = []
+    for i in todo:
+        if analyses[i].subjectivity > 0.2:
+            scored.append(i)
+        else:
+            results[i] = BatchResult(None, None)
 
-                # otherwise return no data.
-                return
+    # score the subjective texts together.
+    for i, (pos, error) in zip(scored, backend.score_analyses([texts[i] for i in scored], [analyses[i] for i in scored])):
+        if error is not None:
+            results[i] = BatchResult(None, error)
 
-            except Exception as e:
-                print("Please see error below.")
-                print(e)
+        # only return pos value is numeric.
+        elif isinstance(pos, int) or isinstance(pos, float):
+            results[i] = BatchResult(round(pos * 10, 2), None)
 
-                # return no data if exception.
-                return
+        else:
+            results[i] = BatchResult(None, None)
 
-        # return no data if subjectivity <= 0.2.
-        return
+    # cache everything but failures, which should be retried.
+    if cache is not None:
+        for i in todo:
+            if results[i].error is None:
+                cache.set(keys[i], results[i].value)
+
+    return results
 
 
 def daily_affirmation(sentiment):
@@ -85,3 +176,83 @@ def daily_affirmation(sentiment):
     
     # if out of range.
     return 'Something has gone wrong.'
+
+
+def chunked(iterable, size):
+    """
+    Yields lists of up to size items from an iterable, without reading it all into memory.
+    """
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def lttb(x, y, threshold):
+    """
+    Downsamples a series to threshold points with largest-triangle-three-buckets, keeping its peaks and troughs.
+    Returns the indices of the points to keep.
+    """
+
+    import numpy as np
+
+    n = len(x)
+
+    # nothing to drop.
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # the first and last points are always kept, the rest are split into threshold - 2 buckets.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # the third corner is the average of the next bucket, or the last point.
+        if i < threshold - 3:
+            avg_x = x[edges[i + 1]:edges[i + 2]].mean()
+            avg_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # keep the point making the largest triangle with the last kept point and the next bucket.
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+
+    return indices
+
+
+def warm_imports(background=True):
+    """
+    Imports the heavy modules and loads the sentiment lexicon, so the first request needing them doesn't wait.
+    Runs on a daemon thread by default, returning it, so the server can take requests meanwhile.
+    """
+
+    def warm():
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+
+        warm_lexicon()
+
+    if not background:
+        warm()
+        return None
+
+    thread = threading.Thread(target=warm, name='warm-imports', daemon=True)
+    thread.start()
+
+    return thread
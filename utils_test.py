@@ -1,8 +1,12 @@
 
+import subprocess
+import sys
 from unittest import TestCase, main
 from unittest.mock import patch
 from random import uniform
-from utils import sentiment_analysis, daily_affirmation
+from cache import LRUCache
+from sentiment import LocalSentiment, SentimentBackend, analyzer, get_cache, set_cache
+from utils import sentiment_analysis, sentiment_result, sentiment_analysis_batch, daily_affirmation, chunked, lttb, warm_imports, HEAVY_MODULES
 
 
 class TestSentiment(TestCase):
@@ -21,8 +25,254 @@ class TestSentiment(TestCase):
         # subjective texts should return a sentiment.
         self.assertIsNotNone(sentiment_analysis('I had a great day today!'), 'Highly subjective texts should not return None.')
 
-        # sentiment should return a string.
-        self.assertIsInstance(sentiment_analysis('I had a great day today!'), str, 'Sentiment should be returned as a string.')
+        # sentiment should return a number.
+        self.assertIsInstance(sentiment_analysis('I had a great day today!'), float, 'Sentiment should be returned as a float.')
+
+
+class TestAnalysisPasses(TestCase):
+    """
+    Tests the lexicon analyses each text once, for both subjectivity and polarity.
+    """
+
+    def test_single(self):
+        """
+        Tests scoring one text with the local backend analyses it once.
+        """
+
+        self.addCleanup(set_cache, get_cache())
+        set_cache(None)
+
+        with patch.object(analyzer(), 'analyze', wraps=analyzer().analyze) as analyze:
+            self.assertEqual(sentiment_analysis('I had a great day today!', backend=LocalSentiment()), 10.0)
+
+        self.assertEqual(analyze.call_count, 1)
+
+
+    def test_batch(self):
+        """
+        Tests scoring a batch with the local backend analyses each text once.
+        """
+
+        self.addCleanup(set_cache, get_cache())
+        set_cache(None)
+
+        texts = ['I had a great day today!', 'I am a frog.', 'I HATE my job!']
+
+        with patch.object(analyzer(), 'analyze', wraps=analyzer().analyze) as analyze:
+            sentiment_analysis_batch(texts, backend=LocalSentiment())
+
+        self.assertEqual(analyze.call_count, len(texts))
+
+
+class CountingSentiment(SentimentBackend):
+    """
+    Local scores, counting how often it scores.
+    """
+
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = 0
+
+    def score(self, text):
+        self.calls += 1
+        return LocalSentiment().score(text)
+
+
+class TestSentimentCache(TestCase):
+    """
+    Tests sentiment results are cached.
+    """
+
+    def setUp(self):
+        """
+        Swaps in an empty cache for each test.
+        """
+
+        self.addCleanup(set_cache, get_cache())
+        self.cache = LRUCache()
+        set_cache(self.cache)
+
+
+    def test_repeat(self):
+        """
+        Tests unchanged text is only scored once, ignoring whitespace changes.
+        """
+
+        backend = CountingSentiment()
+
+        first = sentiment_analysis('I had a great day today!', backend=backend)
+        second = sentiment_analysis('  I had a great\n day today! ', backend=backend)
+
+        self.assertEqual(first, second)
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+
+    def test_objective(self):
+        """
+        Tests objective texts are cached as None.
+        """
+
+        sentiment_analysis('I am a frog.')
+
+        self.assertIsNone(sentiment_analysis('I am a frog.'))
+        self.assertEqual(self.cache.hits, 1)
+
+
+    def test_failure(self):
+        """
+        Tests failed scores aren't cached, so the text is scored again.
+        """
+
+        with patch('builtins.print'):
+            self.assertIsNone(sentiment_analysis('I love my lovely frog!', backend=FlakySentiment()))
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(sentiment_result('I love my lovely frog!', backend=FlakySentiment()).error, 'No frogs.')
+
+
+class FlakySentiment(SentimentBackend):
+    """
+    Local scores, failing on texts mentioning frogs. Scores one at a time, so failures come from score().
+    """
+
+    name = 'flaky'
+
+    def score(self, text):
+        if 'frog' in text:
+            raise ValueError('No frogs.')
+        return LocalSentiment().score(text)
+
+
+class TestSentimentBatch(TestCase):
+    """
+    Tests batch sentiment analysis.
+    """
+
+    def setUp(self):
+        """
+        Disables the cache unless a test sets one.
+        """
+
+        self.addCleanup(set_cache, get_cache())
+        set_cache(None)
+
+
+    def test_matches_single(self):
+        """
+        Tests batch results match scoring each text on its own, in order.
+        """
+
+        texts = ['I had a great day today!', 'I am a frog.', 'I HATE my job!', 'So happy!']
+        results = sentiment_analysis_batch(texts)
+
+        self.assertEqual([result.value for result in results], [sentiment_analysis(text) for text in texts])
+        self.assertTrue(all(result.error is None for result in results))
+
+
+    def test_failures(self):
+        """
+        Tests a failing text is reported without aborting the batch.
+        """
+
+        texts = ['I had a great day today!', 'I love my lovely frog!', 'I HATE my job!']
+        results = sentiment_analysis_batch(texts, backend=FlakySentiment())
+
+        self.assertEqual(results[1].error, 'No frogs.')
+        self.assertIsNone(results[1].value)
+        self.assertEqual(results[0].value, 10.0)
+        self.assertEqual(results[2].value, 0.0)
+
+
+    def test_cache(self):
+        """
+        Tests batch results are cached, except for failures.
+        """
+
+        cache = LRUCache()
+        set_cache(cache)
+
+        sentiment_analysis_batch(['I had a great day today!', 'I love my lovely frog!'], backend=FlakySentiment())
+
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(sentiment_analysis('I had a great day today!', backend=FlakySentiment()), 10.0)
+        self.assertEqual(cache.hits, 1)
+
+
+class TestChunked(TestCase):
+    """
+    Tests splitting iterables into chunks.
+    """
+
+    def test_chunked(self):
+        """
+        Tests chunks are in order and the last chunk is short.
+        """
+
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+
+class TestLTTB(TestCase):
+    """
+    Tests downsampling series for plotting.
+    """
+
+    def test_short(self):
+        """
+        Tests series within the threshold are kept whole.
+        """
+
+        self.assertEqual(list(lttb([1, 2, 3], [5, 6, 7], 10)), [0, 1, 2])
+
+
+    def test_downsample(self):
+        """
+        Tests the first, last and extreme points are kept, in order.
+        """
+
+        x = list(range(1000))
+        y = [5.0] * 1000
+        y[123] = 10.0
+        y[876] = 0.0
+
+        indices = list(lttb(x, y, 50))
+
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices, sorted(indices))
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(123, indices)
+        self.assertIn(876, indices)
+
+
+class TestLazyImports(TestCase):
+    """
+    Tests the heavy modules load on first use, not at import.
+    """
+
+    def test_lazy(self):
+        """
+        Tests importing the models, pipeline and utils loads none of the heavy modules.
+        """
+
+        code = 'import sys, models, pipeline, utils; print(",".join(m for m in utils.HEAVY_MODULES if m in sys.modules))'
+        loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.strip()
+
+        self.assertEqual(loaded, '')
+
+
+    def test_warm(self):
+        """
+        Tests warming loads every heavy module, in the background by default.
+        """
+
+        warm_imports().join()
+
+        for name in HEAVY_MODULES:
+            self.assertIn(name, sys.modules)
+
+        self.assertIsNone(warm_imports(background=False))
 
 
 class TestAffirmation(TestCase):